@@ -13,14 +13,16 @@ from datetime import datetime
 from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_from_directory, Response
 import json
 from werkzeug.utils import secure_filename
-from core.document_parser import DocumentParser
-from core.text_processor import TextProcessor
+from core.parse_cache import ParseCache
+from core.token_chunker import TokenChunker
+from core.rag_prompt import build_prompt, format_context, format_history, NO_SOURCES_CONTEXT
+from core import metrics
 from core.embedding_client import EmbeddingClient
 from core.vector_db import VectorDB
 from core.ai_client_factory import AIClientFactory
 from utils.logger import setup_logger
 from core.models import db, User, Chat, Message, Report, ReportMessage
-from core.auth import oauth, init_auth, handle_google_login, handle_google_callback
+from core.auth import oauth, init_auth, handle_google_login, handle_google_callback, handle_test_login
 from flask_login import LoginManager, login_required, current_user, logout_user, login_user
 from functools import wraps
 
@@ -109,12 +111,18 @@ def get_components():
         provider=embedding_provider,
         endpoint=embedding_endpoint,
         model=rag_cfg.get('embedding_model', 'nomic-embed-text-v1.5'),
-        api_key=model_cfg.get('api_key', '')
+        api_key=model_cfg.get('api_key', ''),
+        dimensions=rag_cfg.get('embedding_dimensions'),
+        fake=model_cfg.get('fake')
     )
     
     vector_db = VectorDB(
         db_path=rag_cfg.get('db_path', './data/vector_db'),
-        collection_name=rag_cfg.get('collection_name', 'training_docs')
+        collection_name=rag_cfg.get('collection_name', 'training_docs'),
+        backend=rag_cfg.get('vector_backend', 'chroma'),
+        quantization=rag_cfg.get('quantization', 'none'),
+        rescore_factor=rag_cfg.get('rescore_factor', 4),
+        sharding=rag_cfg.get('sharding', 'none')
     )
     
     ai_client = AIClientFactory.create(model_cfg)
@@ -122,6 +130,9 @@ def get_components():
     return embedding_client, vector_db, ai_client
 
 embedding_client, vector_db, ai_client = get_components()
+parse_cache = ParseCache.from_config(config.get('cache'), config.get('parser'))
+# rag.chunking: tokens -> paragraphs are packed/split to the embedding model's token range
+token_chunker = TokenChunker.from_config(config.get('rag'))
 
 @app.route('/')
 def index():
@@ -139,6 +150,14 @@ def auth_callback():
         return redirect(url_for('index'))
     return "Giriş başarısız", 400
 
+@app.route('/test_login', methods=['POST'])
+def test_login():
+    """Auth bypass for load tests; 404 unless LOAD_TEST_TOKEN is set (see core/auth.py)."""
+    user = handle_test_login()
+    if user is None:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"id": user.id, "name": user.name})
+
 @app.route('/logout')
 @login_required
 def logout():
@@ -175,59 +194,57 @@ def upload_file():
         
         logger.info(f"📁 Dosya yüklendi: {filename} (Kullanıcı: {current_user.name})")
         
+        embed_labels = {"provider": embedding_client.provider, "model": embedding_client.model}
+        metrics.gauge_add('upload_queue', 1, **embed_labels)
         try:
-            # 1. Parse
-            logger.info(f"📑 {filename} okunuyor ve metin ayrıştırılıyor...")
+            # 1-2. Parse and split (parser output and paragraphs are cached by file hash)
+            logger.info(f"📑 {filename} okunuyor ve paragraflara bölünüyor...")
             progress_data[job_id] = {"progress": 5, "status": "Doküman içerisindeki metinler çıkarılıyor..."}
-            raw_text = DocumentParser.parse(file_path)
-            
-            # 2. Split
-            logger.info(f"📑 {filename} paragraflara bölünüyor...")
-            progress_data[job_id] = {"progress": 10, "status": "Metinler küçük paragraflara ayrıştırılıyor..."}
-            paragraphs = TextProcessor.split_into_paragraphs(raw_text)
+            paragraphs = parse_cache.split(file_path)
+            if token_chunker:
+                paragraphs = token_chunker.chunk(paragraphs)
+            progress_data[job_id] = {"progress": 10, "status": "Metinler küçük paragraflara ayrıştırıldı."}
             logger.info(f"📑 {len(paragraphs)} paragraf başarıyla ayrıştırıldı.")
             
-            # 3. Embed and Index
-            documents, embeddings, metadatas, ids = [], [], [], []
-            total = len(paragraphs)
-            
-            for i, para in enumerate(paragraphs):
-                emb = embedding_client.get_embedding(para)
-                documents.append(para)
-                embeddings.append(emb)
-                metadatas.append({
-                    "source": filename, 
-                    "index": i, 
-                    "user_id": current_user.id,
-                    "is_public": False
-                })
-                ids.append(f"{filename}_{uuid.uuid4()}_{i}")
-                
-                # Update progress
-                current_percent = 10 + int(((i + 1) / total) * 90)
-                status_msg = f"Vektörleştiriliyor ve İndeksleniyor... ({i+1}/{total})"
+            # 3. Embed and Index (only paragraphs not already stored for this source)
+            rag_cfg = config.get('rag', {})
+            def report_progress(done, total):
+                current_percent = 10 + int((done / total) * 90)
+                status_msg = f"Vektörleştiriliyor ve İndeksleniyor... ({done}/{total})"
                 progress_data[job_id] = {"progress": current_percent, "status": status_msg}
-                
-                if len(documents) >= 10:
-                    logger.info(f"İndeksleniyor... ({i+1}/{total})")
-                    vector_db.add_documents(documents, embeddings, metadatas, ids)
-                    documents, embeddings, metadatas, ids = [], [], [], []
             
-            if documents:
-                vector_db.add_documents(documents, embeddings, metadatas, ids)
+            sync_start = time.perf_counter()
+            sync_stats = vector_db.sync_source(
+                filename,
+                paragraphs,
+                embedding_client.get_embedding,
+                user_id=current_user.id,
+                progress_callback=report_progress,
+                batch_size=rag_cfg.get('ingest_batch_size', 256),
+                dedup=rag_cfg.get('dedup', 'none'),
+                dedup_threshold=rag_cfg.get('dedup_threshold', 0.9)
+            )
             
-            logger.info(f"✅ İndeksleme tamamlandı: {filename}")
+            sync_seconds = time.perf_counter() - sync_start
+            metrics.inc('ingest_chunks', sync_stats['added'], **embed_labels)
+            if sync_stats['added'] and sync_seconds > 0:
+                metrics.observe('ingest_chunks_per_second', sync_stats['added'] / sync_seconds, **embed_labels)
+            logger.info(f"✅ İndeksleme tamamlandı: {filename} {sync_stats}")
             progress_data[job_id] = {"progress": 100, "status": "İşlem tamamlandı!"}
                 
             return jsonify({
-                "message": f"'{filename}' başarıyla yüklendi ve {len(paragraphs)} paragraf indekslendi.",
+                "message": f"'{filename}' başarıyla yüklendi: {sync_stats['added']} yeni, {sync_stats['deleted']} silinen, "
+                           f"{sync_stats['moved'] + sync_stats['unchanged']} değişmeyen, {sync_stats['duplicates']} tekrar eden paragraf.",
                 "filename": filename,
-                "count": len(paragraphs)
+                "count": len(paragraphs),
+                "sync": sync_stats
             })
             
         except Exception as e:
             logger.exception("❌ Dosya yükleme/işleme sırasında kritik hata oluştu:")
             return jsonify({"error": f"İşlem hatası: {str(e)}"}), 500
+        finally:
+            metrics.gauge_add('upload_queue', -1, **embed_labels)
 
 @app.route('/ask', methods=['POST'])
 @login_required
@@ -284,7 +301,7 @@ def ask_question():
             if contexts:
                 ref_count = len(contexts)
                 logger.info(f"✅ {ref_count} referans bulundu.")
-                context_text = "\n\n".join([f"[Kaynak: {m['source']}]\n{c}" for c, m in zip(contexts, metadatas)])
+                context_text = format_context(contexts, metadatas)
                 ref_prefix = f"({ref_count} referans bulundu)\n\n"
                 # Prepare detailed references for the frontend
                 reference_details = [{"source": m['source'], "content": c} for c, m in zip(contexts, metadatas)]
@@ -309,21 +326,16 @@ def ask_question():
                 })
         else:
             logger.info("📂 Kaynak seçilmedi, genel modda sorgulanıyor.")
-            context_text = "DİKKAT: Kullanıcı herhangi bir doküman seçmedi. Bu cevabı genel bilginle ver."
+            context_text = NO_SOURCES_CONTEXT
             ref_prefix = ""
         
         # 2.5 Retrieve Chat History (last 5 messages)
         history_msgs = Message.query.filter_by(chat_id=active_chat.id).order_by(Message.timestamp.desc()).offset(1).limit(5).all()
         history_msgs.reverse()
-        history_text = "\n".join([f"{'Kullanıcı' if m.role == 'user' else 'Asistan'}: {m.content}" for m in history_msgs])
+        history_text = format_history([(m.role, m.content) for m in history_msgs])
         
         # 3. Prompt
-        prompt = "Sen yardımcı bir doküman asistanısın. Eğer aşağıda doküman parçaları verilmişse öncelikle onlara sadık kalarak cevapla. Eğer doküman seçilmediği belirtilmişse genel bilginle yardımcı ol.\n\n"
-        if history_text:
-            prompt += f"--- Önceki Yazışmalar ---\n{history_text}\n\n"
-        
-        prompt += f"--- Doküman Bağlamı ---\n{context_text}\n\n"
-        prompt += f"Soru: {query}\n\nCevap:"
+        prompt = build_prompt(query, context_text, history_text)
 
         # 4. Generate with user-specific settings if available
         user_settings = json.loads(current_user.settings) if current_user.settings else {}
@@ -333,6 +345,8 @@ def ask_question():
         start_time = time.time()
         chat_id_val = active_chat.id
         user_id_val = current_user.id
+        llm_labels = {"provider": config.get('model', {}).get('type', 'lmstudio'),
+                      "model": model_overrides.get('name') or ai_client.model_name}
         
         def stream_generator():
             logger.info(f"📡 Stream generator started for Chat:{chat_id_val} User:{user_id_val}")
@@ -352,23 +366,38 @@ def ask_question():
                 logger.error(f"📡 Generator initialization error: {str(ge)}")
                 return
             
+            metrics.gauge_add('active_streams', 1, **llm_labels)
             try:
                 # 2. Get stream from AI client
                 chunk_count = 0
+                llm_start = time.perf_counter()
+                first_token_at = None
                 for chunk in ai_client.generate_stream(prompt, options=model_overrides):
                     if chunk['type'] == 'content':
                         text = chunk['text']
                         full_text += text
                         chunk_count += 1
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                            metrics.observe('llm_ttft_seconds', first_token_at - llm_start, **llm_labels)
                         yield f"data: {json.dumps({'type': 'content', 'text': text})}\n\n"
                         if chunk_count % 10 == 0:
                             logger.info(f"📡 Yielded {chunk_count} chunks to Chat:{chat_id_val}")
                     elif chunk['type'] == 'usage':
                         current_usage = chunk['usage']
                     elif chunk['type'] == 'error':
+                        metrics.error('llm', **llm_labels)
                         yield f"data: {json.dumps({'type': 'error', 'message': chunk['message']})}\n\n"
                         return
 
+                llm_end = time.perf_counter()
+                metrics.observe('llm_generation_seconds', llm_end - llm_start, **llm_labels)
+                completion_tokens = current_usage.get('completion_tokens') or chunk_count
+                metrics.inc('llm_completion_tokens', completion_tokens, **llm_labels)
+                if first_token_at is not None and llm_end > first_token_at:
+                    metrics.observe('llm_tokens_per_second', completion_tokens / (llm_end - first_token_at),
+                                    **llm_labels)
+
                 # 3. Finalize and save to DB
                 generation_time = time.time() - start_time
                 final_answer = ref_prefix + full_text
@@ -400,7 +429,10 @@ def ask_question():
                 
             except Exception as e:
                 logger.exception(f"📡 Stream generator fatal error: {str(e)}")
+                metrics.error('llm', **llm_labels)
                 yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+            finally:
+                metrics.gauge_add('active_streams', -1, **llm_labels)
 
         return Response(stream_generator(), mimetype='text/event-stream')
 
@@ -474,15 +506,51 @@ def get_stats():
         if target_user_id and is_admin:
             sources = [s for s in sources if s.get('user_id') == target_user_id]
 
+        dedup = [src['dedup'] for src in sources if src.get('dedup')]
         return jsonify({
             "count": count,
             "sources": sources,
+            "dedup": {
+                "paragraphs": sum(d.get('paragraphs', 0) for d in dedup),
+                "skipped": sum(d.get('skipped', 0) for d in dedup)
+            },
             "collection": config.get('rag', {}).get('collection_name', 'training_docs')
         })
     except Exception as e:
         logger.error(f"Stats hatası: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/watch_status')
+@login_required
+@admin_required
+def watch_status():
+    """Status file written by watch_ingest.py (queue depth, throughput)."""
+    rag_cfg = config.get('rag', {})
+    status_path = os.path.join(rag_cfg.get('db_path', './data/vector_db'),
+                               f"{rag_cfg.get('collection_name', 'training_docs')}.watch_status.json")
+    if not os.path.exists(status_path):
+        return jsonify({"running": False})
+    with open(status_path, 'r', encoding='utf-8') as f:
+        status = json.load(f)
+    # The daemon rewrites the file every half second while alive
+    status["running"] = time.time() - status.get("updated", 0) < 10
+    return jsonify(status)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint; aggregates all gunicorn workers (see gunicorn.conf.py)."""
+    token = os.getenv('METRICS_TOKEN', config.get('metrics', {}).get('token', ''))
+    if token and request.headers.get('Authorization', '') != f"Bearer {token}":
+        return jsonify({"error": "Yetkisiz"}), 401
+    rag_cfg = config.get('rag', {})
+    status_path = os.path.join(rag_cfg.get('db_path', './data/vector_db'),
+                               f"{rag_cfg.get('collection_name', 'training_docs')}.watch_status.json")
+    rendered = metrics.render(status_path)
+    if rendered is None:
+        return "prometheus_client is not installed (pip install prometheus_client)\n", 503
+    body, content_type = rendered
+    return Response(body, content_type=content_type)
+
 @app.route('/progress/<job_id>')
 def get_progress(job_id):
     data = progress_data.get(job_id, {"progress": 0, "status": ""})
@@ -25,12 +25,18 @@ def main():
         provider=model_cfg.get('type', 'ollama'),
         endpoint=model_cfg.get('endpoint', 'http://127.0.0.1:11434'),
         model=rag_cfg.get('embedding_model', 'nomic-embed-text'),
-        api_key=model_cfg.get('api_key', '')
+        api_key=model_cfg.get('api_key', ''),
+        dimensions=rag_cfg.get('embedding_dimensions'),
+        fake=model_cfg.get('fake')
     )
     
     db = VectorDB(
         db_path=rag_cfg.get('db_path', './data/vector_db'),
-        collection_name=rag_cfg.get('collection_name', 'training_docs')
+        collection_name=rag_cfg.get('collection_name', 'training_docs'),
+        backend=rag_cfg.get('vector_backend', 'chroma'),
+        quantization=rag_cfg.get('quantization', 'none'),
+        rescore_factor=rag_cfg.get('rescore_factor', 4),
+        sharding=rag_cfg.get('sharding', 'none')
     )
     
     ai_client = AIClientFactory.create(model_cfg)
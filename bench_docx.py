@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Benchmark the streaming DOCX parser against the python-docx path.
+
+Builds a synthetic DOCX (paragraphs with a table every N paragraphs) unless
+--input is given, then parses it in a fresh process per parser and reports
+time, peak RSS growth and how much text / how many tables each path keeps.
+"""
+import os
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing as mp
+
+
+def build_docx(path, paragraphs, table_every):
+    import docx
+    doc = docx.Document()
+    for i in range(paragraphs):
+        doc.add_paragraph(f"Madde {i}: Sabit erişim araçları, makineye güvenli erişim sağlamak için "
+                          f"tasarlanmış merdiven, platform ve korkuluk sistemleridir. ({i})")
+        if table_every and i % table_every == 0:
+            table = doc.add_table(rows=4, cols=3)
+            for r in range(4):
+                for c in range(3):
+                    table.cell(r, c).text = f"başlık {c}" if r == 0 else f"değer {i}.{r}.{c}"
+    doc.save(path)
+
+
+def parse_python_docx(path):
+    # The previous DocumentParser._parse_docx implementation
+    from docx import Document
+    doc = Document(path)
+    return "\n".join([para.text for para in doc.paragraphs if para.text.strip()])
+
+
+def parse_streaming(path):
+    from core.document_parser import DocumentParser
+    return DocumentParser.parse(path)
+
+
+def peak_rss_kb():
+    """Peak RSS of this process. VmHWM is reset on exec, unlike ru_maxrss on Linux."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def worker(name, path, queue):
+    # Import both parsers up front so only parsing shows up in the peak
+    import docx  # noqa: F401
+    import core.document_parser  # noqa: F401
+    before = peak_rss_kb()
+    start = time.perf_counter()
+    text = parse_python_docx(path) if name == 'python-docx' else parse_streaming(path)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, (peak_rss_kb() - before) / 1024, len(text), text.count('|:--')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare streaming and python-docx DOCX parsing.')
+    parser.add_argument('--input', help='DOCX to parse (default: generate one)')
+    parser.add_argument('--paragraphs', type=int, default=20000, help='Paragraphs in the generated DOCX (default: 20000)')
+    parser.add_argument('--table-every', type=int, default=50, help='Insert a table every N paragraphs (default: 50)')
+    args = parser.parse_args()
+
+    path = args.input
+    tmp = None
+    if not path:
+        tmp = tempfile.NamedTemporaryFile(suffix='.docx', delete=False)
+        tmp.close()
+        path = tmp.name
+        print(f"Generating {args.paragraphs} paragraphs...")
+        build_docx(path, args.paragraphs, args.table_every)
+    print(f"File: {path} ({os.path.getsize(path) / 1e6:.1f} MB)\n")
+    print(f"{'parser':<12} {'seconds':>8} {'peak MB':>8} {'chars':>10} {'tables':>7}")
+
+    ctx = mp.get_context('spawn')
+    try:
+        for name in ('python-docx', 'streaming'):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=worker, args=(name, path, queue))
+            proc.start()
+            elapsed, peak_mb, chars, tables = queue.get()
+            proc.join()
+            print(f"{name:<12} {elapsed:>8.2f} {peak_mb:>8.1f} {chars:>10} {tables:>7}")
+    finally:
+        if tmp:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Benchmark ingestion throughput (chunks/sec) of VectorDB write paths.
+
+Compares the old one-write-per-10-paragraphs loop with VectorDB.bulk_add at
+several batch sizes. Embeddings are synthetic; --embed-latency-ms simulates
+the per-paragraph round trip to the embedding server so the effect of
+overlapping embedding with DB writes is visible.
+"""
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from core.vector_db import VectorDB
+
+
+def make_embed_fn(dim, latency):
+    rng = np.random.default_rng(7)
+    pool = rng.standard_normal((1024, dim)).astype(np.float32)
+
+    def embed(text):
+        if latency > 0:
+            time.sleep(latency)
+        return pool[hash(text) % len(pool)].tolist()
+    return embed
+
+
+def run_legacy(db, docs, metas, ids, embed):
+    batch = ([], [], [], [])
+    for doc, meta, doc_id in zip(docs, metas, ids):
+        batch[0].append(doc)
+        batch[1].append(embed(doc))
+        batch[2].append(meta)
+        batch[3].append(doc_id)
+        if len(batch[0]) >= 10:
+            db.add_documents(*batch)
+            batch = ([], [], [], [])
+    if batch[0]:
+        db.add_documents(*batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure ingestion throughput in chunks per second.')
+    parser.add_argument('--count', type=int, default=5000, help='Number of chunks to ingest (default: 5000)')
+    parser.add_argument('--dim', type=int, default=768, help='Embedding dimension (default: 768)')
+    parser.add_argument('--backend', default='chroma', choices=['chroma', 'numpy'], help='Vector backend (default: chroma)')
+    parser.add_argument('--batch-sizes', default='64,256,1024', help='Comma separated bulk_add batch sizes')
+    parser.add_argument('--embed-latency-ms', type=float, default=0.0, help='Simulated embedding latency per chunk')
+    parser.add_argument('--defer-index', action='store_true', help='Defer index building on the fresh collection')
+    args = parser.parse_args()
+
+    docs = [f"Paragraf {i}: " + " ".join(f"kelime{(i * 7 + j) % 997}" for j in range(60)) for i in range(args.count)]
+    metas = [{"source": f"doc_{i % 20}.pdf", "index": i, "user_id": 1, "is_public": False} for i in range(args.count)]
+    ids = [f"id_{i}" for i in range(args.count)]
+    embed = make_embed_fn(args.dim, args.embed_latency_ms / 1000)
+
+    runs = [("legacy x10", None)] + [(f"bulk x{b}", int(b)) for b in args.batch_sizes.split(',') if b.strip()]
+    print(f"Chunks: {args.count} x {args.dim}, backend: {args.backend}, embed latency: {args.embed_latency_ms} ms\n")
+    print(f"{'mode':<12} {'seconds':>8} {'chunks/s':>9}")
+
+    for name, batch_size in runs:
+        tmp = tempfile.mkdtemp(prefix="bench_ingest_")
+        try:
+            db = VectorDB(db_path=tmp, collection_name="bench", backend=args.backend)
+            start = time.perf_counter()
+            if batch_size is None:
+                run_legacy(db, docs, metas, ids, embed)
+            else:
+                db.bulk_add(docs, metas, ids, embed, batch_size=batch_size, defer_index=args.defer_index)
+            elapsed = time.perf_counter() - start
+            assert db.get_collection_count() == args.count
+            print(f"{name:<12} {elapsed:>8.2f} {args.count / elapsed:>9.0f}")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
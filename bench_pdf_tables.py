@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Benchmark and accuracy check of PDF table detection modes (tables: auto|always|never).
+
+'always' is the reference: for the other modes the script reports parse
+time, how many pages ran find_tables, how many tables were found and whether
+the parsed text is identical to the reference output.
+"""
+import time
+import difflib
+import argparse
+import fitz  # pymupdf
+from core.document_parser import DocumentParser
+
+
+def table_pages(file_path, tables):
+    """Pages that run find_tables under a mode, and the tables found there."""
+    checked, found = 0, 0
+    doc = fitz.open(file_path)
+    for page in doc:
+        if tables == 'always' or (tables == 'auto' and DocumentParser._has_table_lines(page)):
+            checked += 1
+            found += len(page.find_tables().tables)
+    pages = len(doc)
+    doc.close()
+    return pages, checked, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare PDF table detection modes.')
+    parser.add_argument('--input', default='BS EN ISO 14122-1-2016.pdf', help='PDF to parse (default: bundled ISO standard)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per mode, best is reported (default: 3)')
+    args = parser.parse_args()
+
+    outputs = {}
+    print(f"{'mode':<8} {'best s':>7} {'pages':>6} {'checked':>8} {'tables':>7} {'same text':>10} {'similarity':>11}")
+    for tables in ('always', 'auto', 'never'):
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            outputs[tables] = DocumentParser.parse(args.input, tables=tables)
+            times.append(time.perf_counter() - start)
+        pages, checked, found = table_pages(args.input, tables)
+        reference = outputs['always']
+        ratio = difflib.SequenceMatcher(None, reference, outputs[tables], autojunk=False).ratio() \
+            if tables != 'always' else 1.0
+        print(f"{tables:<8} {min(times):>7.2f} {pages:>6} {checked:>8} {found:>7} "
+              f"{str(outputs[tables] == reference):>10} {ratio:>11.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Measure prompt prefill time per paragraph for the old and the prefix-cached prompt layout.
+
+Sends the first N paragraphs of a document with max_tokens=1 to the
+configured backend, so the time is almost entirely prompt processing.
+Server-side prefill time and cached tokens are reported where the backend
+returns them (llama.cpp timings, Ollama prompt_eval_duration); wall time
+is always reported.
+"""
+import time
+import argparse
+import statistics
+import yaml
+from core.ai_client_factory import AIClientFactory
+from core.parse_cache import ParseCache
+from core.question_generator import QuestionGenerator
+
+
+def legacy_prompt(generator, paragraph):
+    """The previous QuestionGenerator._create_prompt: varying header first, paragraph mid-prompt."""
+    return f"""Aşağıdaki metinden {generator.min_questions}-{generator.max_questions} adet soru-cevap çifti oluştur.
+
+KRİTİK KURALLAR:
+1. SADECE metinde açıkça geçen bilgilerden soru oluştur
+2. Cevaplar net, kısa, doğru ve TAMAMEN TÜRKÇE olmalı
+3. HALÜSİNASYON YAPMA - metinde olmayan bilgi ekleme
+4. İngilizce kelime kullanma (available, usually vb. YASAK)
+5. Gramer hatası yapma, düzgün Türkçe cümleler kur
+6. Sorular çeşitli olmalı (ne, nasıl, neden, kaç, hangi vb.)
+
+CONFIDENCE KURALLARI:
+- "high": Metinde açıkça yazıyor, net kural var
+- "low": Metinde geçmiyor, belirsiz, dış kaynak gerekiyor
+
+JSON KURALLARI:
+- Geçerli JSON formatı kullan
+- String'lerde çift tırnak kullan
+- Özel karakterleri escape et (\\n, \\", \\\\)
+- Tırnak işaretlerini kapatmayı unutma
+
+METIN:
+{paragraph}
+
+SADECE geçerli JSON formatında cevap ver, başka açıklama ekleme:
+{generator._example_format()}"""
+
+
+def run(client, prompts, options):
+    walls, prefills, cached = [], [], []
+    for prompt in prompts:
+        start = time.perf_counter()
+        usage = client.generate(prompt, options=dict(options, max_tokens=1)).get('usage', {})
+        walls.append((time.perf_counter() - start) * 1000)
+        if usage.get('prefill_ms') is not None:
+            prefills.append(usage['prefill_ms'])
+        cached.append(usage.get('cached_tokens') or 0)
+    # The first request warms the cache; report the steady state
+    steady = slice(1, None) if len(prompts) > 1 else slice(None)
+    return (statistics.mean(walls[steady]),
+            statistics.mean(prefills[steady]) if prefills[steady] else None,
+            statistics.mean(cached[steady]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare prefill time of the legacy and prefix-cached prompt layouts.')
+    parser.add_argument('--input', '-i', default='BS EN ISO 14122-1-2016.pdf', help='Document to take paragraphs from')
+    parser.add_argument('--config', '-c', default='config/config.yaml', help='Config file path')
+    parser.add_argument('--paragraphs', type=int, default=20, help='Paragraphs to send per layout (default: 20)')
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    client = AIClientFactory.create(config['model'])
+    generator = QuestionGenerator(client, config['generation']['min_questions_per_paragraph'],
+                                  config['generation']['max_questions_per_paragraph'])
+    paragraphs = ParseCache.from_config(config.get('cache'), config.get('parser')).split(
+        args.input, min_length=config['generation']['min_paragraph_length'])[:args.paragraphs]
+    options = {k: config['model'][k] for k in ('cache_prompt', 'id_slot', 'keep_alive') if k in config['model']}
+
+    print(f"{config['model']['type']} - {len(paragraphs)} paragraf\n")
+    print(f"{'layout':<8} {'wall ms':>9} {'prefill ms':>11} {'cached tok':>11}")
+    for name, build in (('legacy', lambda p: legacy_prompt(generator, p)), ('prefix', generator._create_prompt)):
+        wall, prefill, cached = run(client, [build(p) for p in paragraphs], options)
+        prefill_text = f"{prefill:.1f}" if prefill is not None else '-'
+        print(f"{name:<8} {wall:>9.1f} {prefill_text:>11} {cached:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""Benchmark every pipeline stage separately and compare against a baseline.
+
+Stages: DocumentParser.parse, TextProcessor.split_into_paragraphs,
+embedding, VectorDB.add_documents, VectorDB.query and prompt assembly
+(/ask and question generation). Inputs are fixed: the ISO PDF shipped with
+the repo plus a DOCX and a TXT generated from a seeded word list, and the
+fake embedding provider stands in for the embedding server, so only local
+code is measured. Each stage runs --repeat times after a warm-up; the
+median, p90 and minimum are written as JSON.
+
+    python3 bench_suite.py --output bench.json                 # save results
+    python3 bench_suite.py --baseline bench.json --threshold 0.2
+
+With --baseline, a stage whose median (or --metric min) is more than its
+threshold slower than the baseline is a regression and the exit code is 1.
+Compare results from the same machine only.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+from core.document_parser import DocumentParser
+from core.text_processor import TextProcessor
+from core.embedding_client import EmbeddingClient
+from core.vector_db import VectorDB
+from core.question_generator import QuestionGenerator
+from core.fake_client import FakeAIClient
+from core.rag_prompt import build_prompt, format_context, format_history
+
+SAMPLE_PDF = 'BS EN ISO 14122-1-2016.pdf'
+WORDS = ("makine erişim merdiven platform korkuluk yükseklik genişlik basamak eğim güvenlik standart "
+         "kullanıcı tasarım yük kapı zemin sabit araç bakım operatör tehlike risk ölçü uzunluk derinlik "
+         "yüzey malzeme montaj kontrol gereklilik uygulama kapsam tanım madde bölüm tablo şekil").split()
+PROMPT_ROUNDS = 50
+
+
+def make_text(rng: random.Random, paragraphs: int) -> list:
+    """Paragraphs of Turkish-looking sentences with occasional headers and list items."""
+    result = []
+    for i in range(paragraphs):
+        if i % 12 == 0:
+            result.append(f"{i // 12 + 1} {rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}")
+            continue
+        sentences = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 18))).capitalize() + "."
+                     for _ in range(rng.randint(2, 6))]
+        result.append(" ".join(sentences))
+        if i % 7 == 0:
+            result.append("\n".join(f"{c}) {rng.choice(WORDS)} {rng.choice(WORDS)};" for c in "abc"))
+    return result
+
+
+def make_samples(directory: str) -> list:
+    """The repo PDF plus a generated DOCX and TXT (same seed, same content every run)."""
+    import docx
+    rng = random.Random(1234)
+    txt_path = os.path.join(directory, 'sample.txt')
+    with open(txt_path, 'w', encoding='utf-8') as f:
+        f.write("\n\n".join(make_text(rng, 400)))
+    docx_path = os.path.join(directory, 'sample.docx')
+    document = docx.Document()
+    for paragraph in make_text(rng, 300):
+        document.add_paragraph(paragraph)
+    table = document.add_table(rows=6, cols=3)
+    for r, row in enumerate(table.rows):
+        for c, cell in enumerate(row.cells):
+            cell.text = f"{rng.choice(WORDS)} {r}.{c}"
+    document.save(docx_path)
+    samples = [docx_path, txt_path]
+    if os.path.exists(SAMPLE_PDF):
+        samples.insert(0, SAMPLE_PDF)
+    return samples
+
+
+def measure(fn, repeat: int) -> dict:
+    """Run fn once to warm up, then `repeat` times; fn returns the number of items it processed."""
+    fn()
+    times, items = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    ordered = sorted(times)
+    median = statistics.median(ordered)
+    return {
+        "median_ms": round(median, 3),
+        "p90_ms": round(ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))], 3),
+        "min_ms": round(ordered[0], 3),
+        "runs": repeat,
+        "items": items,
+        "items_per_sec": round(items / (median / 1000), 1) if median else None
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=10).stdout.strip()
+    except Exception:
+        return ''
+
+
+def run_suite(args, workdir: str) -> dict:
+    samples = make_samples(workdir)
+    stages = {}
+
+    texts = {}
+
+    def parse():
+        for path in samples:
+            texts[path] = DocumentParser.parse(path)
+        return len(samples)
+    stages['parse'] = measure(parse, args.repeat)
+
+    paragraphs = []
+
+    def split():
+        paragraphs.clear()
+        for text in texts.values():
+            paragraphs.extend(TextProcessor.split_into_paragraphs(text, min_length=50))
+        return len(paragraphs)
+    stages['split'] = measure(split, args.repeat)
+
+    # Repeat the corpus up to --chunks so DB stages have a realistic size
+    chunks = [f"{paragraphs[i % len(paragraphs)]} ({i})" for i in range(args.chunks)]
+    embedder = EmbeddingClient(provider='fake', fake={'embedding_dimensions': args.dim})
+    embeddings = []
+
+    def embed():
+        embeddings.clear()
+        for start in range(0, len(chunks), 64):
+            embeddings.extend(embedder.get_embeddings(chunks[start:start + 64]))
+        return len(embeddings)
+    stages['embed'] = measure(embed, args.repeat)
+
+    sources = [f"doc_{i % 8}.pdf" for i in range(len(chunks))]
+    metadatas = [{"source": s, "index": i, "user_id": 1 + i % 2, "is_public": i % 3 == 0}
+                 for i, s in enumerate(sources)]
+    ids = [f"id_{i}" for i in range(len(chunks))]
+    db_holder = {}
+
+    def add_documents():
+        path = tempfile.mkdtemp(dir=workdir)
+        db = VectorDB(db_path=path, collection_name='bench', backend=args.backend)
+        for start in range(0, len(chunks), args.batch_size):
+            end = start + args.batch_size
+            db.add_documents(chunks[start:end], embeddings[start:end], metadatas[start:end], ids[start:end])
+        db_holder['db'] = db
+        return len(chunks)
+    stages['add_documents'] = measure(add_documents, args.repeat)
+
+    rng = random.Random(99)
+    queries = [" ".join(rng.choice(chunks).split()[:10]) for _ in range(args.queries)]
+    query_embeddings = embedder.get_embeddings(queries)
+    results = []
+
+    def query():
+        results.clear()
+        db = db_holder['db']
+        for text, embedding in zip(queries, query_embeddings):
+            # Like /ask: owner filter, two selected sources, keyword fallback text
+            results.append(db.query(embedding, n_results=3, user_id=1, source=['doc_1.pdf', 'doc_2.pdf'],
+                                    query_text=text))
+        return len(queries)
+    stages['query'] = measure(query, args.repeat)
+
+    history = [('user', queries[0]), ('bot', chunks[0]), ('user', queries[1])]
+
+    # Prompt assembly takes microseconds; enough rounds to rise above timer noise
+    def prompt_ask():
+        for _ in range(PROMPT_ROUNDS):
+            for text, result in zip(queries, results):
+                contexts = result.get('documents', [[]])[0]
+                metadatas_ = result.get('metadatas', [[]])[0]
+                build_prompt(text, format_context(contexts, metadatas_), format_history(history))
+        return PROMPT_ROUNDS * len(queries)
+    stages['prompt_ask'] = measure(prompt_ask, args.repeat)
+
+    generator = QuestionGenerator(FakeAIClient({'type': 'fake', 'json_wrapper': 'questions'}), 2, 5,
+                                  structured_output=True)
+
+    def prompt_qa():
+        for _ in range(PROMPT_ROUNDS):
+            for paragraph in paragraphs:
+                generator._create_prompt(paragraph)
+                generator.response_schema()
+        return PROMPT_ROUNDS * len(paragraphs)
+    stages['prompt_qa'] = measure(prompt_qa, args.repeat)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "samples": [os.path.basename(s) for s in samples],
+            "paragraphs": len(paragraphs),
+            "chunks": len(chunks),
+            "dim": args.dim,
+            "backend": args.backend,
+            "repeat": args.repeat
+        },
+        "stages": stages
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, overrides: dict, metric: str = 'median_ms') -> list:
+    """Per-stage change of `metric` against the baseline; flags regressions over the threshold."""
+    rows = []
+    for stage, current in results["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        limit = overrides.get(stage, threshold)
+        if not base or not base.get(metric):
+            rows.append({"stage": stage, "value_ms": current[metric], "baseline_ms": None,
+                         "change": None, "threshold": limit, "regression": False})
+            continue
+        change = current[metric] / base[metric] - 1
+        rows.append({"stage": stage, "value_ms": current[metric], "baseline_ms": base[metric],
+                     "change": round(change, 4), "threshold": limit, "regression": change > limit})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark each pipeline stage and compare with a baseline.')
+    parser.add_argument('--output', '-o', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', '-b', help='Baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed median slowdown per stage as a fraction (default: 0.2 = 20%%)')
+    parser.add_argument('--stage-threshold', action='append', default=[], metavar='STAGE=FRACTION',
+                        help='Per-stage threshold, e.g. query=0.3 (repeatable)')
+    parser.add_argument('--metric', choices=['median', 'min'], default='median',
+                        help='Statistic compared with the baseline (default: median; min is less noisy)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per stage (default: 5)')
+    parser.add_argument('--chunks', type=int, default=2000, help='Chunks for embedding/DB stages (default: 2000)')
+    parser.add_argument('--queries', type=int, default=100, help='Queries for the query stage (default: 100)')
+    parser.add_argument('--dim', type=int, default=768, help='Embedding dimension (default: 768)')
+    parser.add_argument('--batch-size', type=int, default=256, help='add_documents batch size (default: 256)')
+    parser.add_argument('--backend', default='chroma', choices=['chroma', 'numpy'], help='Vector backend (default: chroma)')
+    args = parser.parse_args()
+
+    overrides = {}
+    for item in args.stage_threshold:
+        stage, _, value = item.partition('=')
+        overrides[stage.strip()] = float(value)
+
+    workdir = tempfile.mkdtemp(prefix='bench_suite_')
+    try:
+        results = run_suite(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        results["comparison"] = {"baseline": args.baseline, "baseline_commit": baseline.get("meta", {}).get("commit"),
+                                 "metric": args.metric,
+                                 "stages": compare(results, baseline, args.threshold, overrides, f"{args.metric}_ms")}
+        regressions = [row["stage"] for row in results["comparison"]["stages"] if row["regression"]]
+        results["comparison"]["regressions"] = regressions
+
+    comparison = {row["stage"]: row for row in results.get("comparison", {}).get("stages", [])}
+    print(f"{'stage':<14} {'median ms':>10} {'p90 ms':>9} {'items/s':>10} {'baseline':>10} {'change':>8}")
+    for stage, data in results["stages"].items():
+        row = comparison.get(stage, {})
+        base = f"{row['baseline_ms']:.1f}" if row.get('baseline_ms') else '-'
+        change = f"{100 * row['change']:+.1f}%" if row.get('change') is not None else '-'
+        flag = '  REGRESSION' if row.get('regression') else ''
+        print(f"{stage:<14} {data['median_ms']:>10.1f} {data['p90_ms']:>9.1f} {data['items_per_sec'] or 0:>10.1f} "
+              f"{base:>10} {change:>8}{flag}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nResults: {args.output}")
+    if regressions:
+        print(f"\nRegressions over threshold: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
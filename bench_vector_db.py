@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Benchmark VectorDB backends (chroma vs numpy) on synthetic embeddings."""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from core.vector_db import VectorDB
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            total += os.path.getsize(os.path.join(root, f))
+    return total
+
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) * 1000 if values else 0.0
+
+
+def run_backend(name, db_path, vectors, queries, n_sources, batch_size, top_k, quantization):
+    db = VectorDB(db_path=db_path, collection_name="bench", backend=name, quantization=quantization)
+    n = len(vectors)
+
+    start = time.perf_counter()
+    for s in range(0, n, batch_size):
+        chunk = vectors[s:s + batch_size]
+        db.add_documents(
+            documents=[f"paragraf {i}" for i in range(s, s + len(chunk))],
+            embeddings=chunk.tolist(),
+            metadatas=[{"source": f"doc_{i % n_sources}.pdf", "index": i, "user_id": 1, "is_public": False}
+                       for i in range(s, s + len(chunk))],
+            ids=[f"id_{i}" for i in range(s, s + len(chunk))]
+        )
+    add_time = time.perf_counter() - start
+
+    # Reopen to include load/mmap cost the way a fresh worker would see it
+    start = time.perf_counter()
+    db = VectorDB(db_path=db_path, collection_name="bench", backend=name, quantization=quantization)
+    open_time = time.perf_counter() - start
+
+    hits, lat_all, lat_filtered = [], [], []
+    for q in queries:
+        t = time.perf_counter()
+        res = db.backend.search(q.tolist(), top_k)
+        lat_all.append(time.perf_counter() - t)
+        hits.append(res['ids'][0])
+
+        t = time.perf_counter()
+        db.query(q.tolist(), n_results=top_k, user_id=1, source=["doc_0.pdf", "doc_1.pdf"])
+        lat_filtered.append(time.perf_counter() - t)
+
+    return {
+        "add_per_sec": n / add_time if add_time > 0 else 0,
+        "open_ms": open_time * 1000,
+        "p50_ms": percentile(lat_all, 50),
+        "p95_ms": percentile(lat_all, 95),
+        "filtered_p50_ms": percentile(lat_filtered, 50),
+        "disk_mb": dir_size(db_path) / 1e6,
+        "hits": hits,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark VectorDB backends on synthetic data.')
+    parser.add_argument('--count', type=int, default=20000, help='Number of stored vectors (default: 20000)')
+    parser.add_argument('--dim', type=int, default=768, help='Embedding dimension (default: 768)')
+    parser.add_argument('--queries', type=int, default=200, help='Number of queries (default: 200)')
+    parser.add_argument('--sources', type=int, default=50, help='Number of distinct sources (default: 50)')
+    parser.add_argument('--batch-size', type=int, default=500, help='add_documents batch size (default: 500)')
+    parser.add_argument('--top-k', type=int, default=5, help='Results per query (default: 5)')
+    parser.add_argument('--backends', default='chroma,numpy', help='Comma separated backends (default: chroma,numpy)')
+    parser.add_argument('--quantization', default='none', choices=['none', 'float16', 'int8'], help='numpy backend scan format (default: none)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    vectors = rng.standard_normal((args.count, args.dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.choice(args.count, args.queries, replace=False)] + \
+        0.05 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    # Exact neighbours for recall
+    truth = []
+    for q in queries:
+        d = ((vectors - q) ** 2).sum(axis=1)
+        truth.append({f"id_{i}" for i in np.argsort(d)[:args.top_k]})
+
+    print(f"Vectors: {args.count} x {args.dim}, queries: {args.queries}, top_k: {args.top_k}\n")
+    print(f"{'backend':<8} {'add/s':>9} {'open ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'filt p50':>9} {'disk MB':>8} {'recall':>7}")
+
+    for name in [b.strip() for b in args.backends.split(',') if b.strip()]:
+        tmp = tempfile.mkdtemp(prefix=f"bench_{name}_")
+        try:
+            quantization = args.quantization if name == 'numpy' else 'none'
+            r = run_backend(name, tmp, vectors, queries, args.sources, args.batch_size, args.top_k, quantization)
+            recall = np.mean([len(set(h) & t) / args.top_k for h, t in zip(r['hits'], truth)])
+            print(f"{name:<8} {r['add_per_sec']:>9.0f} {r['open_ms']:>9.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+                  f"{r['filtered_p50_ms']:>9.2f} {r['disk_mb']:>8.1f} {recall:>7.3f}")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,13 +10,16 @@ def check_db():
         cfg = config.get('rag', {})
         db = VectorDB(
             db_path=cfg.get('db_path', './data/vector_db'),
-            collection_name=cfg.get('collection_name', 'training_docs')
+            collection_name=cfg.get('collection_name', 'training_docs'),
+            backend=cfg.get('vector_backend', 'chroma'),
+            quantization=cfg.get('quantization', 'none'),
+            sharding=cfg.get('sharding', 'none')
         )
         
         count = db.get_collection_count()
         
         # Get a sample to see metadata structure
-        sample = db.collection.get(limit=10)
+        sample = db.get_documents_with_metadata(limit=10)
         
         print("\n" + "="*40)
         print("📊 VEKTÖR VERİ TABANI DURUMU")
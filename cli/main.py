@@ -4,16 +4,18 @@ import argparse
 import os
 import sys
 import yaml
+from collections import Counter
 from colorama import init, Fore, Style
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.document_parser import DocumentParser
-from core.text_processor import TextProcessor
+from core.parse_cache import ParseCache
 from core.ai_client_factory import AIClientFactory
-from core.question_generator import QuestionGenerator
-from core.dataset_writer import DatasetWriter
+from core.question_generator import QuestionGenerator, failure_reason
+from core.dataset_writer import DatasetWriter, iter_entries
+from core.parquet_writer import ParquetDatasetWriter
+from core.qa_dedup import QADeduplicator, DedupWriter
 from utils.progress import ProgressTracker
 from utils.checkpoint import CheckpointManager
 from utils.logger import setup_logger
@@ -28,6 +30,42 @@ def load_config(config_path: str) -> dict:
         return yaml.safe_load(f)
 
 
+def retry_failed(paragraphs, question_generator, checkpoint_manager, write_question, progress, logger,
+                 max_attempts, failure_counts, recovered_counts):
+    """Replay the failure queue of the checkpoint with escalating strategies.
+
+    A paragraph that has failed n times is retried with strategy n
+    (schema-constrained request, split paragraph, fewer questions; the last
+    one repeats), at most `max_attempts` times per run. Failures are counted
+    per reason in `failure_counts`, recoveries per strategy in
+    `recovered_counts`.
+    """
+    strategies = question_generator.RETRY_STRATEGIES
+    tries = Counter()
+    while True:
+        queue = [idx for idx in sorted(checkpoint_manager.get_failed())
+                 if idx < len(paragraphs) and tries[idx] < max_attempts]
+        if not queue:
+            return
+        for idx in queue:
+            attempts = checkpoint_manager.get_attempts(idx)
+            strategy = strategies[min(max(attempts, 1), len(strategies)) - 1]
+            tries[idx] += 1
+            try:
+                questions = question_generator.retry_questions(paragraphs[idx], strategy)
+            except Exception as e:
+                failure_counts[failure_reason(str(e))] += 1
+                logger.warning(f"Retry {tries[idx]} ({strategy}) of paragraph {idx+1} failed: {e}")
+                checkpoint_manager.mark_failed(idx, str(e))
+                continue
+            for question in questions:
+                write_question(idx, question)
+            progress.update(len(questions))
+            checkpoint_manager.save(idx)
+            recovered_counts[strategy] += 1
+            logger.info(f"Paragraph {idx+1} recovered with strategy '{strategy}': {len(questions)} questions")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='AI Eğitim Dokümanı Hazırlama - Dataset Generator'
@@ -41,6 +79,11 @@ def main():
         '--output', '-o',
         help='Output JSONL file path'
     )
+    parser.add_argument(
+        '--format',
+        choices=['jsonl', 'parquet'],
+        help='Output format (default: output.format from config)'
+    )
     parser.add_argument(
         '--config', '-c',
         default='config/config.yaml',
@@ -51,6 +94,11 @@ def main():
         action='store_true',
         help='Resume from checkpoint'
     )
+    parser.add_argument(
+        '--retry-failed',
+        action='store_true',
+        help='Only retry the paragraphs that failed in earlier runs (failure queue in the checkpoint)'
+    )
     parser.add_argument(
         '--clear-checkpoint',
         action='store_true',
@@ -89,6 +137,9 @@ def main():
         config['output']['directory'],
         config['output']['filename']
     )
+    output_format = args.format or config['output'].get('format', 'jsonl')
+    if output_format == 'parquet' and output_path.endswith('.jsonl'):
+        output_path = output_path[:-len('.jsonl')] + '.parquet'
     
     print(f"\n{Fore.CYAN}{'='*60}")
     print(f"{Fore.CYAN}AI Eğitim Dokümanı Hazırlama - Dataset Generator")
@@ -96,17 +147,13 @@ def main():
     
     # Parse document
     print(f"{Fore.YELLOW}📄 Doküman okunuyor: {args.input}{Style.RESET_ALL}")
+    # Parse and split into paragraphs (cached by file hash)
+    min_length = config['generation']['min_paragraph_length']
     try:
-        text = DocumentParser.parse(args.input)
-        logger.info(f"Document parsed: {len(text)} characters")
+        paragraphs = ParseCache.from_config(config.get('cache'), config.get('parser')).split(args.input, min_length=min_length)
     except Exception as e:
         print(f"{Fore.RED}✗ Doküman okunamadı: {e}{Style.RESET_ALL}")
         return 1
-    
-    # Split into paragraphs
-    print(f"{Fore.YELLOW}📝 Paragraflar ayrıştırılıyor...{Style.RESET_ALL}")
-    min_length = config['generation']['min_paragraph_length']
-    paragraphs = TextProcessor.split_into_paragraphs(text, min_length)
     print(f"{Fore.GREEN}✓ {len(paragraphs)} paragraf bulundu{Style.RESET_ALL}\n")
     logger.info(f"Found {len(paragraphs)} paragraphs")
     
@@ -117,9 +164,20 @@ def main():
     # Setup checkpoint
     checkpoint_manager = None
     if config['checkpoint']['enabled']:
+        # Settings that change the generated output are part of the checkpoint key
+        checkpoint_settings = {
+            "model_type": config['model'].get('type'),
+            "model_name": config['model'].get('name'),
+            "temperature": config['model'].get('temperature'),
+            "min_questions": config['generation']['min_questions_per_paragraph'],
+            "max_questions": config['generation']['max_questions_per_paragraph'],
+            "min_paragraph_length": min_length
+        }
         checkpoint_manager = CheckpointManager(
             config['checkpoint']['directory'],
-            args.input
+            args.input,
+            settings=checkpoint_settings,
+            save_interval=config['checkpoint'].get('save_interval', 1)
         )
         
         if args.clear_checkpoint:
@@ -129,6 +187,15 @@ def main():
         already_processed = checkpoint_manager.get_progress()
         if already_processed > 0 and args.resume:
             print(f"{Fore.CYAN}📌 Checkpoint bulundu: {already_processed} paragraf zaten işlenmiş{Style.RESET_ALL}\n")
+        failed_before = len(checkpoint_manager.get_failed())
+        if args.retry_failed:
+            print(f"{Fore.CYAN}📌 Yalnızca hata veren {failed_before} paragraf yeniden denenecek{Style.RESET_ALL}\n")
+        elif failed_before:
+            print(f"{Fore.CYAN}📌 Önceki çalıştırmada {failed_before} paragraf hata verdi, yeniden denenecek{Style.RESET_ALL}\n")
+    
+    elif args.retry_failed:
+        print(f"{Fore.RED}✗ --retry-failed için checkpoint etkin olmalı (checkpoint.enabled){Style.RESET_ALL}")
+        return 1
     
     # Create AI client
     print(f"{Fore.YELLOW}🤖 AI modeli bağlanıyor: {config['model']['type']} - {config['model']['name']}{Style.RESET_ALL}")
@@ -147,7 +214,14 @@ def main():
     question_generator = QuestionGenerator(
         ai_client,
         min_questions=config['generation']['min_questions_per_paragraph'],
-        max_questions=config['generation']['max_questions_per_paragraph']
+        max_questions=config['generation']['max_questions_per_paragraph'],
+        batch_tokens=config['generation'].get('batch_tokens', 0),
+        batch_max_paragraphs=config['generation'].get('batch_max_paragraphs', 8),
+        request_options={k: config['model'][k] for k in ('cache_prompt', 'id_slot', 'keep_alive')
+                         if k in config['model']},
+        structured_output=config['generation'].get('structured_output', False),
+        streaming=config['generation'].get('streaming', False),
+        stop_at_max=config['generation'].get('stream_stop_at_max', True)
     )
     
     # Setup progress tracker
@@ -159,37 +233,134 @@ def main():
     # Process paragraphs
     print(f"{Fore.CYAN}🚀 İşlem başlıyor...{Style.RESET_ALL}\n")
     
-    with DatasetWriter(output_path, append=config['output']['append_mode']) as writer:
-        for idx, paragraph in enumerate(paragraphs):
-            # Skip if already processed
-            if checkpoint_manager and checkpoint_manager.is_processed(idx):
-                continue
-            
-            try:
-                # Generate questions
-                questions = question_generator.generate_questions(paragraph)
-                
-                # Write to file
-                writer.write_batch(questions)
-                
-                # Update progress
-                progress.update(len(questions))
-                
-                # Save checkpoint
-                if checkpoint_manager:
-                    checkpoint_manager.save(idx)
-                
-                logger.debug(f"Processed paragraph {idx+1}/{len(paragraphs)}: {len(questions)} questions")
-                
-            except Exception as e:
-                logger.error(f"Error processing paragraph {idx+1}: {e}")
-                print(f"\n{Fore.RED}✗ Hata (paragraf {idx+1}): {e}{Style.RESET_ALL}")
-                continue
+    failure_counts = Counter()     # failures by reason category
+    recovered_counts = Counter()   # retried paragraphs recovered, by strategy
     
+    output_cfg = config['output']
+    try:
+        if output_format == 'parquet':
+            writer = ParquetDatasetWriter(
+                output_path,
+                append=output_cfg['append_mode'],
+                row_group_size=output_cfg.get('row_group_size', 10000),
+                rows_per_file=output_cfg.get('rows_per_file', 500000),
+                source=os.path.basename(args.input),
+                model=ai_client.resolved_model_name(),
+                compression=output_cfg.get('parquet_compression', 'zstd')
+            )
+        else:
+            writer = DatasetWriter(
+                output_path,
+                append=output_cfg['append_mode'],
+                flush_every=output_cfg.get('flush_every', 100),
+                flush_seconds=output_cfg.get('flush_seconds', 5),
+                shard_size_mb=output_cfg.get('shard_size_mb', 0),
+                compression=output_cfg.get('compression', 'none')
+            )
+    except (RuntimeError, ValueError) as e:
+        print(f"{Fore.RED}✗ Çıktı dosyası açılamadı: {e}{Style.RESET_ALL}")
+        return 1
+    deduplicator = None
+    if output_cfg.get('dedup', False):
+        # Near-duplicate Q/A pairs (also against a resumed JSONL output) are dropped before writing
+        deduplicator = QADeduplicator.from_config(output_cfg)
+        if output_cfg['append_mode'] and output_format == 'jsonl':
+            primed = deduplicator.prime(iter_entries(writer.result_path))
+            if primed:
+                print(f"{Fore.CYAN}📌 Tekrar filtresi mevcut {primed} kayıtla dolduruldu{Style.RESET_ALL}\n")
+        writer = DedupWriter(writer, deduplicator)
+    with writer:
+        # Dataset entries reach the disk before the checkpoint marks them done
+        if checkpoint_manager:
+            checkpoint_manager.before_sync.append(writer.sync)
+        # Skip already processed paragraphs
+        pending = [(idx, paragraph) for idx, paragraph in enumerate(paragraphs)
+                   if not (checkpoint_manager and checkpoint_manager.is_processed(idx))]
+        if args.retry_failed:
+            pending = []
+
+        # Questions are written as soon as they are final (while streaming, before the response ends)
+        written = Counter()
+        def write_question(idx, question):
+            writer.write(question, paragraph_index=idx)
+            written["questions"] += 1
+
+        # With generation.batch_tokens several short paragraphs share one request
+        for batch in question_generator.make_batches(pending):
+            results, errors = question_generator.generate_batch(batch, on_question=write_question)
+
+            for idx, _ in batch:
+                if idx in results:
+                    questions = results[idx]
+
+                    # Update progress
+                    progress.update(len(questions))
+
+                    # Save checkpoint
+                    if checkpoint_manager:
+                        checkpoint_manager.save(idx)
+
+                    logger.debug(f"Processed paragraph {idx+1}/{len(paragraphs)}: {len(questions)} questions")
+                else:
+                    e = errors.get(idx, 'No questions generated')
+                    logger.error(f"Error processing paragraph {idx+1}: {e}")
+                    print(f"\n{Fore.RED}✗ Hata (paragraf {idx+1}): {e}{Style.RESET_ALL}")
+                    failure_counts[failure_reason(str(e))] += 1
+                    if checkpoint_manager:
+                        checkpoint_manager.mark_failed(idx, str(e))
+
+        # Replay the failure queue: schema-constrained request, split paragraph, fewer questions
+        generation_cfg = config['generation']
+        if checkpoint_manager and checkpoint_manager.get_failed() and \
+                (args.retry_failed or generation_cfg.get('retry_failed', True)):
+            print(f"\n{Fore.CYAN}🔁 {len(checkpoint_manager.get_failed())} paragraf yeniden deneniyor...{Style.RESET_ALL}")
+            retry_failed(paragraphs, question_generator, checkpoint_manager, write_question, progress, logger,
+                         generation_cfg.get('retry_max_attempts', 3), failure_counts, recovered_counts)
+
     # Finish
+    failed = {}
+    if checkpoint_manager:
+        checkpoint_manager.close()
+        failed = checkpoint_manager.get_failed()
+        if failed:
+            print(f"{Fore.YELLOW}⚠ {len(failed)} paragraf hata verdi, checkpoint'e kaydedildi "
+                  f"(--retry-failed ile yeniden denenebilir): {checkpoint_manager.checkpoint_file}{Style.RESET_ALL}")
     progress.finish()
-    print(f"{Fore.GREEN}✓ Dataset başarıyla oluşturuldu: {output_path}{Style.RESET_ALL}\n")
-    
+    # Every question counted in the summary must have gone through the writer
+    count_mismatch = written["questions"] != progress.total_questions
+    if count_mismatch:
+        print(f"{Fore.RED}✗ Yazılan soru sayısı ({written['questions']}) özetteki toplamla "
+              f"({progress.total_questions}) uyuşmuyor{Style.RESET_ALL}")
+        logger.error(f"Questions written ({written['questions']}) != questions reported ({progress.total_questions})")
+    if failure_counts:
+        print("  Hata nedenleri: " + ", ".join(f"{reason}={count}" for reason, count in failure_counts.most_common()))
+        logger.info(f"Failures by reason: {dict(failure_counts)}")
+    if recovered_counts:
+        print("  Yeniden denemede kurtarılan: " +
+              ", ".join(f"{strategy}={count}" for strategy, count in recovered_counts.items()))
+        logger.info(f"Recovered by strategy: {dict(recovered_counts)}")
+    if deduplicator:
+        dedup = deduplicator.summary()
+        print(f"  Yakın tekrar: {dedup['duplicates']}/{dedup['seen']} soru atlandı (%{100 * dedup['duplicate_rate']:.1f})")
+        logger.info(f"Q/A dedup: {dedup}")
+    prefill = question_generator.prefill_summary()
+    if prefill["requests"]:
+        line = (f"  Prompt: {prefill['prompt_tokens_per_paragraph']:.0f} token/paragraf, "
+                f"önbellekten {prefill['cached_tokens_per_paragraph']:.0f} token/paragraf")
+        if prefill["prefill_ms_per_paragraph"] is not None:
+            line += f", prefill {prefill['prefill_ms_per_paragraph']:.0f} ms/paragraf"
+        print(line)
+    parsing = question_generator.parse_summary()
+    if parsing["responses"]:
+        mode = "şema kısıtlı" if parsing["structured"] else "serbest"
+        print(f"  Ayrıştırma hatası ({mode}): {parsing['parse_failures']}/{parsing['responses']} "
+              f"yanıt (%{100 * parsing['failure_rate']:.1f})")
+        logger.info(f"Parse failures: {parsing}")
+    if failed or (not checkpoint_manager and failure_counts) or count_mismatch:
+        print(f"{Fore.YELLOW}⚠ Dataset eksik oluşturuldu: {writer.result_path}{Style.RESET_ALL}\n")
+        # Distinct from 1 (could not run): the dataset exists but paragraphs are missing
+        return 2
+    print(f"{Fore.GREEN}✓ Dataset başarıyla oluşturuldu: {writer.result_path}{Style.RESET_ALL}\n")
     return 0
 
 
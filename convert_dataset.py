@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Convert a JSONL dataset (plain, gzip/zstd or sharded) to Parquet.
+
+Entries without source / paragraph_index / model fields get the values
+given on the command line. With --compare, loading the JSONL input and the
+Parquet output is timed once each.
+"""
+import os
+import json
+import time
+import argparse
+from core.dataset_writer import iter_entries, dataset_files, open_dataset_file
+from core.parquet_writer import ParquetDatasetWriter
+
+
+def load_jsonl(path):
+    rows = 0
+    for file_path in dataset_files(path):
+        with open_dataset_file(file_path) as f:
+            rows += sum(1 for line in f if line.strip() and json.loads(line))
+    return rows
+
+
+def load_parquet(manifest_path):
+    import pyarrow.parquet as pq
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        parts = json.load(f)['shards']
+    directory = os.path.dirname(manifest_path)
+    return sum(pq.read_table(os.path.join(directory, p['file']), memory_map=True).num_rows for p in parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert a JSONL dataset to Parquet.')
+    parser.add_argument('--input', '-i', required=True, help='JSONL file, compressed file or dataset manifest')
+    parser.add_argument('--output', '-o', help='Parquet output path (default: input with .parquet)')
+    parser.add_argument('--source', default='', help='Source for entries without one')
+    parser.add_argument('--model', default='', help='Model for entries without one')
+    parser.add_argument('--row-group-size', type=int, default=10000, help='Rows per row group (default: 10000)')
+    parser.add_argument('--rows-per-file', type=int, default=500000, help='Rows per Parquet part (default: 500000)')
+    parser.add_argument('--compression', default='zstd', help='Parquet compression codec (default: zstd)')
+    parser.add_argument('--compare', action='store_true', help='Time loading the JSONL input and the Parquet output')
+    args = parser.parse_args()
+
+    output = args.output
+    if not output:
+        output = args.input
+        for suffix in ('.manifest.json', '.gz', '.zst', '.jsonl'):
+            if output.endswith(suffix):
+                output = output[:-len(suffix)]
+        output += '.parquet'
+
+    start = time.perf_counter()
+    with ParquetDatasetWriter(output, append=False, row_group_size=args.row_group_size,
+                              rows_per_file=args.rows_per_file, source=args.source,
+                              model=args.model, compression=args.compression) as writer:
+        for entry in iter_entries(args.input):
+            writer.write(entry)
+    rows = sum(p['records'] for p in writer.parts)
+    print(f"✓ {rows} kayıt dönüştürüldü ({time.perf_counter() - start:.2f} sn): {writer.result_path}")
+
+    if args.compare:
+        start = time.perf_counter()
+        load_jsonl(args.input)
+        jsonl_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        load_parquet(writer.result_path)
+        parquet_seconds = time.perf_counter() - start
+        print(f"JSONL yükleme: {jsonl_seconds:.3f} sn, Parquet yükleme: {parquet_seconds:.3f} sn")
+
+
+if __name__ == "__main__":
+    main()
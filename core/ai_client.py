@@ -1,10 +1,21 @@
 """Abstract base class for AI clients."""
+import json
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Optional
+
+# HTTP statuses of servers that do not support options["json_schema"]
+SCHEMA_REJECTED_STATUS = (400, 422, 501)
+
+
+class SchemaUnsupported(RuntimeError):
+    """The server rejected the request's json_schema (structured output not supported)."""
 
 
 class AIClient(ABC):
     """Abstract base class for AI model clients."""
+
+    # Honors options["json_schema"] (schema-constrained decoding)
+    supports_json_schema = False
     
     def __init__(self, config: Dict[str, Any]):
         self.config = config
@@ -19,11 +30,59 @@ class AIClient(ABC):
         self.system_prompt = config.get('system_prompt', '')
         self.json_mode = config.get('json_mode', False)
         self.json_wrapper = config.get('json_wrapper', '')
+        # Some chat templates reject the system role; then it is glued to the user message
+        self.merge_system_prompt = config.get('merge_system_prompt', False)
+
+    def resolved_model_name(self) -> str:
+        """Name of the model requests are actually sent to (e.g. for dataset labels)."""
+        return self.model_name
+
+    def build_messages(self, prompt: str) -> list:
+        """Chat messages with the system prompt as a separate leading message.
+
+        Keeping static content first lets the backend reuse the cached prompt
+        prefix between requests.
+        """
+        if not (self.use_system_prompt and self.system_prompt):
+            return [{"role": "user", "content": prompt}]
+        if self.merge_system_prompt:
+            return [{"role": "user", "content": f"{self.system_prompt}\n\n{prompt}"}]
+        return [{"role": "system", "content": self.system_prompt}, {"role": "user", "content": prompt}]
     
+    @staticmethod
+    def schema_rejected(error: Exception, options: Optional[Dict[str, Any]]) -> bool:
+        """Whether a failed request was the server refusing options["json_schema"]."""
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+        return bool((options or {}).get('json_schema')) and status in SCHEMA_REJECTED_STATUS
+
+    @staticmethod
+    def iter_sse_content(response) -> Iterator[str]:
+        """Text deltas of an OpenAI-compatible `stream: true` chat completion response."""
+        for line in response.iter_lines():
+            if not line:
+                continue
+            line_text = line.decode('utf-8')
+            if not line_text.startswith('data: '):
+                continue
+            data_str = line_text[6:].strip()
+            if data_str == '[DONE]':
+                break
+            try:
+                data = json.loads(data_str)
+            except json.JSONDecodeError:
+                continue
+            choices = data.get('choices') or [{}]
+            chunk_text = (choices[0].get('delta') or {}).get('content')
+            if chunk_text:
+                yield chunk_text
+
     @abstractmethod
     def generate(self, prompt: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
         """Generate response from AI model with optional parameter overrides.
         Returns: {"text": str, "usage": {"prompt_tokens": int, "completion_tokens": int}}
+        Usage may also carry "cached_tokens" and "prefill_ms" when the backend reports them.
+        Backend hints in options: cache_prompt / id_slot (llama.cpp), keep_alive (Ollama),
+        json_schema (constrained output, see supports_json_schema).
         """
         pass
 
@@ -5,6 +5,7 @@ from core.ollama_client import OllamaClient
 from core.lmstudio_client import LMStudioClient
 from core.openai_client import OpenAIClient
 from core.llamacpp_client import LlamaCppClient
+from core.fake_client import FakeAIClient
 
 
 class AIClientFactory:
@@ -23,5 +24,7 @@ class AIClientFactory:
             return OpenAIClient(config)
         elif model_type == 'llamacpp':
             return LlamaCppClient(config)
+        elif model_type == 'fake':
+            return FakeAIClient(config)
         else:
             raise ValueError(f"Unsupported model type: {model_type}")
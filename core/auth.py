@@ -4,7 +4,9 @@ from flask_login import login_user, logout_user
 from core.models import db, User
 import requests
 import logging
+import hmac
 import os
+import re
 
 # Allow insecure transport for local dev (required for HTTP)
 # Allow insecure transport for local dev (required for HTTP)
@@ -85,3 +87,28 @@ def handle_google_callback():
             
         return True
     return False
+
+def handle_test_login():
+    """Log in a throwaway load-test user (load_test_ask.py), creating it if needed.
+
+    Disabled unless the LOAD_TEST_TOKEN environment variable is set; the
+    request must send the same value in the X-Load-Test-Token header. Test
+    users are never admins. Do not set LOAD_TEST_TOKEN on a public server.
+    """
+    from flask import request
+    token = os.getenv('LOAD_TEST_TOKEN')
+    if not token or not hmac.compare_digest(request.headers.get('X-Load-Test-Token', ''), token):
+        return None
+
+    name = (request.get_json(silent=True) or {}).get('name', 'loadtest')
+    if not re.fullmatch(r'[A-Za-z0-9_-]{1,40}', name):
+        return None
+    google_id = f"loadtest:{name}"
+    user = User.query.filter_by(google_id=google_id).first()
+    if not user:
+        user = User(google_id=google_id, email=f"{name}@loadtest.invalid", name=name)
+        db.session.add(user)
+        db.session.commit()
+        logger.info(f"Load-test user created: {name}")
+    login_user(user)
+    return user
@@ -0,0 +1,94 @@
+"""ChromaDB vector backend implementation."""
+import os
+import logging
+import chromadb
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+from .vector_backend import VectorBackend
+
+logger = logging.getLogger(__name__)
+
+# HNSW sync threshold used while bulk loading a fresh collection
+BULK_SYNC_THRESHOLD = 1_000_000
+
+
+class ChromaBackend(VectorBackend):
+    """Persistent ChromaDB collection (HNSW index + SQLite metadata)."""
+
+    def __init__(self, db_path: str, collection_name: str, client=None):
+        super().__init__(db_path, collection_name)
+        os.makedirs(db_path, exist_ok=True)
+
+        # Shards share one client per path
+        self.client = client or chromadb.PersistentClient(path=db_path)
+        self.collection = self.client.get_or_create_collection(name=collection_name)
+
+    @property
+    def max_batch_size(self) -> Optional[int]:
+        return self.client.get_max_batch_size()
+
+    @contextmanager
+    def bulk(self, defer_index: bool = False):
+        """On an empty collection, optionally keep new vectors out of the persisted
+        HNSW index until the load finishes instead of syncing every few thousand adds."""
+        if not defer_index or self.collection.count() > 0:
+            yield
+            return
+        hnsw = (self.collection.configuration or {}).get('hnsw') or {}
+        previous = hnsw.get('sync_threshold')
+        try:
+            self.collection.modify(configuration={"hnsw": {"sync_threshold": BULK_SYNC_THRESHOLD}})
+        except Exception as e:
+            logger.warning(f"Could not defer index building: {e}")
+            previous = None
+        try:
+            yield
+        finally:
+            if previous is not None:
+                self.collection.modify(configuration={"hnsw": {"sync_threshold": previous}})
+
+    def add(self, documents: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]], ids: List[str]):
+        step = self.max_batch_size or len(ids) or 1
+        for start in range(0, len(ids), step):
+            end = start + step
+            self.collection.add(
+                documents=documents[start:end],
+                embeddings=embeddings[start:end],
+                metadatas=metadatas[start:end],
+                ids=ids[start:end]
+            )
+
+    def search(self, query_embedding: List[float], n_results: int, where: Optional[Dict] = None) -> Dict[str, Any]:
+        return self.collection.query(
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            where=where
+        )
+
+    def get(self, where: Optional[Dict] = None, where_document: Optional[Dict] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: Optional[List[str]] = None) -> Dict[str, Any]:
+        return self.collection.get(
+            where=where,
+            where_document=where_document,
+            limit=limit,
+            offset=offset,
+            include=include or ['documents', 'metadatas']
+        )
+
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    def delete(self, where: Optional[Dict] = None, ids: Optional[List[str]] = None):
+        self.collection.delete(ids=ids, where=where)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def reset(self):
+        name = self.collection.name
+        self.client.delete_collection(name)
+        self.collection = self.client.create_collection(name=name)
+
+    def drop(self):
+        self.client.delete_collection(self.collection.name)
@@ -1,40 +1,302 @@
 """Dataset writer for JSONL format."""
-import json
+import io
 import os
-from typing import Dict, Any, List
+import json
+import time
+import gzip
+from typing import Dict, Any, List, Iterator, Optional
+
+COMPRESSION_SUFFIXES = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression requires the 'zstandard' package (pip install zstandard)")
+    return zstandard
+
+
+def manifest_path_for(output_path: str) -> str:
+    """`data/output/dataset.jsonl` -> `data/output/dataset.manifest.json`."""
+    stem = os.path.basename(output_path)
+    for suffix in ('.gz', '.zst', '.jsonl'):
+        if stem.endswith(suffix):
+            stem = stem[:-len(suffix)]
+    return os.path.join(os.path.dirname(output_path), f"{stem}.manifest.json")
+
+
+def open_dataset_file(path: str) -> io.TextIOBase:
+    """Open a plain, gzip or zstd JSONL file for reading (by suffix)."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.endswith('.zst'):
+        raw = open(path, 'rb')
+        reader = _zstd().ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(reader, encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def dataset_files(path: str) -> List[str]:
+    """Files making up a dataset: the shards listed in its manifest, or the file itself."""
+    manifest_path = path if path.endswith('.manifest.json') else manifest_path_for(path)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        directory = os.path.dirname(manifest_path)
+        return [os.path.join(directory, shard['file']) for shard in manifest.get('shards', [])]
+    return [path]
+
+
+def iter_entries(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield entries of a dataset (single file, compressed file or sharded manifest).
+
+    A torn last line left by a crash is skipped.
+    """
+    for file_path in dataset_files(path):
+        if not os.path.exists(file_path):
+            continue
+        with open_dataset_file(file_path) as f:
+            try:
+                for line in f:
+                    if line.endswith('\n') and line.strip():
+                        yield json.loads(line)
+            except EOFError:
+                # Compressed stream cut off mid-block
+                continue
 
 
 class DatasetWriter:
-    """Write dataset entries to JSONL file."""
-    
-    def __init__(self, output_path: str, append: bool = True):
+    """Write dataset entries to JSONL files.
+
+    Entries are buffered and written every `flush_every` entries or
+    `flush_seconds` seconds instead of once per line; `sync()` (called at
+    checkpoint boundaries) writes the buffer and fsyncs it. With
+    `shard_size_mb` the output rotates into `dataset-00001.jsonl[.gz|.zst]`
+    shards, and with sharding or compression a manifest
+    (`dataset.manifest.json`) records the entries in every shard.
+    """
+
+    def __init__(self, output_path: str, append: bool = True, flush_every: int = 100,
+                 flush_seconds: float = 5.0, shard_size_mb: float = 0, compression: str = 'none'):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unsupported compression: {compression}")
+        if compression == 'zstd':
+            _zstd()
         self.output_path = output_path
         self.append = append
-        
+        self.flush_every = max(1, int(flush_every or 1))
+        self.flush_seconds = flush_seconds
+        self.shard_bytes = int(shard_size_mb * 1024 * 1024) if shard_size_mb else 0
+        self.compression = compression
+        self.use_manifest = bool(self.shard_bytes) or compression != 'none'
+        self.manifest_path = manifest_path_for(output_path)
+
+        self.buffer: List[str] = []
+        self.last_flush = time.time()
+        self.shards: List[Dict[str, Any]] = []
+        self.raw = None
+        self.stream = None
+        self.closed = False
+
         # Create directory if not exists
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        # Open file in append or write mode
-        mode = 'a' if append and os.path.exists(output_path) else 'w'
-        self.file = open(output_path, mode, encoding='utf-8')
-    
-    def write(self, entry: Dict[str, Any]):
-        """Write a single entry to JSONL file."""
-        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
-        self.file.flush()
-    
-    def write_batch(self, entries: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+        if append:
+            self._load_manifest()
+        else:
+            self._remove_existing()
+        self._open_shard(resume=append)
+
+    # --- Shards and manifest ---
+
+    @property
+    def result_path(self) -> str:
+        """Where the dataset can be found: the manifest, or the single output file."""
+        return self.manifest_path if self.use_manifest else self._shard_file(1)
+
+    def _shard_file(self, number: int) -> str:
+        suffix = COMPRESSION_SUFFIXES[self.compression]
+        if not self.shard_bytes:
+            return self.output_path + suffix
+        root, ext = os.path.splitext(self.output_path)
+        return f"{root}-{number:05d}{ext or '.jsonl'}{suffix}"
+
+    def _load_manifest(self):
+        if not self.use_manifest or not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('compression', 'none') != self.compression:
+            raise ValueError(f"Existing dataset uses {manifest.get('compression')} compression, "
+                             f"not {self.compression}: {self.manifest_path}")
+        self.shards = manifest.get('shards', [])
+
+    def _remove_existing(self):
+        for file_path in dataset_files(self.output_path) + [self._shard_file(1)]:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        if os.path.exists(self.manifest_path):
+            os.remove(self.manifest_path)
+
+    def _recover(self, file_path: str) -> int:
+        """Rewrite the complete entries of a shard left open by a crash and count them.
+
+        An unterminated gzip member or zstd frame cannot be appended to, and
+        a torn last line would corrupt the next entry.
+        """
+        tmp = file_path + '.tmp'
+        raw = open(tmp, 'wb')
+        stream = self._wrap(raw)
+        count = 0
+        try:
+            with open_dataset_file(file_path) as f:
+                for line in f:
+                    if not line.endswith('\n'):
+                        break
+                    stream.write(line.encode('utf-8'))
+                    count += 1
+        except Exception:
+            # Cut off mid-block: keep what could be decoded
+            pass
+        self._finish(stream, raw)
+        raw.close()
+        os.replace(tmp, file_path)
+        return count
+
+    @staticmethod
+    def _trim_torn_line(file_path: str):
+        """Cut a partial last line from a plain JSONL file without reading all of it."""
+        with open(file_path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                start = max(0, pos - (1 << 16))
+                f.seek(start)
+                newline = f.read(pos - start).rfind(b'\n')
+                if newline != -1:
+                    pos = start + newline + 1
+                    break
+                pos = start
+            if pos != end:
+                f.truncate(pos)
+
+    def _wrap(self, raw):
+        if self.compression == 'gzip':
+            return gzip.GzipFile(fileobj=raw, mode='ab')
+        if self.compression == 'zstd':
+            return _zstd().ZstdCompressor(level=3).stream_writer(raw, closefd=False)
+        return raw
+
+    def _finish(self, stream, raw):
+        """End the compressed stream (a complete gzip member / zstd frame) and fsync."""
+        if stream is not raw:
+            stream.close()
+        raw.flush()
+        os.fsync(raw.fileno())
+
+    def _open_shard(self, resume: bool = False):
+        if resume and self.shards and not self.shards[-1].get('closed'):
+            shard = self.shards[-1]
+        elif resume and not self.use_manifest:
+            shard = {"file": os.path.basename(self._shard_file(1)), "records": 0}
+            self.shards = [shard]
+        else:
+            shard = {"file": os.path.basename(self._shard_file(len(self.shards) + 1)), "records": 0}
+            self.shards.append(shard)
+
+        file_path = os.path.join(os.path.dirname(self.output_path), shard['file'])
+        if os.path.exists(file_path):
+            if not self.use_manifest:
+                self._trim_torn_line(file_path)
+            elif not (shard.get('clean') and os.path.getsize(file_path) == shard.get('bytes')):
+                # Not closed cleanly, or written to after the manifest was saved
+                shard['records'] = self._recover(file_path)
+        self.raw = open(file_path, 'ab')
+        self.stream = self._wrap(self.raw)
+        shard['closed'] = False
+        shard['clean'] = False
+        if self.shard_bytes and self.raw.tell() >= self.shard_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._finish(self.stream, self.raw)
+        self.shards[-1].update(bytes=self.raw.tell(), closed=True, clean=True)
+        self.raw.close()
+        self._save_manifest()
+        self._open_shard()
+
+    def _save_manifest(self):
+        if not self.use_manifest:
+            return
+        manifest = {
+            "format": "jsonl",
+            "compression": self.compression,
+            "shard_size_mb": self.shard_bytes / (1024 * 1024) if self.shard_bytes else 0,
+            "records": sum(s['records'] for s in self.shards),
+            "shards": self.shards
+        }
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.manifest_path)
+
+    # --- Writing ---
+
+    def write(self, entry: Dict[str, Any], paragraph_index: Optional[int] = None):
+        """Buffer a single entry; the buffer is written every flush_every entries / flush_seconds.
+
+        `paragraph_index` is only stored by the columnar writer; JSONL entries
+        keep the training format.
+        """
+        self.buffer.append(json.dumps(entry, ensure_ascii=False) + '\n')
+        if len(self.buffer) >= self.flush_every or time.time() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def write_batch(self, entries: List[Dict[str, Any]], paragraph_index: Optional[int] = None):
         """Write multiple entries to JSONL file."""
         for entry in entries:
-            self.write(entry)
-    
+            self.write(entry, paragraph_index)
+
+    def flush(self):
+        """Hand buffered entries to the OS (no fsync), rotating shards when they fill up."""
+        if self.closed:
+            return
+        for line in self.buffer:
+            self.stream.write(line.encode('utf-8'))
+            self.shards[-1]['records'] += 1
+            if self.shard_bytes and self.raw.tell() >= self.shard_bytes:
+                self._rotate()
+        self.buffer = []
+        self.last_flush = time.time()
+        if self.stream is not self.raw:
+            self.stream.flush()
+        self.raw.flush()
+
+    def sync(self):
+        """Make everything written so far durable (checkpoint boundary)."""
+        if self.closed:
+            return
+        # flush() ends with a gzip sync flush / zstd block flush, so the file
+        # is decodable up to here even if the stream is never terminated
+        self.flush()
+        os.fsync(self.raw.fileno())
+        self.shards[-1]['bytes'] = self.raw.tell()
+        self._save_manifest()
+
     def close(self):
-        """Close the file."""
-        if self.file:
-            self.file.close()
-    
+        """Write the buffer, close the current shard and the manifest."""
+        if self.closed or self.raw is None:
+            return
+        self.flush()
+        self._finish(self.stream, self.raw)
+        self.shards[-1].update(bytes=self.raw.tell(), clean=True)
+        self.raw.close()
+        self._save_manifest()
+        self.closed = True
+
     def __enter__(self):
         return self
-    
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
@@ -0,0 +1,133 @@
+"""MinHash + LSH near-duplicate detection for text chunks."""
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Prime just above 2^32; with 32-bit shingle hashes and a, b < 2^31, a*h+b fits in uint64
+_PRIME = np.uint64(4294967311)
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+# Signature value of a text without word tokens
+_EMPTY = np.iinfo(np.uint32).max
+
+
+def normalize_text(text: str) -> List[str]:
+    """Lowercase (Turkish aware) and tokenize into words."""
+    text = text.replace('I', 'ı').replace('İ', 'i').lower()
+    return _WORD_RE.findall(text)
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """Hashed word n-grams of a text. Short texts fall back to single words."""
+    words = normalize_text(text)
+    if len(words) < size:
+        grams = words
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return {zlib.crc32(g.encode('utf-8')) for g in grams}
+
+
+def lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Pick (bands, rows) whose S-curve midpoint (1/b)^(1/r) is closest to threshold."""
+    best = (num_perm, 1)
+    best_err = float('inf')
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if bands < 1:
+            break
+        err = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if err < best_err:
+            best, best_err = (bands, rows), err
+    return best
+
+
+def _is_empty(signature: np.ndarray) -> bool:
+    return bool(signature[0] == _EMPTY and (signature == _EMPTY).all())
+
+
+class NearDuplicateIndex:
+    """In-memory MinHash LSH index.
+
+    Texts whose estimated Jaccard similarity over word shingles reaches
+    `threshold` are reported as near-duplicates. `max_items` bounds memory by
+    forgetting the oldest entries first.
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 128, shingle_size: int = 3,
+                 max_items: Optional[int] = None, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.max_items = max_items
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 31, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 31, num_perm, dtype=np.uint64)
+
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._signatures
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature; all values are uint32 max for a text without word tokens."""
+        hashes = np.fromiter(shingles(text, self.shingle_size), dtype=np.uint64)
+        if hashes.size == 0:
+            return np.full(self.num_perm, _EMPTY, dtype=np.uint32)
+        values = (np.outer(hashes, self._a) + self._b) % _PRIME
+        return values.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def query(self, signature: np.ndarray) -> Optional[Tuple[str, float]]:
+        """Most similar indexed key at or above the threshold, with its estimated similarity.
+
+        Texts without word tokens all share one signature, so they never match.
+        """
+        if _is_empty(signature):
+            return None
+        candidates = set()
+        for band, key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(key, ()))
+
+        best = None
+        for cand in candidates:
+            similarity = float(np.mean(self._signatures[cand] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (cand, similarity)
+        return best
+
+    def add(self, key: str, signature: np.ndarray):
+        if key in self._signatures or _is_empty(signature):
+            return
+        self._signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, []).append(key)
+        if self.max_items is not None and len(self._signatures) > self.max_items:
+            self.remove(next(iter(self._signatures)))
+
+    def remove(self, key: str):
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, band_key in self._band_keys(signature):
+            bucket = self._buckets[band].get(band_key)
+            if bucket and key in bucket:
+                bucket.remove(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+
+    def add_if_new(self, key: str, text: str) -> Optional[Tuple[str, float]]:
+        """Index `text` unless it near-duplicates an indexed one; return that match instead."""
+        signature = self.signature(text)
+        match = self.query(signature)
+        if match is None:
+            self.add(key, signature)
+        return match
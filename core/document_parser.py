@@ -1,15 +1,29 @@
 """Document parser for PDF, DOCX, and TXT files."""
 import os
-from typing import Optional
+import posixpath
+import zipfile
+from typing import Dict, Iterator
 import fitz  # pymupdf
-from docx import Document
+from lxml import etree
+from tabulate import tabulate
+
+# WordprocessingML namespaces used by the streaming DOCX parser
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+V_NS = 'urn:schemas-microsoft-com:vml'
+MC_NS = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
 
 
 class DocumentParser:
     """Parse various document formats and extract text."""
     
+    # 'auto' runs table detection only on pages with ruling lines
+    TABLE_MODES = ('auto', 'always', 'never')
+    
     @staticmethod
-    def parse(file_path: str, mode: str = 'paragraph') -> str:
+    def parse(file_path: str, mode: str = 'paragraph', tables: str = 'auto') -> str:
         """Parse document and return text content."""
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
@@ -17,7 +31,7 @@ class DocumentParser:
         ext = os.path.splitext(file_path)[1].lower()
         
         if ext == '.pdf':
-            return DocumentParser._parse_pdf(file_path, mode)
+            return DocumentParser._parse_pdf(file_path, mode, tables)
         elif ext in ['.docx', '.doc']:
             return DocumentParser._parse_docx(file_path)
         elif ext == '.txt':
@@ -26,8 +40,40 @@ class DocumentParser:
             raise ValueError(f"Unsupported file format: {ext}")
     
     @staticmethod
-    def _parse_pdf(file_path: str, mode: str = 'paragraph') -> str:
+    def _has_table_lines(page, min_edges: int = 2) -> bool:
+        """Cheap pre-check for find_tables: does the page draw horizontal and vertical rules?
+
+        find_tables() uses the default 'lines' strategy, which builds cells from
+        vector line drawings only, so a page without both kinds of ruling
+        lines cannot yield a table.
+        """
+        horizontal = vertical = 0
+        for path in page.get_cdrawings():
+            for item in path['items']:
+                if item[0] == 'l':
+                    (x0, y0), (x1, y1) = item[1], item[2]
+                    if abs(y0 - y1) < 1:
+                        horizontal += 1
+                    elif abs(x0 - x1) < 1:
+                        vertical += 1
+                elif item[0] == 're':
+                    rect = fitz.Rect(item[1])
+                    if rect.height < 3:
+                        horizontal += 1
+                    elif rect.width < 3:
+                        vertical += 1
+                    else:
+                        horizontal += 2
+                        vertical += 2
+                if horizontal >= min_edges and vertical >= min_edges:
+                    return True
+        return False
+    
+    @staticmethod
+    def _parse_pdf(file_path: str, mode: str = 'paragraph', tables: str = 'auto') -> str:
         """Extract text, tables, and images from PDF using pymupdf."""
+        if tables not in DocumentParser.TABLE_MODES:
+            raise ValueError(f"Unsupported tables mode: {tables}")
         text_blocks = []
         try:
             doc = fitz.open(file_path)
@@ -43,9 +89,12 @@ class DocumentParser:
                 if mode == 'page':
                     page_content.append(f"--- SAYFA {page_index + 1} ---")
                 
-                # 1. Extract tables first
-                tabs = page.find_tables()
-                table_areas = [t.bbox for t in tabs.tables]
+                # 1. Extract tables first (skipped on pages without ruling lines in auto mode)
+                if tables == 'always' or (tables == 'auto' and DocumentParser._has_table_lines(page)):
+                    page_tables = page.find_tables().tables
+                else:
+                    page_tables = []
+                table_areas = [t.bbox for t in page_tables]
                 
                 # 2. Extract text blocks - using default extraction flags
                 # Default flags preserve the best mapping for custom Turkish fonts
@@ -69,7 +118,7 @@ class DocumentParser:
                             page_content.append(content)
                 
                 # 3. Add extracted tables as Markdown
-                for tab in tabs.tables:
+                for tab in page_tables:
                     df = tab.to_pandas()
                     if not df.empty:
                         md_table = "\n\n" + df.to_markdown(index=False) + "\n\n"
@@ -105,9 +154,136 @@ class DocumentParser:
     
     @staticmethod
     def _parse_docx(file_path: str) -> str:
-        """Extract text from DOCX."""
-        doc = Document(file_path)
-        return "\n".join([para.text for para in doc.paragraphs if para.text.strip()])
+        """Extract paragraphs, tables and images from DOCX."""
+        return "\n\n".join(DocumentParser.iter_docx_blocks(file_path))
+    
+    @staticmethod
+    def _docx_image_targets(archive: zipfile.ZipFile) -> Dict[str, str]:
+        """Map relationship ids of word/document.xml to media paths inside the archive."""
+        try:
+            rels = etree.fromstring(archive.read('word/_rels/document.xml.rels'))
+        except KeyError:
+            return {}
+        targets = {}
+        for rel in rels.iter(f'{{{PKG_REL_NS}}}Relationship'):
+            if rel.get('Type', '').endswith('/image') and rel.get('TargetMode') != 'External':
+                targets[rel.get('Id')] = posixpath.normpath(posixpath.join('word', rel.get('Target')))
+        return targets
+    
+    @staticmethod
+    def iter_docx_blocks(file_path: str) -> Iterator[str]:
+        """Stream word/document.xml with iterparse and yield blocks in document order.
+        
+        Paragraphs become text blocks, tables Markdown tables and embedded
+        images `[GÖRSEL: ...]` markers, as in the PDF path. Processed elements
+        are freed as we go, so memory stays flat regardless of document size.
+        """
+        w = f'{{{W_NS}}}'
+        basename = os.path.splitext(os.path.basename(file_path))[0]
+        img_dir = os.path.join('data', 'images', basename)
+        
+        with zipfile.ZipFile(file_path) as archive:
+            images = DocumentParser._docx_image_targets(archive)
+            saved = {}
+            
+            def image_marker(rel_id):
+                target = images.get(rel_id)
+                if not target:
+                    return None
+                if target not in saved:
+                    os.makedirs(img_dir, exist_ok=True)
+                    img_filename = f"image_n{len(saved) + 1}{posixpath.splitext(target)[1]}"
+                    with open(os.path.join(img_dir, img_filename), 'wb') as f:
+                        f.write(archive.read(target))
+                    saved[target] = f"[GÖRSEL: data/images/{basename}/{img_filename}]"
+                return saved[target]
+            
+            # Open tables, innermost last: each has its own rows, current row and cell
+            tables = []
+            # Images inside table cells, emitted after the outermost table
+            table_images = []
+            # Text box paragraphs nest inside a run of the outer paragraph
+            para_depth = 0
+            # mc:Fallback repeats mc:Choice content (e.g. VML copies of text boxes)
+            fallback_depth = 0
+            text, markers = [], []
+            
+            with archive.open('word/document.xml') as xml:
+                for event, elem in etree.iterparse(xml, events=('start', 'end')):
+                    tag = elem.tag
+                    if event == 'start':
+                        if tag == f'{{{MC_NS}}}Fallback':
+                            fallback_depth += 1
+                        elif fallback_depth:
+                            pass
+                        elif tag == f'{w}tbl':
+                            tables.append({"rows": [], "row": [], "cell": []})
+                        elif tag == f'{w}p':
+                            para_depth += 1
+                        elif tag == f'{{{A_NS}}}blip':
+                            markers.append(elem.get(f'{{{R_NS}}}embed'))
+                        elif tag == f'{{{V_NS}}}imagedata':
+                            markers.append(elem.get(f'{{{R_NS}}}id'))
+                        continue
+                    
+                    if tag == f'{{{MC_NS}}}Fallback':
+                        fallback_depth -= 1
+                    elif fallback_depth:
+                        continue
+                    elif tag == f'{w}t':
+                        text.append(elem.text or '')
+                    elif tag == f'{w}tab':
+                        text.append('\t')
+                    elif tag in (f'{w}br', f'{w}cr'):
+                        text.append('\n')
+                    elif tag == f'{w}p' and para_depth > 1:
+                        para_depth -= 1
+                        text.append('\n')
+                        continue
+                    elif tag == f'{w}p':
+                        para_depth -= 1
+                        para = ''.join(text).strip()
+                        found = [m for m in (image_marker(r) for r in markers) if m]
+                        text, markers = [], []
+                        if tables:
+                            # Inside a table the paragraph belongs to the current cell
+                            if para:
+                                tables[-1]["cell"].append(para)
+                            table_images.extend(found)
+                        else:
+                            if para:
+                                yield para
+                            yield from found
+                    elif tag == f'{w}tc' and tables:
+                        table = tables[-1]
+                        table["row"].append(' '.join(table["cell"]).replace('\n', ' ').replace('|', '/'))
+                        table["cell"] = []
+                    elif tag == f'{w}tr' and tables:
+                        table = tables[-1]
+                        table["rows"].append(table["row"])
+                        table["row"] = []
+                    elif tag == f'{w}tbl' and tables:
+                        rows = tables.pop()["rows"]
+                        if tables:
+                            # A nested table is flattened into the enclosing cell's text
+                            nested = ' '.join(c for r in rows for c in r if c)
+                            if nested:
+                                tables[-1]["cell"].append(nested)
+                        else:
+                            if rows and any(any(c for c in r) for r in rows):
+                                width = max(len(r) for r in rows)
+                                rows = [r + [''] * (width - len(r)) for r in rows]
+                                yield tabulate(rows[1:], headers=rows[0], tablefmt='pipe')
+                            yield from table_images
+                            table_images = []
+                    else:
+                        continue
+                    
+                    # Free everything parsed so far at this level
+                    elem.clear()
+                    if not tables and tag in (f'{w}p', f'{w}tbl'):
+                        while elem.getprevious() is not None:
+                            del elem.getparent()[0]
     
     @staticmethod
     def _parse_txt(file_path: str) -> str:
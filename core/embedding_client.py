@@ -1,17 +1,76 @@
+import math
+import time
 import requests
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any
+from .fake_client import FakeProfile, fake_embedding
+from . import metrics
+
+
+def truncate_embedding(embedding: List[float], dimensions: Optional[int]) -> List[float]:
+    """Matryoshka truncation: keep the first `dimensions` values and re-normalize.
+
+    Follows the nomic-embed-text-v1.5 recipe (layer norm over the full vector,
+    slice, then L2 normalize). Returns the input unchanged when `dimensions`
+    is empty or not smaller than the vector.
+    """
+    if not dimensions or dimensions >= len(embedding):
+        return embedding
+    n = len(embedding)
+    mean = sum(embedding) / n
+    std = math.sqrt(sum((x - mean) ** 2 for x in embedding) / n + 1e-5)
+    head = [(x - mean) / std for x in embedding[:dimensions]]
+    norm = math.sqrt(sum(x * x for x in head)) or 1.0
+    return [x / norm for x in head]
+
 
 class EmbeddingClient:
-    """Handle embedding generation via various providers (Ollama, OpenAI)."""
+    """Handle embedding generation via various providers (Ollama, OpenAI, fake for testing)."""
     
-    def __init__(self, provider: str = "ollama", endpoint: str = "http://127.0.0.1:11434", model: str = "nomic-embed-text", api_key: str = ""):
+    def __init__(self, provider: str = "ollama", endpoint: str = "http://127.0.0.1:11434", model: str = "nomic-embed-text", api_key: str = "",
+                 dimensions: Optional[int] = None, fake: Optional[Dict[str, Any]] = None):
         self.provider = provider.lower()
         self.endpoint = endpoint.rstrip('/')
         self.model = model
         self.api_key = api_key
+        # Output dimensionality for Matryoshka models (None/0 = model default)
+        self.dimensions = dimensions or None
+        self._resolved_model = None
+        # provider "fake": deterministic vectors from word hashes (model.fake in config.yaml)
+        self.fake_profile = FakeProfile(fake) if self.provider == "fake" else None
 
     def get_embedding(self, text: str) -> List[float]:
         """Generate embedding for a single text block."""
+        with self._measured():
+            return truncate_embedding(self._get_raw_embedding(text), self.dimensions)
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for many text blocks, in one request where the API allows it."""
+        if not texts:
+            return []
+        with self._measured():
+            if self.provider == "ollama":
+                raw = self._get_ollama_embeddings(texts)
+            elif self.provider == "lmstudio":
+                raw = self._get_lmstudio_embeddings(texts)
+            elif self.provider == "fake":
+                raw = self._get_fake_embeddings(texts)
+            else:
+                raw = [self._get_raw_embedding(t) for t in texts]
+        return [truncate_embedding(e, self.dimensions) for e in raw]
+
+    @contextmanager
+    def _measured(self):
+        """Request latency and errors for /metrics."""
+        try:
+            with metrics.timed('embedding_seconds', provider=self.provider, model=self.model):
+                yield
+        except Exception:
+            metrics.error('embedding', provider=self.provider, model=self.model)
+            raise
+
+    def _get_raw_embedding(self, text: str) -> List[float]:
+        """Generate a full-size embedding with the configured provider."""
         if self.provider == "ollama":
             return self._get_ollama_embedding(text)
         elif self.provider == "openai":
@@ -20,12 +79,21 @@ class EmbeddingClient:
             return self._get_llamacpp_embedding(text)
         elif self.provider == "lmstudio":
             return self._get_lmstudio_embedding(text)
+        elif self.provider == "fake":
+            return self._get_fake_embeddings([text])[0]
         else:
             raise ValueError(f"Unsupported embedding provider: {self.provider}")
 
-    def _get_lmstudio_embedding(self, text: str) -> List[float]:
-        """Call LM Studio embedding API (OpenAI compatible)."""
-        url = f"{self.endpoint}/v1/embeddings"
+    def _get_fake_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Deterministic embeddings after the configured per-request latency."""
+        if self.fake_profile.embedding_latency_ms:
+            time.sleep(self.fake_profile.embedding_latency_ms / 1000)
+        return [fake_embedding(t, self.fake_profile.embedding_dimensions) for t in texts]
+
+    def _lmstudio_model_name(self) -> str:
+        """Resolve 'auto' to a loaded embedding model once per client."""
+        if self._resolved_model:
+            return self._resolved_model
         
         # Auto-detect embedding model if set to 'auto' or empty
         model_name = self.model
@@ -42,18 +110,29 @@ class EmbeddingClient:
                         else:
                             model_name = models[0]['id']
                 else:
-                    model_name = "local-model"
+                    return "local-model"
             except Exception:
-                model_name = "local-model"
+                # Server not reachable yet; retry detection on the next call
+                return "local-model"
+            self._resolved_model = model_name
+        return model_name
 
+    def _get_lmstudio_embedding(self, text: str) -> List[float]:
+        """Call LM Studio embedding API (OpenAI compatible)."""
+        return self._get_lmstudio_embeddings([text])[0]
+
+    def _get_lmstudio_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Call LM Studio embedding API with a list input."""
+        url = f"{self.endpoint}/v1/embeddings"
         payload = {
-            "model": model_name,
-            "input": text
+            "model": self._lmstudio_model_name(),
+            "input": texts if len(texts) > 1 else texts[0]
         }
         try:
-            response = requests.post(url, json=payload, timeout=30)
+            response = requests.post(url, json=payload, timeout=30 + 2 * len(texts))
             response.raise_for_status()
-            return response.json()["data"][0]["embedding"]
+            data = sorted(response.json()["data"], key=lambda d: d.get("index", 0))
+            return [d["embedding"] for d in data]
         except Exception as e:
             raise RuntimeError(f"LM Studio embedding failed: {str(e)}")
 
@@ -99,6 +178,25 @@ class EmbeddingClient:
         except Exception as e:
             raise RuntimeError(f"Ollama embedding failed: {str(e)}")
 
+    def _get_ollama_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Call Ollama /api/embed with a list input; older servers fall back to one request per text."""
+        url = f"{self.endpoint}/api/embed"
+        payload = {
+            "model": self.model,
+            "input": texts
+        }
+        try:
+            response = requests.post(url, json=payload, timeout=30 + 2 * len(texts))
+        except Exception as e:
+            raise RuntimeError(f"Ollama embedding failed: {str(e)}")
+        if response.status_code == 404:
+            return [self._get_ollama_embedding(t) for t in texts]
+        try:
+            response.raise_for_status()
+            return response.json()["embeddings"]
+        except Exception as e:
+            raise RuntimeError(f"Ollama embedding failed: {str(e)}")
+
     def _get_openai_embedding(self, text: str) -> List[float]:
         """Call OpenAI embedding API."""
         url = "https://api.openai.com/v1/embeddings"
@@ -0,0 +1,173 @@
+"""Deterministic fake AI backend and embeddings for load and throughput testing."""
+import re
+import json
+import math
+import time
+import random
+import zlib
+import threading
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
+import numpy as np
+from .ai_client import AIClient
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_PARAGRAPH_ID_RE = re.compile(r'^\[P(\d+)\]$', re.MULTILINE)
+
+
+class FakeProfile:
+    """Timing and error behaviour of the fake backend (`model.fake` in config.yaml).
+
+    Time to first token is drawn from `ttft_distribution` (fixed, uniform,
+    normal, lognormal, exponential) around `ttft_ms` with relative spread
+    `ttft_spread`; tokens then arrive at `tokens_per_sec`. A request fails
+    with probability `error_rate`. Timings use a seeded generator, so a run
+    with the same requests in the same order is repeatable.
+    """
+
+    DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'lognormal', 'exponential')
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.seed = config.get('seed', 42)
+        self.ttft_ms = float(config.get('ttft_ms', 200))
+        self.ttft_distribution = config.get('ttft_distribution', 'lognormal')
+        self.ttft_spread = float(config.get('ttft_spread', 0.3))
+        self.tokens_per_sec = float(config.get('tokens_per_sec', 40))
+        self.response_tokens = int(config.get('response_tokens', 120))
+        self.error_rate = float(config.get('error_rate', 0.0))
+        self.embedding_dimensions = int(config.get('embedding_dimensions', 768))
+        self.embedding_latency_ms = float(config.get('embedding_latency_ms', 0))
+        if self.ttft_distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unsupported fake latency distribution: {self.ttft_distribution}")
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def ttft(self) -> float:
+        """Seconds until the first token."""
+        median, spread = self.ttft_ms, self.ttft_spread
+        with self._lock:
+            if self.ttft_distribution == 'fixed' or median <= 0:
+                ms = median
+            elif self.ttft_distribution == 'uniform':
+                ms = self._rng.uniform(median * (1 - spread), median * (1 + spread))
+            elif self.ttft_distribution == 'normal':
+                ms = self._rng.gauss(median, median * spread)
+            elif self.ttft_distribution == 'lognormal':
+                ms = median * math.exp(self._rng.gauss(0, spread))
+            else:
+                ms = self._rng.expovariate(1 / median)
+        return max(0.0, ms) / 1000
+
+    def token_interval(self) -> float:
+        return 1 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0.0
+
+    def fails(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def fake_reply(prompt: str, json_wrapper: str = '', response_tokens: int = 120, seed: int = 42) -> str:
+    """Deterministic response text for a prompt.
+
+    Question generation prompts get valid Q/A JSON built from the
+    paragraph's own words (with paragraph_id for batched prompts); other
+    prompts get `response_tokens` words taken from the prompt.
+    """
+    rng = random.Random(zlib.crc32(prompt.encode('utf-8')) ^ seed)
+    if 'soru-cevap' not in prompt:
+        words = _words(prompt) or ['yanıt']
+        return ' '.join(rng.choice(words) for _ in range(response_tokens)).capitalize() + '.'
+
+    # Text between the last METİN/METİNLER header and the closing instruction is the paragraph(s)
+    body = re.split(r'\nMETİN(?:LER)?:\n', prompt)[-1].rsplit('\n\nYukarıdaki', 1)[0]
+    ids = [int(i) for i in _PARAGRAPH_ID_RE.findall(body)]
+    parts = re.split(r'^\[P\d+\]$', body, flags=re.MULTILINE)[1:] if ids else [body]
+    questions = []
+    for paragraph_id, part in zip(ids or [None], parts):
+        words = _words(part) or ['metin']
+        for _ in range(rng.randint(2, 4)):
+            question = {
+                "instruction": ' '.join(rng.choice(words) for _ in range(8)).capitalize() + ' nedir?',
+                "input": "",
+                "output": ' '.join(rng.choice(words) for _ in range(16)).capitalize() + '.',
+                "confidence": rng.choice(['high', 'high', 'low'])
+            }
+            if paragraph_id is not None:
+                question = {"paragraph_id": paragraph_id, **question}
+            questions.append(question)
+    data = {json_wrapper: questions} if json_wrapper else questions
+    return json.dumps(data, ensure_ascii=False, indent=1)
+
+
+@lru_cache(maxsize=65536)
+def _word_vector(word: str, dimensions: int) -> np.ndarray:
+    return np.random.default_rng(zlib.crc32(word.encode('utf-8'))).standard_normal(dimensions)
+
+
+def fake_embedding(text: str, dimensions: int = 768) -> List[float]:
+    """Unit vector from the hashes of the text's words: same text, same vector; shared words, nearby vectors."""
+    vector = np.zeros(dimensions)
+    for word in _words(text):
+        vector += _word_vector(word, dimensions)
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0], norm = 1.0, 1.0
+    return (vector / norm).tolist()
+
+
+class FakeAIClient(AIClient):
+    """Backend-free AI client with configurable latency, throughput and errors."""
+
+    supports_json_schema = True
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.profile = FakeProfile(config.get('fake'))
+        self.model_name = self.model_name if self.model_name not in ('', 'auto') else 'fake-model'
+
+    def _reply(self, prompt: str, options: Dict[str, Any]) -> str:
+        wrapper = self.json_wrapper
+        if options.get('json_schema'):
+            wrapper = next(iter(options['json_schema']['properties']))
+        return fake_reply(prompt, wrapper, self.profile.response_tokens, self.profile.seed)
+
+    def _usage(self, prompt: str, text: str) -> Dict[str, Any]:
+        return {"prompt_tokens": len(prompt) // 3 + 1, "completion_tokens": len(_words(text))}
+
+    def generate(self, prompt: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Sleep for time to first token plus generation time, then return the fake reply."""
+        options = options or {}
+        text = self._reply(prompt, options)
+        ttft = self.profile.ttft()
+        if self.profile.fails():
+            time.sleep(ttft)
+            raise RuntimeError("Fake generation failed: HTTP 500 (simulated error)")
+        usage = self._usage(prompt, text)
+        time.sleep(ttft + usage["completion_tokens"] * self.profile.token_interval())
+        return {"text": text, "usage": usage}
+
+    def generate_stream(self, prompt: str, options: Dict[str, Any] = None):
+        """Yield the fake reply word by word at tokens_per_sec after time to first token."""
+        options = options or {}
+        text = self._reply(prompt, options)
+        time.sleep(self.profile.ttft())
+        if self.profile.fails():
+            yield {"type": "error", "message": "Fake generation failed: HTTP 500 (simulated error)"}
+            return
+        interval = self.profile.token_interval()
+        for piece in re.findall(r'\S+\s*|\s+', text):
+            yield {"type": "content", "text": piece}
+            if interval:
+                time.sleep(interval)
+        yield {"type": "usage", "usage": self._usage(prompt, text)}
+
+    def is_available(self) -> bool:
+        return True
+
+    def get_available_models(self) -> list:
+        return [self.model_name]
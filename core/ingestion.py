@@ -0,0 +1,172 @@
+"""Shared helpers for file-based ingestion: discovery, parsing workers and the change manifest."""
+import os
+import json
+import hashlib
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple
+from .file_lock import file_lock
+from .parse_cache import ParseCache
+from .token_chunker import TokenChunker, chunking_settings
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+
+
+def discover_files(path: str, recursive: bool = True) -> List[str]:
+    """Supported documents under `path` (or `path` itself), sorted."""
+    if os.path.isfile(path):
+        return [path]
+    files = []
+    if os.path.isdir(path):
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for name in names:
+                if name.lower().endswith(SUPPORTED_EXTENSIONS) and not name.startswith(('.', '~$')):
+                    files.append(os.path.join(root, name))
+            if not recursive:
+                break
+    return sorted(files)
+
+
+def source_name(file_path: str, root: str) -> str:
+    """Source label stored in the vector DB: path relative to the ingested directory."""
+    if os.path.isdir(root):
+        return os.path.relpath(file_path, root).replace(os.sep, '/')
+    return os.path.basename(file_path)
+
+
+def file_hash(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_and_split(file_path: str, cache_cfg: Optional[Dict[str, Any]] = None,
+                    parser_cfg: Optional[Dict[str, Any]] = None,
+                    rag_cfg: Optional[Dict[str, Any]] = None) -> Tuple[str, List[str]]:
+    """Parse a document and split it into paragraphs through the parse cache (runs in worker processes).
+
+    With `rag.chunking: tokens` the paragraphs are packed/split to the
+    configured token range of the embedding model's tokenizer.
+    """
+    paragraphs = ParseCache.from_config(cache_cfg, parser_cfg).split(file_path)
+    chunker = TokenChunker.from_config(rag_cfg)
+    if chunker:
+        paragraphs = chunker.chunk(paragraphs)
+    return file_path, paragraphs
+
+
+class IngestManifest:
+    """Record of ingested files (size, mtime, content hash) used to skip unchanged ones.
+
+    Stored as JSON next to the vector DB and rewritten atomically after every
+    file, so an interrupted run resumes where it stopped. ingest.py and
+    watch_ingest.py share the file: every write re-reads it under a file lock
+    and changes only its own entries. Entries also keep
+    the chunking settings (`rag.chunking`, tokenizer, chunk_*_tokens) they
+    were ingested with; a file ingested with other settings counts as changed.
+    """
+
+    def __init__(self, path: str, rag_cfg: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.chunking = chunking_settings(rag_cfg)
+        self.lock_path = path + '.lock'
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # New mtimes of touched but identical files, written by the next save
+        self._touched: Dict[str, Dict[str, Any]] = {}
+        self._stat = None
+        self._load()
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_ino, st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('files', {})
+        self._stat = self._file_stat()
+
+    def _refresh(self):
+        """Pick up entries written by the other process."""
+        if self._file_stat() != self._stat:
+            self._load()
+
+    @contextmanager
+    def _updating(self):
+        """Read-merge-write under the file lock, so the other process's entries are kept."""
+        with file_lock(self.lock_path):
+            self._load()
+            for key, fingerprint in self._touched.items():
+                entry = self.entries.get(key)
+                if entry and entry.get('sha256') == fingerprint['sha256']:
+                    entry.update(fingerprint)
+            self._touched = {}
+            yield
+            self._write()
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+    def get(self, file_path: str) -> Optional[Dict[str, Any]]:
+        self._refresh()
+        return self.entries.get(self._key(file_path))
+
+    def chunking_changed(self, file_path: str) -> bool:
+        """The file was ingested with different chunking settings (entries without them used characters)."""
+        entry = self.get(file_path)
+        return bool(entry) and entry.get('chunking', {"chunking": "chars"}) != self.chunking
+
+    def check(self, file_path: str) -> Tuple[bool, Dict[str, Any]]:
+        """Return (changed, fingerprint). The hash is only computed when size or mtime differ."""
+        st = os.stat(file_path)
+        entry = self.get(file_path)
+        fingerprint = {"size": st.st_size, "mtime": st.st_mtime}
+        if self.chunking_changed(file_path):
+            fingerprint['sha256'] = file_hash(file_path)
+            return True, fingerprint
+        if entry and entry.get('size') == st.st_size and entry.get('mtime') == st.st_mtime:
+            fingerprint['sha256'] = entry.get('sha256')
+            return False, fingerprint
+        fingerprint['sha256'] = file_hash(file_path)
+        if entry and entry.get('sha256') == fingerprint['sha256']:
+            # Touched but identical: remember the new mtime, no re-ingest
+            entry.update(fingerprint)
+            self._touched[self._key(file_path)] = dict(fingerprint)
+            return False, fingerprint
+        return True, fingerprint
+
+    def record(self, file_path: str, fingerprint: Dict[str, Any], **extra):
+        with self._updating():
+            self.entries[self._key(file_path)] = {**fingerprint, "chunking": self.chunking, **extra}
+
+    def remove(self, file_path: str):
+        with self._updating():
+            self.entries.pop(self._key(file_path), None)
+
+    def missing_under(self, root: str) -> List[str]:
+        """Recorded files below `root` that no longer exist."""
+        root = os.path.abspath(root)
+        self._refresh()
+        return [p for p in self.entries
+                if (p == root or p.startswith(root + os.sep)) and not os.path.exists(p)]
+
+    def save(self):
+        """Write pending mtime updates of touched files."""
+        if self._touched:
+            with self._updating():
+                pass
+
+    def _write(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"files": self.entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+        self._stat = self._file_stat()
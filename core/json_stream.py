@@ -0,0 +1,61 @@
+"""Incremental extraction of JSON objects from a streamed model response."""
+import json
+from typing import Any, Dict, List
+
+
+class JSONArrayItemStream:
+    """Emit every JSON object that is an element of an array as soon as it closes.
+
+    Works for both `[{...}, ...]` and wrapped `{"questions": [{...}, ...]}`
+    responses, ignores text and code fences around the JSON, and keeps only
+    the unfinished object in memory.
+    """
+
+    def __init__(self):
+        self.stack: List[str] = []   # open containers: '{' or '['
+        self.in_string = False
+        self.escape = False
+        self.item_start = None       # offset of the open array element object in buffer
+        self.item_depth = 0          # stack depth outside that object (its array)
+        self.buffer = ''
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume a chunk; return the objects completed by it."""
+        items = []
+        offset = len(self.buffer)
+        self.buffer += text
+        for i in range(offset, len(self.buffer)):
+            ch = self.buffer[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                continue
+            if ch == '"':
+                if self.stack:
+                    self.in_string = True
+            elif ch in '{[':
+                if ch == '{' and self.stack and self.stack[-1] == '[' and self.item_start is None:
+                    self.item_start = i
+                    self.item_depth = len(self.stack)
+                self.stack.append(ch)
+            elif ch in '}]' and self.stack:
+                self.stack.pop()
+                # Only the brace closing the element itself, not objects in arrays nested inside it
+                if ch == '}' and self.item_start is not None and len(self.stack) == self.item_depth:
+                    try:
+                        item = json.loads(self.buffer[self.item_start:i + 1])
+                        if isinstance(item, dict):
+                            items.append(item)
+                    except json.JSONDecodeError:
+                        pass
+                    self.item_start = None
+        # Drop consumed text, keeping an unfinished element
+        keep = self.item_start if self.item_start is not None else len(self.buffer)
+        self.buffer = self.buffer[keep:]
+        if self.item_start is not None:
+            self.item_start = 0
+        return items
@@ -2,18 +2,18 @@
 import requests
 import logging
 from typing import Dict, Any
-from .ai_client import AIClient
+from .ai_client import AIClient, SchemaUnsupported
 
 logger = logging.getLogger(__name__)
 
 
 class LlamaCppClient(AIClient):
     """llama.cpp AI client (OpenAI-compatible API via llama-server)."""
+
+    supports_json_schema = True
     
-    def generate(self, prompt: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Generate response from llama.cpp server with optional parameter overrides."""
-        options = options or {}
-        
+    def _build_request(self, prompt: str, options: Dict[str, Any]):
+        """URL and chat completion payload for a prompt with optional parameter overrides."""
         # Merge options into defaults with safety checks
         endpoint = options.get('endpoint', self.endpoint) or self.endpoint
         url = f"{endpoint}/v1/chat/completions"
@@ -33,17 +33,30 @@ class LlamaCppClient(AIClient):
             tokens = self.max_tokens
 
         # Build messages based on config
-        messages = []
-        if self.use_system_prompt and self.system_prompt:
-            messages.append({"role": "system", "content": self.system_prompt})
-        messages.append({"role": "user", "content": prompt})
+        messages = self.build_messages(prompt)
         
         payload = {
             "model": model,
             "messages": messages,
             "temperature": temp,
-            "max_tokens": tokens
+            "max_tokens": tokens,
+            # Reuse the KV cache of the common prompt prefix
+            "cache_prompt": options.get('cache_prompt', self.config.get('cache_prompt', True))
         }
+        # Pin requests to one slot so its cache holds our prefix
+        id_slot = options.get('id_slot', self.config.get('id_slot'))
+        if id_slot is not None and int(id_slot) >= 0:
+            payload["id_slot"] = int(id_slot)
+        # llama-server compiles the schema to a GBNF grammar
+        if options.get('json_schema'):
+            payload["json_schema"] = options['json_schema']
+        return url, payload
+
+    def generate(self, prompt: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Generate response from llama.cpp server with optional parameter overrides."""
+        options = options or {}
+        url, payload = self._build_request(prompt, options)
+        model, temp = payload["model"], payload["temperature"]
         
         # Log request
         logger.debug(f"=== LLAMA.CPP REQUEST ===")
@@ -64,9 +77,12 @@ class LlamaCppClient(AIClient):
             data = response.json()
             result = data['choices'][0]['message']['content']
             usage_data = data.get('usage', {})
+            timings = data.get('timings') or {}
             usage = {
                 "prompt_tokens": usage_data.get('prompt_tokens', 0),
-                "completion_tokens": usage_data.get('completion_tokens', 0)
+                "completion_tokens": usage_data.get('completion_tokens', 0),
+                "cached_tokens": timings.get('cache_n'),
+                "prefill_ms": timings.get('prompt_ms')
             }
             
             # Log response
@@ -84,11 +100,26 @@ class LlamaCppClient(AIClient):
                 error_detail = response.text
             logger.error(f"llama.cpp HTTP Error: {e}")
             logger.error(f"Response: {error_detail}")
+            if self.schema_rejected(e, options):
+                raise SchemaUnsupported(f"llama.cpp generation failed: {str(e)}")
             raise RuntimeError(f"llama.cpp generation failed: {str(e)}")
         except Exception as e:
             logger.error(f"llama.cpp generation failed: {str(e)}")
             raise RuntimeError(f"llama.cpp generation failed: {str(e)}")
     
+    def generate_stream(self, prompt: str, options: Dict[str, Any] = None):
+        """Generate streaming response from llama.cpp server."""
+        url, payload = self._build_request(prompt, options or {})
+        payload["stream"] = True
+        try:
+            with requests.post(url, json=payload, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                for chunk_text in self.iter_sse_content(response):
+                    yield {"type": "content", "text": chunk_text}
+        except Exception as e:
+            logger.error(f"llama.cpp streaming failed: {str(e)}")
+            yield {"type": "error", "message": str(e), "schema_rejected": self.schema_rejected(e, options)}
+
     def is_available(self) -> bool:
         """Check if llama.cpp server is running."""
         try:
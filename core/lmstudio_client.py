@@ -2,13 +2,15 @@
 import requests
 import logging
 from typing import Dict, Any
-from .ai_client import AIClient
+from .ai_client import AIClient, SchemaUnsupported
 
 logger = logging.getLogger(__name__)
 
 
 class LMStudioClient(AIClient):
     """LM Studio AI client (OpenAI-compatible API)."""
+
+    supports_json_schema = True
     
     def _auto_detect_model(self, requested_model: str) -> str:
         if requested_model and requested_model not in ["", "auto", "local-model"]:
@@ -25,6 +27,10 @@ class LMStudioClient(AIClient):
             logger.warning(f"Could not auto-detect model: {e}")
         return "local-model"
 
+    def resolved_model_name(self) -> str:
+        """The configured model, or the loaded one when set to "auto"."""
+        return self._auto_detect_model(self.model_name)
+
     def generate(self, prompt: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
         """Generate response from LM Studio with optional parameter overrides."""
         options = options or {}
@@ -47,14 +53,8 @@ class LMStudioClient(AIClient):
         except (ValueError, TypeError):
             tokens = self.max_tokens
 
-        # Build messages based on config
-        messages = []
-        if self.use_system_prompt and self.system_prompt:
-            # Join system prompt with user prompt to avoid "system role not supported" errors in some model templates
-            full_prompt = f"{self.system_prompt}\n\n{prompt}"
-            messages.append({"role": "user", "content": full_prompt})
-        else:
-            messages.append({"role": "user", "content": prompt})
+        # System prompt stays a separate leading message (merge_system_prompt for templates without one)
+        messages = self.build_messages(prompt)
         
         payload = {
             "model": model,
@@ -63,8 +63,14 @@ class LMStudioClient(AIClient):
             "max_tokens": tokens
         }
         
+        if options.get('json_schema'):
+            # Structured output: generation is constrained to the schema
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "qa_pairs", "strict": True, "schema": options['json_schema']}
+            }
         # Add JSON mode if enabled (some LM Studio versions may not support this)
-        if self.json_mode:
+        elif self.json_mode:
             try:
                 payload["response_format"] = {"type": "json_object"}
             except:
@@ -92,7 +98,8 @@ class LMStudioClient(AIClient):
             usage_data = data.get('usage', {})
             usage = {
                 "prompt_tokens": usage_data.get('prompt_tokens', 0),
-                "completion_tokens": usage_data.get('completion_tokens', 0)
+                "completion_tokens": usage_data.get('completion_tokens', 0),
+                "cached_tokens": (usage_data.get('prompt_tokens_details') or {}).get('cached_tokens')
             }
             
             # Log response
@@ -111,6 +118,8 @@ class LMStudioClient(AIClient):
                 error_detail = response.text
             logger.error(f"LM Studio HTTP Error: {e}")
             logger.error(f"Response: {error_detail}")
+            if self.schema_rejected(e, options):
+                raise SchemaUnsupported(f"LM Studio generation failed: {str(e)}")
             raise RuntimeError(f"LM Studio generation failed: {str(e)}")
         except Exception as e:
             logger.error(f"LM Studio generation failed: {str(e)}")
@@ -130,11 +139,7 @@ class LMStudioClient(AIClient):
             temp = self.temperature
             tokens = self.max_tokens
 
-        messages = []
-        if self.use_system_prompt and self.system_prompt:
-            messages.append({"role": "user", "content": f"{self.system_prompt}\n\n{prompt}"})
-        else:
-            messages.append({"role": "user", "content": prompt})
+        messages = self.build_messages(prompt)
         
         payload = {
             "model": model,
@@ -143,6 +148,11 @@ class LMStudioClient(AIClient):
             "max_tokens": tokens,
             "stream": True # Enable streaming
         }
+        if options.get('json_schema'):
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "qa_pairs", "strict": True, "schema": options['json_schema']}
+            }
         
         try:
             import json
@@ -174,7 +184,7 @@ class LMStudioClient(AIClient):
                 # logger.info(f"📡 Metadata yielded to stream.") # This line was removed as it was misleading
         except Exception as e: # Changed 'ge' to 'e' for consistency
             logger.error(f"LM Studio streaming failed: {str(e)}")
-            yield {"type": "error", "message": str(e)}
+            yield {"type": "error", "message": str(e), "schema_rejected": self.schema_rejected(e, options)}
         finally:
             logger.info("LM Studio stream generator closed.")
 
@@ -0,0 +1,156 @@
+"""Prometheus metrics for the web app (/metrics).
+
+prometheus_client is optional: without it every call here is a no-op and
+/metrics answers 503. Under gunicorn each worker is a separate process;
+gunicorn.conf.py points PROMETHEUS_MULTIPROC_DIR at a directory shared by
+the workers, each worker writes its values there and a scrape served by
+any worker aggregates all of them.
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+
+PREFIX = 'ai_app_'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500, 1000, 5000)
+
+# name: (kind, help, label names, buckets or gauge multiprocess mode)
+SPECS = {
+    'embedding_seconds': ('histogram', 'Embedding request latency', ('provider', 'model'), LATENCY_BUCKETS),
+    'vector_query_seconds': ('histogram', 'Vector similarity search latency', ('backend',), LATENCY_BUCKETS),
+    'keyword_fallback_seconds': ('histogram', 'Keyword ($contains) fallback search latency', ('backend',),
+                                 LATENCY_BUCKETS),
+    'llm_ttft_seconds': ('histogram', 'Time from request to first generated token', ('provider', 'model'),
+                         LATENCY_BUCKETS),
+    'llm_generation_seconds': ('histogram', 'Total generation time of an answer', ('provider', 'model'),
+                               LATENCY_BUCKETS),
+    'llm_tokens_per_second': ('histogram', 'Completion tokens per second after the first token',
+                              ('provider', 'model'), RATE_BUCKETS),
+    'llm_completion_tokens': ('counter', 'Completion tokens generated', ('provider', 'model'), None),
+    'ingest_chunks_per_second': ('histogram', 'Chunks embedded and stored per second per upload',
+                                 ('provider', 'model'), RATE_BUCKETS),
+    'ingest_chunks': ('counter', 'Chunks embedded and stored', ('provider', 'model'), None),
+    'backend_errors': ('counter', 'Errors from the model, embedding and vector backends',
+                       ('component', 'provider', 'model'), None),
+    'active_streams': ('gauge', '/ask answers being generated', ('provider', 'model'), 'livesum'),
+    'upload_queue': ('gauge', 'Uploads being parsed and indexed', ('provider', 'model'), 'livesum'),
+}
+
+_metrics: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def _prometheus():
+    try:
+        import prometheus_client
+    except ImportError:
+        return None
+    return prometheus_client
+
+
+def _metric(name: str):
+    """Create the metric on first use (after PROMETHEUS_MULTIPROC_DIR is known)."""
+    if name not in _metrics:
+        prometheus = _prometheus()
+        if prometheus is None:
+            return None
+        with _lock:
+            if name not in _metrics:
+                kind, description, labels, extra = SPECS[name]
+                if kind == 'histogram':
+                    _metrics[name] = prometheus.Histogram(PREFIX + name, description, labels, buckets=extra)
+                elif kind == 'counter':
+                    _metrics[name] = prometheus.Counter(PREFIX + name, description, labels)
+                else:
+                    _metrics[name] = prometheus.Gauge(PREFIX + name, description, labels, multiprocess_mode=extra)
+    return _metrics[name]
+
+
+def _labels(name: str, labels: Dict[str, Any]) -> Dict[str, str]:
+    return {key: str(labels.get(key) or '') for key in SPECS[name][2]}
+
+
+def observe(name: str, value: float, **labels):
+    metric = _metric(name)
+    if metric is not None:
+        metric.labels(**_labels(name, labels)).observe(value)
+
+
+def inc(name: str, amount: float = 1, **labels):
+    metric = _metric(name)
+    if metric is not None:
+        metric.labels(**_labels(name, labels)).inc(amount)
+
+
+def error(component: str, provider: str = '', model: str = ''):
+    inc('backend_errors', component=component, provider=provider, model=model)
+
+
+@contextmanager
+def timed(name: str, **labels):
+    """Observe the duration of the block in seconds (also when it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def gauge_add(name: str, amount: float, **labels):
+    """Raise (or with a negative amount lower) a gauge such as a queue depth."""
+    metric = _metric(name)
+    if metric is not None:
+        metric.labels(**_labels(name, labels)).inc(amount)
+
+
+class WatchStatusCollector:
+    """Queue depth and throughput of watch_ingest.py, read from its status file at scrape time."""
+
+    def __init__(self, status_path: str):
+        self.status_path = status_path
+
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily
+        status = {}
+        if os.path.exists(self.status_path):
+            try:
+                with open(self.status_path, 'r', encoding='utf-8') as f:
+                    status = json.load(f)
+            except (OSError, ValueError):
+                status = {}
+        # The daemon rewrites the file every half second while alive
+        running = bool(status) and time.time() - status.get("updated", 0) < 10
+        yield GaugeMetricFamily(PREFIX + 'watch_running', 'watch_ingest.py is running', value=int(running))
+        yield GaugeMetricFamily(PREFIX + 'watch_queue_depth', 'Files waiting in the watch_ingest.py queue',
+                                value=status.get('queue_depth', 0) if running else 0)
+        yield GaugeMetricFamily(PREFIX + 'watch_chunks_per_second', 'watch_ingest.py indexing throughput',
+                                value=status.get('chunks_per_second', 0.0) if running else 0)
+
+
+def render(watch_status_path: Optional[str] = None) -> Optional[Tuple[bytes, str]]:
+    """Exposition text of all workers' metrics and its content type; None without prometheus_client."""
+    prometheus = _prometheus()
+    if prometheus is None:
+        return None
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = prometheus.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus.REGISTRY
+    body = prometheus.generate_latest(registry)
+    if watch_status_path:
+        extra = prometheus.CollectorRegistry()
+        extra.register(WatchStatusCollector(watch_status_path))
+        body += prometheus.generate_latest(extra)
+    return body, prometheus.CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """Drop a dead worker's live gauges (gunicorn child_exit hook)."""
+    if _prometheus() is not None and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
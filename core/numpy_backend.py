@@ -0,0 +1,465 @@
+"""In-process flat vector index on a memory-mapped float16 matrix."""
+import os
+import json
+import shutil
+import logging
+import numpy as np
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+from .vector_backend import VectorBackend
+from .file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+
+def _match_condition(value: Any, condition: Any) -> bool:
+    """Evaluate a single ChromaDB field condition ({"$in": [...]}, {"$gt": 3} or a literal)."""
+    if not isinstance(condition, dict):
+        return value == condition
+
+    for op, operand in condition.items():
+        if op == '$eq':
+            ok = value == operand
+        elif op == '$ne':
+            ok = value != operand
+        elif op == '$in':
+            ok = value in operand
+        elif op == '$nin':
+            ok = value not in operand
+        elif op in ('$gt', '$gte', '$lt', '$lte'):
+            if value is None:
+                return False
+            try:
+                ok = {'$gt': value > operand, '$gte': value >= operand,
+                      '$lt': value < operand, '$lte': value <= operand}[op]
+            except TypeError:
+                return False
+        else:
+            raise ValueError(f"Unsupported where operator: {op}")
+        if not ok:
+            return False
+    return True
+
+
+def match_where(metadata: Optional[Dict[str, Any]], where: Optional[Dict]) -> bool:
+    """Evaluate a ChromaDB style `where` filter against one metadata dict."""
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(match_where(metadata, sub) for sub in condition):
+                return False
+        elif key == '$or':
+            if not any(match_where(metadata, sub) for sub in condition):
+                return False
+        elif not _match_condition(metadata.get(key), condition):
+            return False
+    return True
+
+
+def match_document(document: str, where_document: Optional[Dict]) -> bool:
+    """Evaluate a ChromaDB style `where_document` filter against a document."""
+    if not where_document:
+        return True
+    document = document or ""
+    for op, operand in where_document.items():
+        if op == '$contains':
+            ok = operand in document
+        elif op == '$not_contains':
+            ok = operand not in document
+        elif op == '$and':
+            ok = all(match_document(document, sub) for sub in operand)
+        elif op == '$or':
+            ok = any(match_document(document, sub) for sub in operand)
+        else:
+            raise ValueError(f"Unsupported where_document operator: {op}")
+        if not ok:
+            return False
+    return True
+
+
+class NumpyBackend(VectorBackend):
+    """Flat (brute force) index stored as a float16 matrix plus a JSONL sidecar.
+
+    Layout under `<db_path>/numpy/<collection_name>/`:
+      - header.json    {"dim": 768, "dtype": "float16"}
+      - vectors.f16    row-major float16 matrix, one row per record
+      - records.jsonl  {"id", "document", "metadata"} per row, same order
+
+    Adds append to both files; deletes and metadata updates rewrite them
+    atomically. The directory can be copied as-is to snapshot the index.
+    Distances are squared L2, matching ChromaDB's default space.
+
+    `quantization` selects the in-memory scan representation:
+      - none:    float32 copy of the matrix (fastest scan, 4 bytes/dim RAM)
+      - float16: scan the memory-mapped file directly (no private RAM, slow
+                 because numpy has no BLAS path for float16)
+      - int8:    per-row scaled int8 codes (1 byte/dim RAM); the top
+                 `n_results * rescore_factor` candidates are re-scored against
+                 the float16 rows on disk, so results match the exact ranking
+                 in almost all cases
+    """
+
+    DTYPE = np.float16
+    HEADER_FILE = 'header.json'
+    VECTOR_FILE = 'vectors.f16'
+    RECORD_FILE = 'records.jsonl'
+    LOCK_FILE = '.lock'
+    FILTER_CACHE_SIZE = 128
+    SCAN_BLOCK = 4096
+    QUANTIZATIONS = ('none', 'float16', 'int8')
+
+    def __init__(self, db_path: str, collection_name: str, quantization: str = 'none', rescore_factor: int = 4):
+        super().__init__(db_path, collection_name)
+        quantization = (quantization or 'none').lower()
+        if quantization not in self.QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        self.quantization = quantization
+        self.rescore_factor = max(1, int(rescore_factor or 1))
+
+        self.directory = os.path.join(db_path, 'numpy', collection_name)
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.header_path = os.path.join(self.directory, self.HEADER_FILE)
+        self.vector_path = os.path.join(self.directory, self.VECTOR_FILE)
+        self.record_path = os.path.join(self.directory, self.RECORD_FILE)
+        self.lock_path = os.path.join(self.directory, self.LOCK_FILE)
+
+        self._stat = None
+        self._load()
+
+    # --- Persistence ---
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.record_path)
+            return (st.st_ino, st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        """(Re)load the sidecar and map the vector file."""
+        self.dim = None
+        if os.path.exists(self.header_path):
+            with open(self.header_path, 'r', encoding='utf-8') as f:
+                self.dim = json.load(f).get('dim')
+
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        if os.path.exists(self.record_path):
+            with open(self.record_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn write at the tail after a crash
+                        break
+                    self._ids.append(rec['id'])
+                    self._documents.append(rec['document'])
+                    self._metadatas.append(rec.get('metadata') or {})
+
+        rows = 0
+        if self.dim and os.path.exists(self.vector_path):
+            rows = os.path.getsize(self.vector_path) // (self.dim * np.dtype(self.DTYPE).itemsize)
+
+        # Only rows present in both files are valid
+        n = min(rows, len(self._ids))
+        del self._ids[n:], self._documents[n:], self._metadatas[n:]
+
+        self._map(n)
+        self._reset_working()
+        self._append_working([self._mapped[start:start + self.SCAN_BLOCK] for start in range(0, n, self.SCAN_BLOCK)])
+
+        self._id_index = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        self._filter_cache = {}
+        self._stat = self._file_stat()
+
+    def _map(self, n: int):
+        """Memory-map the first n rows of the vector file."""
+        self._mapped = None
+        if n:
+            self._mapped = np.memmap(self.vector_path, dtype=self.DTYPE, mode='r', shape=(n, self.dim))
+        else:
+            self._mapped = np.zeros((0, self.dim or 0), dtype=self.DTYPE)
+
+    def _reset_working(self):
+        dim = self.dim or 0
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._codes = np.zeros((0, dim), dtype=np.int8)
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._sq_norms = np.zeros(0, dtype=np.float32)
+
+    def _append_working(self, blocks: List[np.ndarray]):
+        """Extend the in-memory scan structures with blocks of float16 rows."""
+        if not blocks:
+            return
+        norms, vectors, codes, scales = [self._sq_norms], [self._vectors], [self._codes], [self._scales]
+        for rows in blocks:
+            full = np.asarray(rows, dtype=np.float32)
+            norms.append(np.einsum('ij,ij->i', full, full))
+            if self.quantization == 'none':
+                vectors.append(full)
+            elif self.quantization == 'int8':
+                scale = np.abs(full).max(axis=1) / 127.0
+                scale[scale == 0] = 1.0
+                codes.append(np.clip(np.rint(full / scale[:, None]), -127, 127).astype(np.int8))
+                scales.append(scale.astype(np.float32))
+        self._sq_norms = np.concatenate(norms)
+        if self.quantization == 'none':
+            self._vectors = np.concatenate(vectors)
+        elif self.quantization == 'int8':
+            self._codes = np.concatenate(codes)
+            self._scales = np.concatenate(scales)
+
+    def _dots(self, q: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Approximate q . x for the given rows (all rows when None)."""
+        if self.quantization == 'none':
+            return self._vectors @ q if rows is None else self._vectors[rows] @ q
+
+        source = self._codes if self.quantization == 'int8' else self._mapped
+        total = source.shape[0] if rows is None else rows.size
+        out = np.empty(total, dtype=np.float32)
+        # Decode in blocks so the float32 temporary stays cache-sized
+        for start in range(0, total, self.SCAN_BLOCK):
+            idx = slice(start, start + self.SCAN_BLOCK) if rows is None else rows[start:start + self.SCAN_BLOCK]
+            out[start:start + self.SCAN_BLOCK] = np.asarray(source[idx], dtype=np.float32) @ q
+        if self.quantization == 'int8':
+            out *= self._scales if rows is None else self._scales[rows]
+        return out
+
+    def _refresh(self):
+        """Pick up writes made by other processes (e.g. other gunicorn workers)."""
+        if self._file_stat() != self._stat:
+            self._load()
+
+    @contextmanager
+    def _writing(self):
+        """Serialize writers across processes and start from the current files.
+
+        Without the lock a rewrite in one process (delete, metadata update or
+        tail truncation) can drop rows another process has just appended.
+        """
+        with file_lock(self.lock_path):
+            self._refresh()
+            if self.dim is None and os.path.exists(self.header_path):
+                # Another process created the index but has no rows yet
+                self._load()
+            yield
+
+    def _truncate_to_consistent(self):
+        """Drop a partially written tail so both files have the same row count."""
+        n = len(self._ids)
+        if self.dim and os.path.exists(self.vector_path):
+            expected = n * self.dim * np.dtype(self.DTYPE).itemsize
+            if os.path.getsize(self.vector_path) != expected:
+                with open(self.vector_path, 'r+b') as f:
+                    f.truncate(expected)
+        if os.path.exists(self.record_path):
+            with open(self.record_path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+            if len(lines) != n:
+                self._rewrite_records()
+
+    def _rewrite_records(self):
+        tmp = self.record_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for doc_id, doc, meta in zip(self._ids, self._documents, self._metadatas):
+                f.write(json.dumps({"id": doc_id, "document": doc, "metadata": meta}, ensure_ascii=False) + '\n')
+        os.replace(tmp, self.record_path)
+
+    def _rewrite_vectors(self, matrix: np.ndarray):
+        tmp = self.vector_path + '.tmp'
+        np.ascontiguousarray(matrix, dtype=self.DTYPE).tofile(tmp)
+        os.replace(tmp, self.vector_path)
+
+    # --- VectorBackend API ---
+
+    def add(self, documents: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]], ids: List[str]):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(ids):
+            raise ValueError("Embeddings must be a list of equal-length vectors, one per id")
+
+        with self._writing():
+            self._add(documents, vectors, metadatas, ids)
+
+    def _add(self, documents: List[str], vectors: np.ndarray, metadatas: List[Dict[str, Any]], ids: List[str]):
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            with open(self.header_path, 'w', encoding='utf-8') as f:
+                json.dump({"dim": self.dim, "dtype": np.dtype(self.DTYPE).name}, f)
+            self._reset_working()
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+
+        # Like ChromaDB, existing ids are ignored instead of duplicated
+        keep = []
+        seen = set()
+        for i, doc_id in enumerate(ids):
+            if doc_id in self._id_index or doc_id in seen:
+                logger.warning(f"NumpyBackend: id already exists, skipping: {doc_id}")
+                continue
+            seen.add(doc_id)
+            keep.append(i)
+        if not keep:
+            return
+
+        # Store what the index will actually search with (float16 round-trip)
+        stored = vectors[keep].astype(self.DTYPE)
+
+        self._truncate_to_consistent()
+        with open(self.vector_path, 'ab') as f:
+            stored.tofile(f)
+        with open(self.record_path, 'a', encoding='utf-8') as f:
+            for i in keep:
+                f.write(json.dumps({"id": ids[i], "document": documents[i], "metadata": metadatas[i]}, ensure_ascii=False) + '\n')
+
+        self._append_working([stored])
+        for i in keep:
+            self._id_index[ids[i]] = len(self._ids)
+            self._ids.append(ids[i])
+            self._documents.append(documents[i])
+            self._metadatas.append(dict(metadatas[i]))
+        self._map(len(self._ids))
+        self._filter_cache = {}
+        self._stat = self._file_stat()
+
+    def _candidate_indices(self, where: Optional[Dict]) -> np.ndarray:
+        if not where:
+            return np.arange(len(self._ids))
+
+        # The same user/source filter repeats across a chat session, so cache
+        # the row set until the next write.
+        key = json.dumps(where, sort_keys=True, default=str)
+        rows = self._filter_cache.get(key)
+        if rows is None:
+            rows = np.fromiter(
+                (i for i, m in enumerate(self._metadatas) if match_where(m, where)),
+                dtype=np.int64
+            )
+            if len(self._filter_cache) >= self.FILTER_CACHE_SIZE:
+                self._filter_cache.pop(next(iter(self._filter_cache)))
+            self._filter_cache[key] = rows
+        return rows
+
+    def search(self, query_embedding: List[float], n_results: int, where: Optional[Dict] = None) -> Dict[str, Any]:
+        self._refresh()
+        empty = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        if not self._ids or n_results <= 0:
+            return empty
+
+        q = np.asarray(query_embedding, dtype=np.float32)
+        if q.shape[0] != self.dim:
+            raise ValueError(f"Query dimension {q.shape[0]} does not match index dimension {self.dim}")
+
+        candidates = self._candidate_indices(where)
+        if candidates.size == 0:
+            return empty
+
+        q_sq = float(q @ q)
+        if candidates.size == len(self._ids):
+            distances = self._sq_norms - 2.0 * self._dots(q, None) + q_sq
+        else:
+            distances = self._sq_norms[candidates] - 2.0 * self._dots(q, candidates) + q_sq
+
+        k = min(n_results, candidates.size)
+        if self.quantization == 'int8':
+            # Shortlist on the int8 scores, then re-score against the float16 rows
+            shortlist = self._top_k(distances, min(k * self.rescore_factor, candidates.size))
+            rows = np.sort(candidates[shortlist])
+            exact = np.asarray(self._mapped[rows], dtype=np.float32)
+            distances = self._sq_norms[rows] - 2.0 * (exact @ q) + q_sq
+            top = self._top_k(distances, k)
+            rows = rows[top]
+        else:
+            top = self._top_k(distances, k)
+            rows = candidates[top]
+
+        return {
+            "ids": [[self._ids[r] for r in rows]],
+            "documents": [[self._documents[r] for r in rows]],
+            "metadatas": [[dict(self._metadatas[r]) for r in rows]],
+            "distances": [[max(float(d), 0.0) for d in distances[top]]]
+        }
+
+    @staticmethod
+    def _top_k(distances: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k smallest distances, sorted ascending."""
+        top = np.argpartition(distances, k - 1)[:k] if k < distances.size else np.arange(distances.size)
+        return top[np.argsort(distances[top])]
+
+    def get(self, where: Optional[Dict] = None, where_document: Optional[Dict] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: Optional[List[str]] = None) -> Dict[str, Any]:
+        # Everything is held in memory, so `include` does not change the cost
+        self._refresh()
+        offset = offset or 0
+        ids, documents, metadatas = [], [], []
+        skipped = 0
+        for doc_id, doc, meta in zip(self._ids, self._documents, self._metadatas):
+            if not match_where(meta, where) or not match_document(doc, where_document):
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            ids.append(doc_id)
+            documents.append(doc)
+            metadatas.append(dict(meta))
+            if limit is not None and len(ids) >= limit:
+                break
+        return {"ids": ids, "documents": documents, "metadatas": metadatas}
+
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        with self._writing():
+            changed = False
+            for doc_id, meta in zip(ids, metadatas):
+                row = self._id_index.get(doc_id)
+                if row is not None:
+                    self._metadatas[row] = dict(meta)
+                    changed = True
+            if changed:
+                self._rewrite_records()
+                self._filter_cache = {}
+                self._stat = self._file_stat()
+
+    def delete(self, where: Optional[Dict] = None, ids: Optional[List[str]] = None):
+        if where is None and ids is None:
+            # Like ChromaDB; a full wipe is reset()
+            raise ValueError("delete() needs a where filter or ids")
+        with self._writing():
+            self._delete(where, ids)
+
+    def _delete(self, where: Optional[Dict], ids: Optional[List[str]]):
+        id_set = set(ids) if ids is not None else None
+        keep = [i for i, (doc_id, m) in enumerate(zip(self._ids, self._metadatas))
+                if not (match_where(m, where) and (id_set is None or doc_id in id_set))]
+        if len(keep) == len(self._ids):
+            return
+
+        self._ids = [self._ids[i] for i in keep]
+        self._documents = [self._documents[i] for i in keep]
+        self._metadatas = [self._metadatas[i] for i in keep]
+
+        matrix = np.asarray(self._mapped[keep], dtype=self.DTYPE)
+        # Release the map before replacing the file underneath it
+        self._mapped = None
+        self._rewrite_vectors(matrix)
+        self._rewrite_records()
+        self._load()
+
+    def count(self) -> int:
+        self._refresh()
+        return len(self._ids)
+
+    def reset(self):
+        with file_lock(self.lock_path):
+            self._mapped = None
+            for path in (self.vector_path, self.record_path, self.header_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._load()
+
+    def drop(self):
+        self.reset()
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -3,23 +3,23 @@ import requests
 import json
 import logging
 from typing import Dict, Any
-from .ai_client import AIClient
+from .ai_client import AIClient, SchemaUnsupported
 
 logger = logging.getLogger(__name__)
 
 
 class OllamaClient(AIClient):
     """Ollama AI client."""
+
+    supports_json_schema = True
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.session = requests.Session()
         self.session.trust_env = False  # Proxy ayarlarını yoksay
     
-    def generate(self, prompt: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Generate response from Ollama with optional parameter overrides."""
-        options = options or {}
-        
+    def _build_request(self, prompt: str, options: Dict[str, Any], stream: bool = False):
+        """URL and /api/generate payload for a prompt with optional parameter overrides."""
         # Merge options into defaults
         endpoint = options.get('endpoint', self.endpoint) or self.endpoint
         url = f"{endpoint}/api/generate"
@@ -41,12 +41,26 @@ class OllamaClient(AIClient):
         payload = {
             "model": model,
             "prompt": prompt,
-            "stream": False,
+            "stream": stream,
             "options": {
                 "temperature": temp,
                 "num_predict": tokens
             }
         }
+        if self.use_system_prompt and self.system_prompt:
+            payload["system"] = self.system_prompt
+        # Structured outputs (Ollama >= 0.5): a JSON Schema in "format"
+        if options.get('json_schema'):
+            payload["format"] = options['json_schema']
+        # Keep the model (and its prompt cache) loaded between paragraphs
+        keep_alive = options.get('keep_alive', self.config.get('keep_alive'))
+        if keep_alive not in (None, ''):
+            payload["keep_alive"] = keep_alive
+        return url, payload
+
+    def generate(self, prompt: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Generate response from Ollama with optional parameter overrides."""
+        url, payload = self._build_request(prompt, options or {})
         
         # Log request
         logger.debug(f"=== OLLAMA REQUEST ===")
@@ -66,9 +80,11 @@ class OllamaClient(AIClient):
             result = data.get('response', '')
             
             # Extract usage
+            # prompt_eval_count only counts tokens that were not served from the cache
             usage = {
                 "prompt_tokens": data.get('prompt_eval_count', 0),
-                "completion_tokens": data.get('eval_count', 0)
+                "completion_tokens": data.get('eval_count', 0),
+                "prefill_ms": data['prompt_eval_duration'] / 1e6 if data.get('prompt_eval_duration') else None
             }
             
             # Log response
@@ -80,8 +96,30 @@ class OllamaClient(AIClient):
             return {"text": result, "usage": usage}
         except Exception as e:
             logger.error(f"Ollama generation failed: {str(e)}")
+            if self.schema_rejected(e, options):
+                raise SchemaUnsupported(f"Ollama generation failed: {str(e)}")
             raise RuntimeError(f"Ollama generation failed: {str(e)}")
     
+    def generate_stream(self, prompt: str, options: Dict[str, Any] = None):
+        """Generate streaming response from Ollama (newline-delimited JSON)."""
+        url, payload = self._build_request(prompt, options or {}, stream=True)
+        try:
+            with self.session.post(url, json=payload, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get('error'):
+                        raise RuntimeError(data['error'])
+                    if data.get('response'):
+                        yield {"type": "content", "text": data['response']}
+                    if data.get('done'):
+                        break
+        except Exception as e:
+            logger.error(f"Ollama streaming failed: {str(e)}")
+            yield {"type": "error", "message": str(e), "schema_rejected": self.schema_rejected(e, options)}
+
     def is_available(self) -> bool:
         """Check if Ollama is running."""
         try:
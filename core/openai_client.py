@@ -1,20 +1,20 @@
 """OpenAI AI client implementation (for future use)."""
 import requests
 from typing import Dict, Any
-from .ai_client import AIClient
+from .ai_client import AIClient, SchemaUnsupported
 
 
 class OpenAIClient(AIClient):
     """OpenAI AI client."""
+
+    supports_json_schema = True
     
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.api_key = config.get('api_key', '')
     
-    def generate(self, prompt: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Generate response from OpenAI with optional parameter overrides."""
-        options = options or {}
-        
+    def _build_request(self, prompt: str, options: Dict[str, Any]):
+        """URL, headers and chat completion payload with optional parameter overrides."""
         # Merge options into defaults with safety checks
         endpoint = options.get('endpoint', self.endpoint) or "https://api.openai.com"
         url = f"{endpoint}/v1/chat/completions"
@@ -46,6 +46,16 @@ class OpenAIClient(AIClient):
             "temperature": temp,
             "max_tokens": tokens
         }
+        if options.get('json_schema'):
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "qa_pairs", "strict": True, "schema": options['json_schema']}
+            }
+        return url, headers, payload
+
+    def generate(self, prompt: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Generate response from OpenAI with optional parameter overrides."""
+        url, headers, payload = self._build_request(prompt, options or {})
         
         try:
             response = requests.post(
@@ -59,15 +69,30 @@ class OpenAIClient(AIClient):
             usage_data = data.get('usage', {})
             usage = {
                 "prompt_tokens": usage_data.get('prompt_tokens', 0),
-                "completion_tokens": usage_data.get('completion_tokens', 0)
+                "completion_tokens": usage_data.get('completion_tokens', 0),
+                "cached_tokens": (usage_data.get('prompt_tokens_details') or {}).get('cached_tokens')
             }
             return {
                 "text": data['choices'][0]['message']['content'],
                 "usage": usage
             }
         except Exception as e:
+            if self.schema_rejected(e, options):
+                raise SchemaUnsupported(f"OpenAI generation failed: {str(e)}")
             raise RuntimeError(f"OpenAI generation failed: {str(e)}")
     
+    def generate_stream(self, prompt: str, options: Dict[str, Any] = None):
+        """Generate streaming response from OpenAI."""
+        url, headers, payload = self._build_request(prompt, options or {})
+        payload["stream"] = True
+        try:
+            with requests.post(url, headers=headers, json=payload, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                for chunk_text in self.iter_sse_content(response):
+                    yield {"type": "content", "text": chunk_text}
+        except Exception as e:
+            yield {"type": "error", "message": str(e), "schema_rejected": self.schema_rejected(e, options)}
+
     def is_available(self) -> bool:
         """Check if OpenAI API is accessible."""
         if not self.api_key:
@@ -0,0 +1,227 @@
+"""Dataset writer for Parquet (columnar) format."""
+import os
+import json
+from typing import Dict, Any, List, Optional
+from .dataset_writer import manifest_path_for
+
+COLUMNS = ('instruction', 'input', 'output', 'confidence', 'source', 'paragraph_index', 'model')
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet output requires the 'pyarrow' package (pip install pyarrow)")
+    return pyarrow
+
+
+def parquet_schema():
+    pa = _pyarrow()
+    return pa.schema([
+        ('instruction', pa.string()),
+        ('input', pa.string()),
+        ('output', pa.string()),
+        ('confidence', pa.string()),
+        ('source', pa.string()),
+        ('paragraph_index', pa.int32()),
+        ('model', pa.string())
+    ])
+
+
+class ParquetDatasetWriter:
+    """Write dataset entries as Parquet row groups during generation.
+
+    Every `row_group_size` entries become a row group of the current part
+    file (`dataset-00001.parquet`); a part is finished after `rows_per_file`
+    rows. A Parquet file is only readable once its footer is written, so the
+    rows of the unfinished part are also kept in a JSONL journal that is
+    fsynced by `sync()`; after a crash the part is rebuilt from it. Parquet
+    files cannot be appended to, so a resumed run starts a new part. The
+    parts and their row counts are listed in `dataset.parquet.manifest.json`.
+    """
+
+    def __init__(self, output_path: str, append: bool = True, row_group_size: int = 10000,
+                 rows_per_file: int = 500000, source: str = '', model: str = '',
+                 compression: str = 'zstd'):
+        self.pa = _pyarrow()
+        self.schema = parquet_schema()
+        self.output_path = output_path
+        self.row_group_size = max(1, int(row_group_size))
+        self.rows_per_file = max(self.row_group_size, int(rows_per_file))
+        self.source = source
+        self.model = model
+        self.compression = compression
+        self.manifest_path = manifest_path_for(output_path)
+        self.directory = os.path.dirname(output_path) or '.'
+
+        self.parts: List[Dict[str, Any]] = []
+        self.rows: List[Dict[str, Any]] = []       # not yet in a row group
+        self.journal_lines: List[str] = []         # not yet in the journal
+        self.part = None                           # manifest entry of the open part
+        self.writer = None
+        self.journal = None
+        self.closed = False
+
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.manifest_path):
+            if append:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    self.parts = json.load(f).get('shards', [])
+            else:
+                self._remove_existing()
+        self._recover()
+
+    @property
+    def result_path(self) -> str:
+        return self.manifest_path
+
+    # --- Parts, journal and manifest ---
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _part_name(self, number: int) -> str:
+        root, ext = os.path.splitext(os.path.basename(self.output_path))
+        return f"{root}-{number:05d}{ext or '.parquet'}"
+
+    def _remove_existing(self):
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            parts = json.load(f).get('shards', [])
+        for part in parts:
+            for name in (part['file'], part['file'] + '.journal.jsonl'):
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+        os.remove(self.manifest_path)
+
+    def _recover(self):
+        """Finish parts left open by a crash: rewrite each from its journal in place."""
+        for part in list(self.parts):
+            journal_path = self._path(part['file'] + '.journal.jsonl')
+            if part.get('clean') or not os.path.exists(journal_path):
+                if not part.get('clean'):
+                    # Crashed before its first row reached the journal
+                    self.parts.remove(part)
+                    if os.path.exists(self._path(part['file'])):
+                        os.remove(self._path(part['file']))
+                elif os.path.exists(journal_path):
+                    os.remove(journal_path)
+                continue
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f if line.endswith('\n')]
+            tmp = self._path(part['file'] + '.tmp')
+            self.pa.parquet.write_table(self.pa.Table.from_pylist(rows, schema=self.schema), tmp,
+                                        row_group_size=self.row_group_size, compression=self.compression)
+            os.replace(tmp, self._path(part['file']))
+            part.update(records=len(rows), clean=True)
+            self._save_manifest()
+            os.remove(journal_path)
+
+    def _open_part(self):
+        self.part = {"file": self._part_name(len(self.parts) + 1), "records": 0, "clean": False}
+        self.parts.append(self.part)
+        self.writer = self.pa.parquet.ParquetWriter(self._path(self.part['file']), self.schema,
+                                                    compression=self.compression)
+        self.journal = open(self._path(self.part['file'] + '.journal.jsonl'), 'w', encoding='utf-8')
+        self._save_manifest()
+
+    def _close_part(self):
+        """Write the footer; the journal is dropped once the manifest says the part is complete."""
+        self.writer.close()
+        with open(self._path(self.part['file']), 'rb') as f:
+            os.fsync(f.fileno())
+        self.part['clean'] = True
+        self._save_manifest()
+        self.journal.close()
+        os.remove(self._path(self.part['file'] + '.journal.jsonl'))
+        self.journal_lines = []
+        self.part = self.writer = self.journal = None
+
+    def _save_manifest(self):
+        manifest = {
+            "format": "parquet",
+            "compression": self.compression,
+            "columns": list(COLUMNS),
+            "records": sum(p['records'] for p in self.parts),
+            "shards": self.parts
+        }
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.manifest_path)
+
+    def _write_row_group(self):
+        if not self.rows:
+            return
+        if self.writer is None:
+            self._open_part()
+        table = self.pa.Table.from_pylist(self.rows, schema=self.schema)
+        self.writer.write_table(table, row_group_size=len(self.rows))
+        self.part['records'] += len(self.rows)
+        self.rows = []
+        if self.part['records'] >= self.rows_per_file:
+            self._close_part()
+
+    # --- Writing ---
+
+    def _row(self, entry: Dict[str, Any], paragraph_index: Optional[int]) -> Dict[str, Any]:
+        row = {column: entry.get(column) for column in COLUMNS}
+        for column in ('instruction', 'input', 'output', 'confidence'):
+            if row[column] is not None and not isinstance(row[column], str):
+                row[column] = str(row[column])
+        row['source'] = row['source'] if row['source'] is not None else self.source
+        row['model'] = row['model'] if row['model'] is not None else self.model
+        if row['paragraph_index'] is None:
+            row['paragraph_index'] = paragraph_index
+        return row
+
+    def _add(self, row: Dict[str, Any]):
+        self.rows.append(row)
+        self.journal_lines.append(json.dumps(row, ensure_ascii=False) + '\n')
+        if len(self.rows) >= self.row_group_size:
+            # The journal must hold every row of the open part
+            self._write_journal()
+            self._write_row_group()
+
+    def _write_journal(self):
+        if not self.journal_lines:
+            return
+        if self.writer is None:
+            self._open_part()
+        self.journal.write(''.join(self.journal_lines))
+        self.journal.flush()
+        self.journal_lines = []
+
+    def write(self, entry: Dict[str, Any], paragraph_index: Optional[int] = None):
+        """Add a single entry; rows are written as a row group every row_group_size entries."""
+        self._add(self._row(entry, paragraph_index))
+
+    def write_batch(self, entries: List[Dict[str, Any]], paragraph_index: Optional[int] = None):
+        """Write multiple entries generated from one paragraph."""
+        for entry in entries:
+            self.write(entry, paragraph_index)
+
+    def sync(self):
+        """Make everything written so far durable (checkpoint boundary)."""
+        if self.closed:
+            return
+        self._write_journal()
+        if self.journal is not None:
+            os.fsync(self.journal.fileno())
+
+    def close(self):
+        """Write the last row group and finish the open part."""
+        if self.closed:
+            return
+        self._write_journal()
+        self._write_row_group()
+        if self.writer is not None:
+            self._close_part()
+        self._save_manifest()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,163 @@
+"""On-disk cache of DocumentParser output and split paragraphs."""
+import os
+import re
+import json
+import hashlib
+import logging
+from typing import List, Optional, Dict, Any
+from . import document_parser, text_processor
+from .document_parser import DocumentParser
+from .text_processor import TextProcessor
+
+logger = logging.getLogger(__name__)
+
+_IMAGE_MARKER = re.compile(r'\[GÖRSEL: ([^\]]+)\]')
+
+
+def _code_version(module) -> str:
+    """Hash of a module's source, so editing the parser invalidates old entries."""
+    with open(module.__file__, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+PARSER_VERSION = _code_version(document_parser)
+SPLITTER_VERSION = _code_version(text_processor)
+
+
+class ParseCache:
+    """Parser output keyed by file content hash, parser version and parser options.
+
+    Entries are plain files in `directory`. When the total size exceeds
+    `max_size_mb`, least recently used entries are removed. Safe to share
+    between processes: writes are atomic and a vanished entry is a miss.
+    """
+
+    def __init__(self, directory: str = './data/cache/parsed', max_size_mb: float = 512, enabled: bool = True,
+                 tables: str = 'auto'):
+        self.directory = directory
+        self.tables = tables
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.enabled = enabled
+        if enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, cache_cfg: Optional[Dict[str, Any]], parser_cfg: Optional[Dict[str, Any]] = None) -> 'ParseCache':
+        """Build from the `cache` and `parser` sections of config.yaml."""
+        cache_cfg = cache_cfg or {}
+        parser_cfg = parser_cfg or {}
+        return cls(
+            directory=cache_cfg.get('directory', './data/cache/parsed'),
+            max_size_mb=cache_cfg.get('max_size_mb', 512),
+            enabled=cache_cfg.get('enabled', True),
+            tables=parser_cfg.get('tables', 'auto')
+        )
+
+    @staticmethod
+    def file_hash(file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _key(self, file_path: str, *parts) -> str:
+        # Image markers embed the file's base name, so it is part of the key
+        raw = "|".join([self.file_hash(file_path), os.path.basename(file_path)] + [str(p) for p in parts])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _read(self, name: str) -> Optional[str]:
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used
+            return data
+        except FileNotFoundError:
+            return None
+
+    def _write(self, name: str, data: str):
+        path = os.path.join(self.directory, name)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+        # Oldest first, down to 90% so we do not evict on every write
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+            except FileNotFoundError:
+                pass
+        logger.info(f"Parse cache evicted down to {total / 1e6:.1f} MB")
+
+    @staticmethod
+    def _images_present(text: str) -> bool:
+        """Every image the text refers to still exists.
+
+        All markers are checked, not just the first: one stat per image is
+        cheap next to a re-parse, and serving text that points at a deleted
+        image is wrong.
+        """
+        return all(os.path.exists(path) for path in {m.group(1) for m in _IMAGE_MARKER.finditer(text)})
+
+    def parse(self, file_path: str, mode: str = 'paragraph') -> str:
+        """DocumentParser.parse with caching."""
+        if not self.enabled:
+            return DocumentParser.parse(file_path, mode, self.tables)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+
+        name = self._key(file_path, PARSER_VERSION, mode, self.tables) + '.txt'
+        text = self._read(name)
+        # Extracted images live outside the cache; re-parse if they were cleaned up
+        if text is not None and self._images_present(text):
+            logger.debug(f"Parse cache hit: {file_path}")
+            return text
+
+        text = DocumentParser.parse(file_path, mode, self.tables)
+        self._write(name, text)
+        return text
+
+    def split(self, file_path: str, mode: str = 'paragraph', min_length: int = 50) -> List[str]:
+        """Parse and TextProcessor.split_into_paragraphs with caching of both steps."""
+        if not self.enabled:
+            return TextProcessor.split_into_paragraphs(DocumentParser.parse(file_path, mode, self.tables), min_length, mode)
+
+        name = self._key(file_path, PARSER_VERSION, SPLITTER_VERSION, mode, self.tables, min_length) + '.json'
+        data = self._read(name)
+        if data is not None:
+            paragraphs = json.loads(data)
+            if self._images_present("\n".join(paragraphs)):
+                logger.debug(f"Split cache hit: {file_path}")
+                return paragraphs
+
+        paragraphs = TextProcessor.split_into_paragraphs(self.parse(file_path, mode), min_length, mode)
+        self._write(name, json.dumps(paragraphs, ensure_ascii=False))
+        return paragraphs
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,99 @@
+"""Near-duplicate filtering of generated question-answer pairs."""
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from .dedup import NearDuplicateIndex
+
+
+def qa_text(entry: Dict[str, Any]) -> str:
+    """The text compared between entries: instruction and output."""
+    return f"{entry.get('instruction', '')}\n{entry.get('output', '')}"
+
+
+class QADeduplicator:
+    """Drop Q/A entries whose instruction+output near-duplicates an earlier one.
+
+    Uses MinHash-LSH over Turkish-normalized word shingles
+    (`NearDuplicateIndex`). `max_items` bounds memory: only the most recent
+    entries are kept in the index, so a duplicate of an entry older than
+    that is not detected.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 64, shingle_size: int = 2,
+                 max_items: Optional[int] = 500000):
+        self.index = NearDuplicateIndex(threshold=threshold, num_perm=num_perm,
+                                        shingle_size=shingle_size, max_items=max_items or None)
+        self.seen = 0
+        self.duplicates = 0
+
+    @classmethod
+    def from_config(cls, output_cfg: Optional[Dict[str, Any]]) -> 'QADeduplicator':
+        """Build from the `output` section of config.yaml."""
+        output_cfg = output_cfg or {}
+        return cls(
+            threshold=output_cfg.get('dedup_threshold', 0.85),
+            num_perm=output_cfg.get('dedup_num_perm', 64),
+            shingle_size=output_cfg.get('dedup_shingle_size', 2),
+            max_items=output_cfg.get('dedup_max_items', 500000)
+        )
+
+    def check(self, entry: Dict[str, Any]) -> Optional[Tuple[str, float]]:
+        """Index the entry unless it is a near-duplicate; return the match (key, similarity) if it is."""
+        key = str(self.seen)
+        self.seen += 1
+        match = self.index.add_if_new(key, qa_text(entry))
+        if match is not None:
+            self.duplicates += 1
+        return match
+
+    def prime(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Index entries already in the output (resumed run) without counting them as seen."""
+        count = 0
+        for entry in entries:
+            self.index.add(f"p{count}", self.index.signature(qa_text(entry)))
+            count += 1
+        return count
+
+    def filter(self, entries: Iterable[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+        """Yield the entries that are not near-duplicates (offline pass)."""
+        for entry in entries:
+            if self.check(entry) is None:
+                yield entry
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "seen": self.seen,
+            "duplicates": self.duplicates,
+            "duplicate_rate": self.duplicates / self.seen if self.seen else 0.0,
+            "indexed": len(self.index)
+        }
+
+
+class DedupWriter:
+    """Dataset writer wrapper that drops near-duplicate entries while streaming."""
+
+    def __init__(self, writer, deduplicator: QADeduplicator):
+        self.writer = writer
+        self.deduplicator = deduplicator
+
+    @property
+    def result_path(self) -> str:
+        return self.writer.result_path
+
+    def write(self, entry: Dict[str, Any], paragraph_index: Optional[int] = None):
+        if self.deduplicator.check(entry) is None:
+            self.writer.write(entry, paragraph_index)
+
+    def write_batch(self, entries: List[Dict[str, Any]], paragraph_index: Optional[int] = None):
+        for entry in entries:
+            self.write(entry, paragraph_index)
+
+    def sync(self):
+        self.writer.sync()
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
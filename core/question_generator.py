@@ -2,25 +2,153 @@
 import json
 import re
 import logging
-from typing import List, Dict, Any
-from .ai_client import AIClient
+from typing import List, Dict, Any, Tuple, Optional, Iterator, Callable
+from .ai_client import AIClient, SchemaUnsupported
+from .json_stream import JSONArrayItemStream
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (Turkish text averages ~3 chars per token)."""
+    return len(text) // 3 + 1
+
+
+def failure_reason(error: str) -> str:
+    """Category of a generation error, for the per-reason failure counters."""
+    text = error.lower()
+    if 'timed out' in text or 'timeout' in text:
+        return 'timeout'
+    if 'connection' in text or 'bağlan' in text:
+        return 'connection'
+    if 'no valid questions' in text or 'no questions' in text:
+        return 'no_questions'
+    if 'json' in text:
+        return 'parse'
+    if re.search(r'\b[45]\d\d\b', text):
+        return 'http'
+    return 'other'
+
+
+def split_paragraph(paragraph: str) -> List[str]:
+    """Split a paragraph in two halves at the sentence (or word) boundary nearest the middle."""
+    middle = len(paragraph) // 2
+    cuts = [m.end() for m in re.finditer(r'[.!?:;]\s+', paragraph)] or \
+           [m.end() for m in re.finditer(r'\s+', paragraph)]
+    cuts = [c for c in cuts if 0 < c < len(paragraph)]
+    if not cuts:
+        return [paragraph]
+    cut = min(cuts, key=lambda c: abs(c - middle))
+    return [part for part in (paragraph[:cut].strip(), paragraph[cut:].strip()) if part]
 
 
 class QuestionGenerator:
     """Generate question-answer pairs from paragraphs."""
+
+    # Escalation order for paragraphs that failed: retry attempt n uses strategy n
+    RETRY_STRATEGIES = ('schema', 'split', 'fewer')
     
-    def __init__(self, ai_client: AIClient, min_questions: int = 3, max_questions: int = 8):
+    def __init__(self, ai_client: AIClient, min_questions: int = 3, max_questions: int = 8,
+                 batch_tokens: int = 0, batch_max_paragraphs: int = 8,
+                 request_options: Optional[Dict[str, Any]] = None, structured_output: bool = False,
+                 streaming: bool = False, stop_at_max: bool = True):
         self.ai_client = ai_client
         self.min_questions = min_questions
         self.max_questions = max_questions
+        # Batched mode: several paragraphs share one prompt (0 = one paragraph per request)
+        self.batch_tokens = batch_tokens
+        self.batch_max_paragraphs = max(1, batch_max_paragraphs)
+        # Backend hints passed with every request (cache_prompt, id_slot, keep_alive)
+        self.request_options = request_options or {}
+        # Streaming mode: questions are emitted as each Q/A object closes (single-paragraph requests)
+        self.streaming = streaming
+        self.stop_at_max = stop_at_max
+        # JSON Schema constrained decoding where the backend supports it, else the lenient parser only
+        self.use_schema = structured_output and getattr(ai_client, 'supports_json_schema', False)
+        self.stats = {"requests": 0, "paragraphs": 0, "prompt_tokens": 0, "cached_tokens": 0,
+                      "prefill_ms": 0.0, "prefill_requests": 0, "responses": 0, "parse_failures": 0}
+    
+    def _wrapper(self) -> str:
+        # Schema-constrained responses need an object root (OpenAI rejects top-level arrays)
+        return self.ai_client.json_wrapper or ('questions' if self.use_schema else '')
+
+    def response_schema(self, batch: bool = False) -> Dict[str, Any]:
+        """JSON Schema of the Q/A list: {"<wrapper>": [{instruction, input, output, confidence}]}."""
+        properties = {
+            "instruction": {"type": "string"},
+            "input": {"type": "string"},
+            "output": {"type": "string"},
+            "confidence": {"type": "string", "enum": ["high", "low"]}
+        }
+        if batch:
+            properties = {"paragraph_id": {"type": "integer"}, **properties}
+        item = {"type": "object", "properties": properties,
+                "required": list(properties), "additionalProperties": False}
+        return {
+            "type": "object",
+            "properties": {self._wrapper(): {"type": "array", "items": item}},
+            "required": [self._wrapper()],
+            "additionalProperties": False
+        }
+
+    def _generate(self, prompt: str, paragraphs: int = 1, batch: bool = False) -> str:
+        """Send a request and record prompt/prefill usage."""
+        options = dict(self.request_options)
+        if self.use_schema:
+            options['json_schema'] = self.response_schema(batch)
+        try:
+            response = self.ai_client.generate(prompt, options=options)
+        except SchemaUnsupported as e:
+            # Server rejected the schema (older version): continue with the lenient parser only
+            logging.getLogger(__name__).warning(f"Structured output rejected ({e}), falling back to plain JSON")
+            self.use_schema = False
+            return self._generate(prompt, paragraphs, batch)
+        if not isinstance(response, dict):
+            return response
+        usage = response.get('usage') or {}
+        self.stats["requests"] += 1
+        self.stats["paragraphs"] += paragraphs
+        self.stats["prompt_tokens"] += usage.get('prompt_tokens') or 0
+        self.stats["cached_tokens"] += usage.get('cached_tokens') or 0
+        if usage.get('prefill_ms') is not None:
+            self.stats["prefill_ms"] += usage['prefill_ms']
+            self.stats["prefill_requests"] += 1
+        return response['text']
+
+    def prefill_summary(self) -> Dict[str, Any]:
+        """Average prefill time and prompt cache hits per paragraph."""
+        paragraphs = max(self.stats["paragraphs"], 1)
+        timed = self.stats["prefill_requests"]
+        return {
+            "requests": self.stats["requests"],
+            "prompt_tokens_per_paragraph": self.stats["prompt_tokens"] / paragraphs,
+            "cached_tokens_per_paragraph": self.stats["cached_tokens"] / paragraphs,
+            # Only backends reporting server-side timings (llama.cpp, Ollama)
+            "prefill_ms_per_paragraph": self.stats["prefill_ms"] / paragraphs if timed else None
+        }
+
+    def parse_summary(self) -> Dict[str, Any]:
+        """Responses that could not be turned into questions."""
+        responses = self.stats["responses"]
+        return {
+            "structured": self.use_schema,
+            "responses": responses,
+            "parse_failures": self.stats["parse_failures"],
+            "failure_rate": self.stats["parse_failures"] / responses if responses else 0.0
+        }
+
+    def _parse(self, response: str) -> List[Dict[str, Any]]:
+        self.stats["responses"] += 1
+        try:
+            return self._parse_response(response)
+        except ValueError:
+            self.stats["parse_failures"] += 1
+            raise
     
     def generate_questions(self, paragraph: str) -> List[Dict[str, Any]]:
         """Generate questions from a paragraph."""
         prompt = self._create_prompt(paragraph)
         
         try:
-            response = self.ai_client.generate(prompt)
-            questions = self._parse_response(response)
+            questions = self._parse(self._generate(prompt))
             return questions
         except Exception as e:
             # Log detailed error information
@@ -49,35 +177,232 @@ class QuestionGenerator:
             logger.error(f"{'='*80}\n")
             raise RuntimeError(f"Question generation failed: {str(e)}")
     
-    def _create_prompt(self, paragraph: str) -> str:
-        """Create prompt for question generation."""
-        # Determine output format based on config
-        json_wrapper = self.ai_client.json_wrapper
-        
-        if json_wrapper:
-            # Wrapped format: {"questions": [...]}
-            example_format = f'''{{
-  "{json_wrapper}": [
-    {{
+    def retry_questions(self, paragraph: str, strategy: str) -> List[Dict[str, Any]]:
+        """Generate questions for a paragraph that failed before, with an escalated strategy.
+
+        All strategies send a single non-streamed request with schema
+        constrained output where the backend supports it:
+        - 'schema': just that;
+        - 'split': the paragraph is sent as two halves with half the questions
+          each (a half that still fails is skipped);
+        - 'fewer': at least one and at most half of max_questions.
+        Raises RuntimeError like generate_questions.
+        """
+        if strategy not in self.RETRY_STRATEGIES:
+            raise ValueError(f"Unknown retry strategy: {strategy}")
+        saved = (self.use_schema, self.streaming, self.min_questions, self.max_questions)
+        self.use_schema = getattr(self.ai_client, 'supports_json_schema', False)
+        self.streaming = False
+        try:
+            if strategy == 'split':
+                parts = split_paragraph(paragraph)
+                self.min_questions = max(1, self.min_questions // len(parts))
+                self.max_questions = max(self.min_questions, -(-self.max_questions // len(parts)))
+                questions, error = [], None
+                for part in parts:
+                    try:
+                        questions.extend(self.generate_questions(part))
+                    except RuntimeError as e:
+                        error = e
+                if not questions:
+                    raise error
+                return questions
+            if strategy == 'fewer':
+                self.min_questions = 1
+                self.max_questions = max(1, self.max_questions // 2)
+            return self.generate_questions(paragraph)
+        finally:
+            # A schema the server rejected stays off for the rest of the run
+            schema_rejected = not self.use_schema and getattr(self.ai_client, 'supports_json_schema', False)
+            self.use_schema, self.streaming, self.min_questions, self.max_questions = saved
+            if schema_rejected:
+                self.use_schema = False
+
+    def generate_questions_stream(self, paragraph: str) -> Iterator[Dict[str, Any]]:
+        """Yield questions while the model is still generating.
+
+        Every Q/A object is yielded as soon as it closes in the streamed
+        response. With stop_at_max the stream is closed (and the backend stops
+        generating) once max_questions objects have arrived. If the stream
+        breaks after some questions were yielded they are kept; if none were,
+        RuntimeError is raised like generate_questions.
+        """
+        logger = logging.getLogger(__name__)
+        options = dict(self.request_options)
+        if self.use_schema:
+            options['json_schema'] = self.response_schema()
+
+        parser = JSONArrayItemStream()
+        text, error, rejected, emitted = [], None, False, 0
+        stream = self.ai_client.generate_stream(self._create_prompt(paragraph), options=options)
+        try:
+            for chunk in stream:
+                if chunk.get('type') == 'error':
+                    error = chunk.get('message')
+                    rejected = chunk.get('schema_rejected', False)
+                    break
+                if chunk.get('type') != 'content':
+                    continue
+                text.append(chunk['text'])
+                for item in parser.feed(chunk['text']):
+                    question = self._normalize_question(item)
+                    if not question:
+                        continue
+                    question.pop('paragraph_id', None)
+                    emitted += 1
+                    if emitted == 1:
+                        self._count_request()
+                        self.stats["responses"] += 1
+                    yield question
+                    if self.stop_at_max and emitted >= self.max_questions:
+                        return
+        finally:
+            # Closing the generator closes the HTTP response, which ends generation server-side
+            stream.close()
+
+        if emitted:
+            if error:
+                logger.warning(f"Stream broke after {emitted} questions, keeping them: {error}")
+            return
+        if error is not None:
+            # Transport/HTTP error: no response to parse
+            if self.use_schema and rejected:
+                # Server rejected the schema (older version): continue with the lenient parser only
+                logger.warning(f"Structured output rejected ({error}), falling back to plain JSON")
+                self.use_schema = False
+                yield from self.generate_questions_stream(paragraph)
+                return
+            raise RuntimeError(f"Question generation failed: {error}")
+        # Nothing array-shaped arrived; try the lenient parser on the whole text
+        self._count_request()
+        try:
+            questions = self._parse(''.join(text))
+        except ValueError as e:
+            raise RuntimeError(f"Question generation failed: {e}")
+        yield from questions
+
+    def _count_request(self):
+        """A streamed single-paragraph request got a response."""
+        self.stats["requests"] += 1
+        self.stats["paragraphs"] += 1
+
+    def make_batches(self, items: List[Tuple[int, str]]) -> List[List[Tuple[int, str]]]:
+        """Group (index, paragraph) pairs into batches that fit batch_tokens."""
+        if not self.batch_tokens:
+            return [[item] for item in items]
+        batches, current, used = [], [], 0
+        for item in items:
+            tokens = estimate_tokens(item[1])
+            if current and (used + tokens > self.batch_tokens or len(current) >= self.batch_max_paragraphs):
+                batches.append(current)
+                current, used = [], 0
+            current.append(item)
+            used += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def generate_batch(self, items: List[Tuple[int, str]],
+                       on_question: Optional[Callable[[int, Dict[str, Any]], None]] = None
+                       ) -> Tuple[Dict[int, List[Dict[str, Any]]], Dict[int, str]]:
+        """Generate questions for several paragraphs with one request.
+
+        Returns (questions by paragraph index, error by paragraph index). If
+        the response cannot be parsed the batch is split in half and retried;
+        paragraphs that got no questions are retried on their own.
+        `on_question(index, question)` is called for every question once it
+        is final, as it streams in for single-paragraph requests in
+        streaming mode.
+        """
+        if len(items) == 1:
+            index, paragraph = items[0]
+            questions = []
+            try:
+                if self.streaming:
+                    for question in self.generate_questions_stream(paragraph):
+                        questions.append(question)
+                        if on_question:
+                            on_question(index, question)
+                    return {index: questions}, {}
+                questions = self.generate_questions(paragraph)
+            except Exception as e:
+                return {}, {index: str(e)}
+            self._emit(on_question, {index: questions})
+            return {index: questions}, {}
+
+        logger = logging.getLogger(__name__)
+        try:
+            prompt = self._create_batch_prompt([p for _, p in items])
+            questions = self._parse(self._generate(prompt, len(items), batch=True))
+        except Exception as e:
+            logger.warning(f"Batch of {len(items)} paragraphs failed ({e}), splitting")
+            return self._split_batch(items, on_question)
+
+        results: Dict[int, List[Dict[str, Any]]] = {}
+        for q in questions:
+            try:
+                local_id = int(str(q.pop('paragraph_id', '')).strip().lstrip('Pp'))
+            except ValueError:
+                continue
+            if 1 <= local_id <= len(items):
+                results.setdefault(items[local_id - 1][0], []).append(q)
+
+        missing = [item for item in items if item[0] not in results]
+        if len(missing) == len(items):
+            logger.warning(f"Batch of {len(items)} paragraphs returned no paragraph ids, splitting")
+            return self._split_batch(items, on_question)
+        self._emit(on_question, results)
+        errors: Dict[int, str] = {}
+        if missing:
+            more, errors = self.generate_batch(missing, on_question)
+            results.update(more)
+        return results, errors
+
+    @staticmethod
+    def _emit(on_question, results):
+        if on_question:
+            for index, questions in results.items():
+                for question in questions:
+                    on_question(index, question)
+
+    def _split_batch(self, items, on_question=None):
+        half = len(items) // 2
+        results, errors = self.generate_batch(items[:half], on_question)
+        more, more_errors = self.generate_batch(items[half:], on_question)
+        results.update(more)
+        errors.update(more_errors)
+        return results, errors
+
+    def _example_format(self, batch: bool = False) -> str:
+        """JSON example shown to the model (wrapped or direct array, per config)."""
+        item = '''{
       "instruction": "Soru metni",
       "input": "",
       "output": "Cevap metni",
       "confidence": "high"
-    }}
-  ]
-}}'''
-        else:
-            # Direct array format: [...]
-            example_format = '''[
-  {
-    "instruction": "Soru metni",
-    "input": "",
-    "output": "Cevap metni",
-    "confidence": "high"
-  }
-]'''
-        
-        return f"""Aşağıdaki metinden {self.min_questions}-{self.max_questions} adet soru-cevap çifti oluştur.
+    }'''
+        if batch:
+            item = item.replace('{\n', '{\n      "paragraph_id": 1,\n', 1)
+        json_wrapper = self._wrapper()
+        if json_wrapper:
+            # Wrapped format: {"questions": [...]}
+            return f'{{\n  "{json_wrapper}": [\n    {item}\n  ]\n}}'
+        # Direct array format: [...]
+        return f'[\n  {item.replace(chr(10) + "  ", chr(10))}\n]'
+
+    def _instructions(self, batch: bool = False) -> str:
+        """Static part of the prompt.
+
+        It is byte-identical for every request of a run and comes first, so
+        backends with prompt caching (llama.cpp cache_prompt, Ollama, LM
+        Studio) reuse its KV cache; everything that varies follows it.
+        """
+        batch_rules = '''
+7. Her soru yalnızca kendi metnindeki bilgiyi kullanmalı; metinleri birbirine karıştırma
+8. Her sorunun "paragraph_id" alanına sorunun üretildiği metnin numarasını yaz ([P3] için 3)''' if batch else ''
+        task = ("Sana numaralandırılmış metinler verilecek. HER BİRİ için ayrı ayrı soru-cevap çiftleri oluştur."
+                if batch else "Sana bir metin verilecek. Bu metinden soru-cevap çiftleri oluştur.")
+        return f"""{task}
 
 KRİTİK KURALLAR:
 1. SADECE metinde açıkça geçen bilgilerden soru oluştur
@@ -85,7 +410,7 @@ KRİTİK KURALLAR:
 3. HALÜSİNASYON YAPMA - metinde olmayan bilgi ekleme
 4. İngilizce kelime kullanma (available, usually vb. YASAK)
 5. Gramer hatası yapma, düzgün Türkçe cümleler kur
-6. Sorular çeşitli olmalı (ne, nasıl, neden, kaç, hangi vb.)
+6. Sorular çeşitli olmalı (ne, nasıl, neden, kaç, hangi vb.){batch_rules}
 
 CONFIDENCE KURALLARI:
 - "high": Metinde açıkça yazıyor, net kural var
@@ -97,12 +422,27 @@ JSON KURALLARI:
 - Özel karakterleri escape et (\\n, \\", \\\\)
 - Tırnak işaretlerini kapatmayı unutma
 
-METIN:
+SADECE geçerli JSON formatında cevap ver, başka açıklama ekleme:
+{self._example_format(batch)}
+"""
+
+    def _create_batch_prompt(self, paragraphs: List[str]) -> str:
+        """Create one prompt for several paragraphs, each tagged with an id."""
+        texts = "\n\n".join(f"[P{i}]\n{paragraph}" for i, paragraph in enumerate(paragraphs, 1))
+        return f"""{self._instructions(batch=True)}
+METİNLER:
+{texts}
+
+Yukarıdaki {len(paragraphs)} metnin her biri için {self.min_questions}-{self.max_questions} adet soru-cevap çifti oluştur."""
+
+    def _create_prompt(self, paragraph: str) -> str:
+        """Create prompt for question generation: static instructions first, then the paragraph."""
+        return f"""{self._instructions()}
+METİN:
 {paragraph}
 
-SADECE geçerli JSON formatında cevap ver, başka açıklama ekleme:
-{example_format}"""
-    
+Yukarıdaki metinden {self.min_questions}-{self.max_questions} adet soru-cevap çifti oluştur."""
+
     def _parse_response(self, response: str) -> List[Dict[str, Any]]:
         """Parse AI response and extract questions."""
         logger = logging.getLogger(__name__)
@@ -118,7 +458,7 @@ SADECE geçerli JSON formatında cevap ver, başka açıklama ekleme:
             data = json.loads(response)
             
             # Check if it's wrapped (e.g., {"questions": [...]} or {"sorular": [...]})
-            json_wrapper = self.ai_client.json_wrapper
+            json_wrapper = self._wrapper()
             wrapper_variants = [json_wrapper, 'sorular', 'questions', 'items']  # Turkish and English variants
             
             if isinstance(data, dict):
@@ -161,46 +501,7 @@ SADECE geçerli JSON formatında cevap ver, başka açıklama ekleme:
                 raise ValueError(f"Failed to parse JSON: {str(e)}")
         
         # Validate and clean
-        validated = []
-        for q in questions:
-            # Normalize Turkish field names to English
-            normalized = {}
-            
-            # Map Turkish to English field names
-            field_mapping = {
-                'instruction': 'instruction',
-                'soru': 'instruction',
-                'input': 'input',
-                'giriş': 'input',
-                'girdi': 'input',
-                'output': 'output',
-                'çıkış': 'output',
-                'cevap': 'output',
-                'confidence': 'confidence',
-                'güvenilirlik': 'confidence',
-                'güven': 'confidence'
-            }
-            
-            # Normalize fields
-            for key, value in q.items():
-                normalized_key = field_mapping.get(key.lower(), key)
-                normalized[normalized_key] = value
-            
-            # Check required fields
-            if all(k in normalized for k in ['instruction', 'output', 'confidence']):
-                if 'input' not in normalized:
-                    normalized['input'] = ""
-                
-                # Normalize confidence values
-                conf = str(normalized['confidence']).lower()
-                if conf in ['high', 'yüksek', 'yuksek']:
-                    normalized['confidence'] = 'high'
-                elif conf in ['low', 'düşük', 'dusuk', 'alçak']:
-                    normalized['confidence'] = 'low'
-                else:
-                    normalized['confidence'] = 'low'
-                
-                validated.append(normalized)
+        validated = [q for q in (self._normalize_question(q) for q in questions) if q]
         
         if not validated:
             logger.error(f"No valid questions found after validation")
@@ -208,3 +509,51 @@ SADECE geçerli JSON formatında cevap ver, başka açıklama ekleme:
             raise ValueError("No valid questions found in response")
         
         return validated
+
+    @staticmethod
+    def _normalize_question(q: Any) -> Optional[Dict[str, Any]]:
+        """Normalize field names/confidence of one Q/A object; None if it is incomplete."""
+        if not isinstance(q, dict):
+            return None
+        # Normalize Turkish field names to English
+        normalized = {}
+        
+        # Map Turkish to English field names
+        field_mapping = {
+            'instruction': 'instruction',
+            'soru': 'instruction',
+            'input': 'input',
+            'giriş': 'input',
+            'girdi': 'input',
+            'output': 'output',
+            'çıkış': 'output',
+            'cevap': 'output',
+            'confidence': 'confidence',
+            'güvenilirlik': 'confidence',
+            'güven': 'confidence',
+            'paragraph_id': 'paragraph_id',
+            'paragraf_id': 'paragraph_id',
+            'paragraf': 'paragraph_id'
+        }
+        
+        # Normalize fields
+        for key, value in q.items():
+            normalized_key = field_mapping.get(key.lower(), key)
+            normalized[normalized_key] = value
+        
+        # Check required fields
+        if not all(k in normalized for k in ['instruction', 'output', 'confidence']):
+            return None
+        if 'input' not in normalized:
+            normalized['input'] = ""
+        
+        # Normalize confidence values
+        conf = str(normalized['confidence']).lower()
+        if conf in ['high', 'yüksek', 'yuksek']:
+            normalized['confidence'] = 'high'
+        elif conf in ['low', 'düşük', 'dusuk', 'alçak']:
+            normalized['confidence'] = 'low'
+        else:
+            normalized['confidence'] = 'low'
+        
+        return normalized
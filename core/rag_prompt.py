@@ -0,0 +1,27 @@
+"""Prompt assembly for answering questions from document chunks (/ask)."""
+from typing import List, Dict, Any, Tuple
+
+INSTRUCTION = ("Sen yardımcı bir doküman asistanısın. Eğer aşağıda doküman parçaları verilmişse öncelikle "
+               "onlara sadık kalarak cevapla. Eğer doküman seçilmediği belirtilmişse genel bilginle yardımcı ol.")
+NO_SOURCES_CONTEXT = "DİKKAT: Kullanıcı herhangi bir doküman seçmedi. Bu cevabı genel bilginle ver."
+
+
+def format_context(contexts: List[str], metadatas: List[Dict[str, Any]]) -> str:
+    """Retrieved chunks, each headed by its source."""
+    return "\n\n".join([f"[Kaynak: {m['source']}]\n{c}" for c, m in zip(contexts, metadatas)])
+
+
+def format_history(messages: List[Tuple[str, str]]) -> str:
+    """Previous (role, content) messages of the chat, oldest first."""
+    return "\n".join([f"{'Kullanıcı' if role == 'user' else 'Asistan'}: {content}" for role, content in messages])
+
+
+def build_prompt(query: str, context_text: str, history_text: str = '') -> str:
+    """Full prompt: instruction, chat history, document context, question."""
+    prompt = f"{INSTRUCTION}\n\n"
+    if history_text:
+        prompt += f"--- Önceki Yazışmalar ---\n{history_text}\n\n"
+
+    prompt += f"--- Doküman Bağlamı ---\n{context_text}\n\n"
+    prompt += f"Soru: {query}\n\nCevap:"
+    return prompt
@@ -0,0 +1,264 @@
+"""Router that stores each source or owner in its own collection."""
+import os
+import json
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Callable
+from .vector_backend import VectorBackend
+from .file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+
+def _values(condition: Any) -> Optional[set]:
+    """Literal values a field condition can match, or None if not a simple equality/$in."""
+    if not isinstance(condition, dict):
+        return {condition}
+    if set(condition) == {'$eq'}:
+        return {condition['$eq']}
+    if set(condition) == {'$in'}:
+        return set(condition['$in'])
+    return None
+
+
+def shard_may_match(summary: Dict[str, Any], where: Optional[Dict]) -> bool:
+    """Conservatively decide whether any record of a shard can satisfy `where`.
+
+    Only `source`, `user_id` and `is_public` conditions are checked against the
+    shard summary; anything else is assumed to possibly match.
+    """
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(shard_may_match(summary, sub) for sub in condition):
+                return False
+        elif key == '$or':
+            if not any(shard_may_match(summary, sub) for sub in condition):
+                return False
+        elif key == 'source':
+            values = _values(condition)
+            if values is not None and not values & set(summary['sources']):
+                return False
+        elif key == 'user_id':
+            values = _values(condition)
+            if values is not None and not values & set(summary['owners']):
+                return False
+        elif key == 'is_public':
+            if condition is True and not summary['public']:
+                return False
+    return True
+
+
+def shard_covers(summary: Dict[str, Any], where: Optional[Dict]) -> bool:
+    """True if every record of a shard is guaranteed to satisfy `where`."""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(shard_covers(summary, sub) for sub in condition):
+                return False
+        elif key in ('source', 'user_id'):
+            values = _values(condition)
+            present = set(summary['sources'] if key == 'source' else summary['owners'])
+            if values is None or not present <= values:
+                return False
+        else:
+            return False
+    return True
+
+
+class ShardedBackend(VectorBackend):
+    """Keeps one collection per source (or per owner) behind a single backend API.
+
+    A registry file next to the data records, for every shard, the sources,
+    owners (None for documents without one) and whether it holds public
+    documents. Queries only fan out to the shards a filter can match and
+    results are merged by distance. Deleting a whole source (or a whole owner)
+    drops the shard instead of deleting rows.
+    """
+
+    SHARD_KEYS = {'source': 'source', 'owner': 'user_id'}
+
+    def __init__(self, db_path: str, collection_name: str, shard_by: str,
+                 factory: Callable[[str], VectorBackend]):
+        super().__init__(db_path, collection_name)
+        if shard_by not in self.SHARD_KEYS:
+            raise ValueError(f"Unsupported sharding mode: {shard_by}")
+        self.shard_by = shard_by
+        self.factory = factory
+        self.registry_path = os.path.join(db_path, f"{collection_name}.shards.json")
+        self.lock_path = self.registry_path + '.lock'
+        self._shards: Dict[str, VectorBackend] = {}
+        self._registry: Dict[str, Dict[str, Any]] = {}
+        self._stat = None
+        self._load_registry()
+
+    # --- Registry ---
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.registry_path)
+            return (st.st_ino, st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+    def _load_registry(self):
+        self._registry = {}
+        if os.path.exists(self.registry_path):
+            with open(self.registry_path, 'r', encoding='utf-8') as f:
+                self._registry = json.load(f).get('shards', {})
+        # Forget handles of shards dropped by another process
+        for name in list(self._shards):
+            if name not in self._registry:
+                del self._shards[name]
+        self._stat = self._file_stat()
+
+    def _refresh(self):
+        if self._file_stat() != self._stat:
+            self._load_registry()
+
+    @contextmanager
+    def _updating_registry(self):
+        """Read-modify-write of the registry under the file lock.
+
+        gunicorn workers, ingest.py and watch_ingest.py share the registry; it
+        is re-read under the lock so another process's new shards are kept.
+        """
+        with file_lock(self.lock_path):
+            self._load_registry()
+            yield
+            self._save_registry()
+
+    def _save_registry(self):
+        tmp = self.registry_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"shard_by": self.shard_by, "shards": self._registry}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.registry_path)
+        self._stat = self._file_stat()
+
+    def _shard_name(self, key: Any) -> str:
+        digest = hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:16]
+        return f"{self.collection_name}__{self.shard_by[0]}{digest}"
+
+    def _shard(self, name: str) -> VectorBackend:
+        if name not in self._shards:
+            self._shards[name] = self.factory(name)
+        return self._shards[name]
+
+    def _candidates(self, where: Optional[Dict]) -> List[str]:
+        self._refresh()
+        return sorted(name for name, summary in self._registry.items() if shard_may_match(summary, where))
+
+    def _summarize(self, name: str):
+        """Recompute a shard summary from its contents; drop it if empty."""
+        shard = self._shard(name)
+        data = shard.get(include=['metadatas'])
+        metas = data.get('metadatas') or []
+        if not metas:
+            self._drop(name)
+            return
+        entry = self._registry[name]
+        entry['sources'] = sorted({m.get('source') for m in metas}, key=str)
+        entry['owners'] = sorted({m.get('user_id') for m in metas}, key=str)
+        entry['public'] = any(m.get('is_public') for m in metas)
+
+    def _drop(self, name: str):
+        self._shard(name).drop()
+        self._shards.pop(name, None)
+        self._registry.pop(name, None)
+
+    # --- VectorBackend API ---
+
+    def add(self, documents: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]], ids: List[str]):
+        field = self.SHARD_KEYS[self.shard_by]
+        groups: Dict[str, List[int]] = {}
+        for i, meta in enumerate(metadatas):
+            groups.setdefault(self._shard_name(meta.get(field)), []).append(i)
+
+        with self._updating_registry():
+            for name, rows in groups.items():
+                self._shard(name).add(
+                    [documents[i] for i in rows],
+                    [embeddings[i] for i in rows],
+                    [metadatas[i] for i in rows],
+                    [ids[i] for i in rows]
+                )
+                entry = self._registry.setdefault(name, {
+                    "key": metadatas[rows[0]].get(field), "sources": [], "owners": [], "public": False
+                })
+                entry['sources'] = sorted(set(entry['sources']) | {metadatas[i].get('source') for i in rows}, key=str)
+                entry['owners'] = sorted(set(entry['owners']) | {metadatas[i].get('user_id') for i in rows}, key=str)
+                entry['public'] = entry['public'] or any(metadatas[i].get('is_public') for i in rows)
+
+    def search(self, query_embedding: List[float], n_results: int, where: Optional[Dict] = None) -> Dict[str, Any]:
+        hits = []
+        for name in self._candidates(where):
+            res = self._shard(name).search(query_embedding, n_results, where=where)
+            if not res or not res['ids'] or not res['ids'][0]:
+                continue
+            distances = res.get('distances') or [[0.0] * len(res['ids'][0])]
+            hits.extend(zip(distances[0], res['ids'][0], res['documents'][0], res['metadatas'][0]))
+
+        hits.sort(key=lambda h: h[0])
+        hits = hits[:n_results]
+        return {
+            "ids": [[h[1] for h in hits]],
+            "documents": [[h[2] for h in hits]],
+            "metadatas": [[h[3] for h in hits]],
+            "distances": [[h[0] for h in hits]]
+        }
+
+    def get(self, where: Optional[Dict] = None, where_document: Optional[Dict] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: Optional[List[str]] = None) -> Dict[str, Any]:
+        offset = offset or 0
+        out = {"ids": [], "documents": [], "metadatas": []}
+        for name in self._candidates(where):
+            wanted = None if limit is None else offset + limit - len(out['ids'])
+            if wanted is not None and wanted <= 0:
+                break
+            res = self._shard(name).get(where=where, where_document=where_document, limit=wanted, include=include)
+            for key in out:
+                out[key].extend(res.get(key) or [])
+        end = None if limit is None else offset + limit
+        return {key: values[offset:end] for key, values in out.items()}
+
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        field = self.SHARD_KEYS[self.shard_by]
+        groups: Dict[str, List[int]] = {}
+        for i, meta in enumerate(metadatas):
+            groups.setdefault(self._shard_name(meta.get(field)), []).append(i)
+        with self._updating_registry():
+            for name, rows in groups.items():
+                if name not in self._registry:
+                    continue
+                self._shard(name).update_metadatas([ids[i] for i in rows], [metadatas[i] for i in rows])
+                self._summarize(name)
+
+    def delete(self, where: Optional[Dict] = None, ids: Optional[List[str]] = None):
+        if where is None and ids is None:
+            raise ValueError("delete() needs a where filter or ids")
+        with self._updating_registry():
+            for name in self._candidates(where):
+                if ids is None and shard_covers(self._registry[name], where):
+                    logger.info(f"Dropping shard {name} ({self._registry[name].get('key')})")
+                    self._drop(name)
+                else:
+                    self._shard(name).delete(where=where, ids=ids)
+                    self._summarize(name)
+
+    def count(self) -> int:
+        return sum(self._shard(name).count() for name in self._candidates(None))
+
+    def reset(self):
+        with self._updating_registry():
+            for name in self._candidates(None):
+                self._drop(name)
+
+    def drop(self):
+        self.reset()
+        with file_lock(self.lock_path):
+            if os.path.exists(self.registry_path):
+                os.remove(self.registry_path)
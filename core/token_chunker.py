@@ -0,0 +1,216 @@
+"""Token-aware chunking with the embedding model's tokenizer."""
+import os
+import re
+import statistics
+from typing import List, Dict, Any, Optional
+
+# Split boundaries from coarse to fine: blank line, line, sentence
+_SEPARATORS = ((re.compile(r'\n\s*\n'), '\n\n'), (re.compile(r'\n'), '\n'), (re.compile(r'(?<=[.!?;:])\s+'), ' '))
+
+_tokenizers_cache: Dict[str, Any] = {}
+
+
+def _tokenizers():
+    try:
+        import tokenizers
+    except ImportError:
+        raise RuntimeError("Token-aware chunking requires the 'tokenizers' package (pip install tokenizers)")
+    return tokenizers
+
+
+def load_tokenizer(name_or_path: str):
+    """Tokenizer from a tokenizer.json file, a directory containing one, or a Hugging Face model id.
+
+    Loaded once per process.
+    """
+    if name_or_path not in _tokenizers_cache:
+        tokenizers = _tokenizers()
+        path = name_or_path
+        if os.path.isdir(path):
+            path = os.path.join(path, 'tokenizer.json')
+        if os.path.isfile(path):
+            tokenizer = tokenizers.Tokenizer.from_file(path)
+        else:
+            tokenizer = tokenizers.Tokenizer.from_pretrained(name_or_path)
+        _tokenizers_cache[name_or_path] = tokenizer
+    return _tokenizers_cache[name_or_path]
+
+
+def size_distribution(sizes: List[int], min_size: Optional[int] = None,
+                      max_size: Optional[int] = None) -> Dict[str, Any]:
+    """Count, mean, percentiles and extremes of chunk sizes, plus chunks outside [min_size, max_size]."""
+    if not sizes:
+        return {"count": 0}
+    ordered = sorted(sizes)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    report = {
+        "count": len(ordered),
+        "min": ordered[0],
+        "p10": percentile(10),
+        "p50": percentile(50),
+        "p90": percentile(90),
+        "p99": percentile(99),
+        "max": ordered[-1],
+        "mean": statistics.mean(ordered)
+    }
+    if min_size is not None:
+        report["below_min"] = sum(1 for s in ordered if s < min_size)
+    if max_size is not None:
+        report["above_max"] = sum(1 for s in ordered if s > max_size)
+    return report
+
+
+def chunking_settings(rag_cfg: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """The `rag` settings that decide how a document is chunked (stored in the ingest manifest)."""
+    rag_cfg = rag_cfg or {}
+    if rag_cfg.get('chunking', 'chars') != 'tokens':
+        return {"chunking": "chars"}
+    return {
+        "chunking": "tokens",
+        "tokenizer": rag_cfg.get('tokenizer'),
+        "chunk_min_tokens": rag_cfg.get('chunk_min_tokens', 128),
+        "chunk_max_tokens": rag_cfg.get('chunk_max_tokens', 512),
+        "chunk_overlap_tokens": rag_cfg.get('chunk_overlap_tokens', 32)
+    }
+
+
+class TokenChunker:
+    """Pack or split paragraphs to a target token range of the embedding model.
+
+    Paragraphs are joined with the following ones while the chunk is below
+    `min_tokens` and the result stays within `max_tokens`. A paragraph over
+    `max_tokens` is split at the coarsest boundary that works (blank line,
+    line, sentence, and as a last resort token offsets); consecutive pieces
+    of one split paragraph share `overlap_tokens` tokens so text around a cut
+    is found from either side. Counts exclude the special tokens the
+    embedding model adds.
+    """
+
+    def __init__(self, tokenizer, min_tokens: int = 128, max_tokens: int = 512, overlap_tokens: int = 32):
+        self.tokenizer = tokenizer
+        self.max_tokens = max(1, int(max_tokens))
+        self.min_tokens = min(max(0, int(min_tokens)), self.max_tokens)
+        self.overlap_tokens = min(max(0, int(overlap_tokens)), self.max_tokens // 2)
+
+    @classmethod
+    def from_config(cls, rag_cfg: Optional[Dict[str, Any]]) -> Optional['TokenChunker']:
+        """Chunker for the `rag` section of config.yaml; None unless rag.chunking is 'tokens'."""
+        rag_cfg = rag_cfg or {}
+        if rag_cfg.get('chunking', 'chars') != 'tokens':
+            return None
+        if not rag_cfg.get('tokenizer'):
+            raise ValueError("rag.chunking 'tokens' requires rag.tokenizer (tokenizer.json path or model id)")
+        return cls(
+            load_tokenizer(rag_cfg['tokenizer']),
+            min_tokens=rag_cfg.get('chunk_min_tokens', 128),
+            max_tokens=rag_cfg.get('chunk_max_tokens', 512),
+            overlap_tokens=rag_cfg.get('chunk_overlap_tokens', 32)
+        )
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def count_many(self, texts: List[str]) -> List[int]:
+        return [len(e.ids) for e in self.tokenizer.encode_batch(texts, add_special_tokens=False)]
+
+    # --- Splitting ---
+
+    def _windows(self, text: str, limit: int) -> List[str]:
+        """Cut text into pieces of `limit` tokens by character offsets."""
+        offsets = self.tokenizer.encode(text, add_special_tokens=False).offsets
+        pieces = []
+        for start in range(0, len(offsets), limit):
+            window = offsets[start:start + limit]
+            end = offsets[start + limit][0] if start + limit < len(offsets) else len(text)
+            piece = text[window[0][0]:end].strip()
+            if piece:
+                pieces.append(piece)
+        return pieces
+
+    def _pack(self, pieces: List[str], joiner: str, limit: int) -> List[str]:
+        """Join consecutive pieces greedily while they fit in `limit` tokens."""
+        packed, current = [], ''
+        for piece in pieces:
+            candidate = current + joiner + piece if current else piece
+            if current and self.count(candidate) > limit:
+                packed.append(current)
+                current = piece
+            else:
+                current = candidate
+        if current:
+            packed.append(current)
+        return packed
+
+    def _split(self, text: str, limit: int, level: int = 0) -> List[str]:
+        """Pieces of at most `limit` tokens."""
+        if self.count(text) <= limit:
+            return [text]
+        if level >= len(_SEPARATORS):
+            return self._windows(text, limit)
+        pattern, joiner = _SEPARATORS[level]
+        parts = [p.strip() for p in pattern.split(text) if p.strip()]
+        if len(parts) < 2:
+            return self._split(text, limit, level + 1)
+        pieces = []
+        for part in parts:
+            pieces.extend(self._split(part, limit, level + 1))
+        return self._pack(pieces, joiner, limit)
+
+    def _overlap_tail(self, text: str) -> str:
+        """About the last overlap_tokens tokens of text, starting at a word and outside image markers."""
+        offsets = self.tokenizer.encode(text, add_special_tokens=False).offsets
+        if not self.overlap_tokens or len(offsets) <= self.overlap_tokens:
+            return ''
+        start = offsets[-self.overlap_tokens][0]
+        if start > 0 and not text[start - 1].isspace():
+            match = re.compile(r'\s').search(text, start)
+            start = match.end() if match else len(text)
+        tail = text[start:]
+        close = tail.find(']')
+        if close != -1 and '[' not in tail[:close]:
+            tail = tail[close + 1:]
+        return tail.strip()
+
+    def split(self, paragraph: str) -> List[str]:
+        """Split one paragraph into overlapping chunks of at most max_tokens."""
+        pieces = self._split(paragraph, self.max_tokens - self.overlap_tokens)
+        chunks = pieces[:1]
+        for previous, piece in zip(pieces, pieces[1:]):
+            tail = self._overlap_tail(previous)
+            chunks.append(f"{tail} {piece}" if tail else piece)
+        return chunks
+
+    # --- Packing ---
+
+    def chunk(self, paragraphs: List[str]) -> List[str]:
+        """Chunks of the paragraphs, in order, within the target token range where the text allows."""
+        chunks: List[str] = []
+        current, current_tokens = '', 0
+        for paragraph, tokens in zip(paragraphs, self.count_many(paragraphs)):
+            if tokens > self.max_tokens:
+                if current:
+                    chunks.append(current)
+                    current, current_tokens = '', 0
+                chunks.extend(self.split(paragraph))
+                continue
+            if current and current_tokens < self.min_tokens:
+                joined = current + '\n\n' + paragraph
+                joined_tokens = self.count(joined)
+                if joined_tokens <= self.max_tokens:
+                    current, current_tokens = joined, joined_tokens
+                    continue
+            if current:
+                chunks.append(current)
+            current, current_tokens = paragraph, tokens
+        if current:
+            # A short last chunk goes into the previous one if it fits
+            if chunks and current_tokens < self.min_tokens:
+                joined = chunks[-1] + '\n\n' + current
+                if self.count(joined) <= self.max_tokens:
+                    chunks[-1] = joined
+                    return chunks
+            chunks.append(current)
+        return chunks
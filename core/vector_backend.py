@@ -0,0 +1,72 @@
+"""Abstract base class for vector storage backends."""
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+
+
+class VectorBackend(ABC):
+    """Storage primitives used by VectorDB.
+
+    Filters use ChromaDB's `where` / `where_document` syntax so that the
+    higher level logic in VectorDB works unchanged on every backend.
+    """
+
+    def __init__(self, db_path: str, collection_name: str):
+        self.db_path = db_path
+        self.collection_name = collection_name
+
+    @property
+    def max_batch_size(self) -> Optional[int]:
+        """Largest batch a single `add` call can write, None if unlimited."""
+        return None
+
+    @contextmanager
+    def bulk(self, defer_index: bool = False):
+        """Wrap a series of large `add` calls; backends may defer index maintenance."""
+        yield
+
+    @abstractmethod
+    def add(self, documents: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]], ids: List[str]):
+        """Insert a batch of documents."""
+        pass
+
+    @abstractmethod
+    def search(self, query_embedding: List[float], n_results: int, where: Optional[Dict] = None) -> Dict[str, Any]:
+        """Nearest neighbour search.
+        Returns: {"ids": [[...]], "documents": [[...]], "metadatas": [[...]], "distances": [[...]]}
+        """
+        pass
+
+    @abstractmethod
+    def get(self, where: Optional[Dict] = None, where_document: Optional[Dict] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Fetch documents by filter. `include` defaults to documents and metadatas.
+        Returns: {"ids": [...], "documents": [...], "metadatas": [...]}
+        """
+        pass
+
+    @abstractmethod
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Replace metadata of the given ids."""
+        pass
+
+    @abstractmethod
+    def delete(self, where: Optional[Dict] = None, ids: Optional[List[str]] = None):
+        """Delete documents matching the filter and, if given, the id list (at least one is required)."""
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        """Return number of stored documents."""
+        pass
+
+    @abstractmethod
+    def reset(self):
+        """Remove all documents."""
+        pass
+
+    @abstractmethod
+    def drop(self):
+        """Remove the collection and its storage entirely."""
+        pass
@@ -1,26 +1,120 @@
 import os
-import chromadb
-from chromadb.config import Settings
-from typing import List, Dict, Any, Optional, Union
+import json
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Union, Callable
+from .vector_backend import VectorBackend
+from .file_lock import file_lock
+from .dedup import NearDuplicateIndex
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def make_chunk_id(source: str, text: str, occurrence: int = 0, user_id: Optional[int] = None) -> str:
+    """Stable chunk id derived from owner, source and content.
+
+    `occurrence` separates identical paragraphs repeated inside one document.
+    """
+    key = f"{user_id}\x1f{source}\x1f{occurrence}\x1f{text}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def create_backend(backend: str, db_path: str, collection_name: str,
+                   quantization: str = 'none', rescore_factor: int = 4, sharding: str = 'none') -> VectorBackend:
+    """Create vector storage backend by name, optionally sharded by source or owner."""
+    backend = (backend or 'chroma').lower()
+    sharding = (sharding or 'none').lower()
+    if sharding != 'none':
+        from .sharded_backend import ShardedBackend
+        client = None
+        if backend == 'chroma':
+            import chromadb
+            client = chromadb.PersistentClient(path=db_path)
+
+        def factory(shard_name: str) -> VectorBackend:
+            if client is not None:
+                from .chroma_backend import ChromaBackend
+                return ChromaBackend(db_path, shard_name, client=client)
+            return create_backend(backend, db_path, shard_name, quantization=quantization, rescore_factor=rescore_factor)
+
+        return ShardedBackend(db_path, collection_name, sharding, factory)
+
+    if backend == 'chroma':
+        from .chroma_backend import ChromaBackend
+        if quantization and quantization != 'none':
+            logger.warning(f"Quantization '{quantization}' is only supported by the numpy backend, ignoring")
+        return ChromaBackend(db_path, collection_name)
+    elif backend == 'numpy':
+        from .numpy_backend import NumpyBackend
+        return NumpyBackend(db_path, collection_name, quantization=quantization, rescore_factor=rescore_factor)
+    else:
+        raise ValueError(f"Unsupported vector backend: {backend}")
+
 
 class VectorDB:
-    """Wrapper for ChromaDB operations."""
+    """Vector store with ownership/source filtering on top of a pluggable backend."""
     
-    def __init__(self, db_path: str = "./data/vector_db", collection_name: str = "training_docs"):
+    def __init__(self, db_path: str = "./data/vector_db", collection_name: str = "training_docs", backend: str = "chroma",
+                 quantization: str = "none", rescore_factor: int = 4, sharding: str = "none"):
         self.db_path = db_path
+        self.backend_name = backend
         os.makedirs(db_path, exist_ok=True)
         
-        self.client = chromadb.PersistentClient(path=db_path)
-        self.collection = self.client.get_or_create_collection(name=collection_name)
+        self.backend = create_backend(backend, db_path, collection_name,
+                                      quantization=quantization, rescore_factor=rescore_factor,
+                                      sharding=sharding)
+        self.dedup_stats_path = os.path.join(db_path, f"{collection_name}.dedup.json")
 
     def add_documents(self, documents: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]], ids: List[str]):
         """Add batch of documents to the collection."""
-        self.collection.add(
-            documents=documents,
-            embeddings=embeddings,
-            metadatas=metadatas,
-            ids=ids
-        )
+        self.backend.add(documents, embeddings, metadatas, ids)
+
+    def bulk_add(self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str],
+                 embed_fn: Callable[[str], List[float]], batch_size: int = 256, defer_index: bool = False,
+                 progress_callback: Optional[Callable[[int, int], None]] = None,
+                 embed_batch_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 embed_batch_size: int = 32) -> int:
+        """Embed and store many documents in large batches.
+
+        Batches are capped by the backend's max batch size. Each batch is written
+        on a background thread while the next one is being embedded, so the
+        embedding server and the DB write overlap. `defer_index` lets the backend
+        postpone index maintenance when loading into an empty collection.
+        If `embed_batch_fn` is given, texts are embedded `embed_batch_size` at a
+        time with it instead of one by one.
+        Returns the number of documents written.
+        """
+        total = len(documents)
+        cap = self.backend.max_batch_size
+        batch_size = max(1, min(batch_size, cap) if cap else batch_size)
+
+        with ThreadPoolExecutor(max_workers=1) as writer, self.backend.bulk(defer_index=defer_index):
+            pending = None
+            for start in range(0, total, batch_size):
+                end = min(start + batch_size, total)
+                embeddings = []
+                if embed_batch_fn is not None:
+                    for i in range(start, end, embed_batch_size):
+                        j = min(i + embed_batch_size, end)
+                        embeddings.extend(embed_batch_fn(documents[i:j]))
+                        if progress_callback:
+                            progress_callback(j, total)
+                else:
+                    for i in range(start, end):
+                        embeddings.append(embed_fn(documents[i]))
+                        if progress_callback:
+                            progress_callback(i + 1, total)
+                # Surface a failed write before queuing the next batch
+                if pending is not None:
+                    pending.result()
+                pending = writer.submit(self.add_documents, documents[start:end], embeddings,
+                                        metadatas[start:end], ids[start:end])
+            if pending is not None:
+                pending.result()
+        return total
 
     def query(self, query_embedding: List[float], n_results: int = 3, user_id: Optional[int] = None, source: Optional[Union[str, List[str]]] = None, query_text: Optional[str] = None, is_admin: bool = False) -> Dict[str, Any]:
         """Search for most similar documents with ownership and optional source filtering."""
@@ -62,11 +156,8 @@ class VectorDB:
             
         try:
             # 1. Semantic Vector Search
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                where=where
-            )
+            with metrics.timed('vector_query_seconds', backend=self.backend_name):
+                results = self.backend.search(query_embedding, n_results, where=where)
 
             # Filter by distance threshold (e.g. 0.8) to avoid totally irrelevant matches
             DISTANCE_THRESHOLD = 0.8
@@ -126,11 +217,12 @@ class VectorDB:
                 else:
                     where_doc = {"$or": [{"$contains": v} for v in variations]}
 
-                keyword_results = self.collection.get(
-                    where=where,
-                    where_document=where_doc,
-                    limit=n_results
-                )
+                with metrics.timed('keyword_fallback_seconds', backend=self.backend_name):
+                    keyword_results = self.backend.get(
+                        where=where,
+                        where_document=where_doc,
+                        limit=n_results
+                    )
                 
                 if keyword_results and keyword_results['ids']:
                     # Merge keyword results into semantic results
@@ -151,14 +243,13 @@ class VectorDB:
                             
             return results
         except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.error(f"VectorDB query error (where={where}): {str(e)}")
+            metrics.error('vector_db', provider=self.backend_name)
             return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
 
     def get_collection_count(self) -> int:
         """Return total document count in collection."""
-        return self.collection.count()
+        return self.backend.count()
 
     def get_unique_sources(self, user_id: Optional[int] = None, is_admin: bool = False) -> List[Dict[str, Any]]:
         """Return list of unique source filenames. Admins see all."""
@@ -169,7 +260,7 @@ class VectorDB:
                 {"is_public": True}
             ]}
              
-        data = self.collection.get(include=['metadatas'], where=where)
+        data = self.backend.get(where=where, include=['metadatas'])
         sources_map = {}
         if data and data['metadatas']:
             for m in data['metadatas']:
@@ -182,6 +273,11 @@ class VectorDB:
                             "is_public": m.get('is_public', False),
                             "is_owner": m.get('user_id') == user_id if user_id else False
                         }
+        dedup_stats = self.load_dedup_stats()
+        for src in sources_map.values():
+            entry = dedup_stats.get(self._dedup_key(src['name'], src['user_id']))
+            if entry:
+                src['dedup'] = entry
         return sorted(list(sources_map.values()), key=lambda x: x['name'])
 
     def delete_by_source(self, source: str, user_id: int, is_admin: bool = False):
@@ -193,7 +289,13 @@ class VectorDB:
                 {"source": source},
                 {"user_id": user_id}
             ]}
-        self.collection.delete(where=where)
+        self.backend.delete(where=where)
+
+        with self._updating_dedup_stats() as dedup_stats:
+            stale = [key for key, entry in dedup_stats.items()
+                     if entry.get('source') == source and (is_admin or entry.get('user_id') == user_id)]
+            for key in stale:
+                del dedup_stats[key]
 
     def update_visibility(self, source: str, user_id: int, is_public: bool, is_admin: bool = False):
         """Update is_public status. Admins can override."""
@@ -205,7 +307,7 @@ class VectorDB:
                 {"user_id": user_id}
             ]}
             
-        data = self.collection.get(where=where, include=['metadatas'])
+        data = self.backend.get(where=where, include=['metadatas'])
         
         if data and data['ids']:
             new_metadatas = []
@@ -213,24 +315,181 @@ class VectorDB:
                 m['is_public'] = is_public
                 new_metadatas.append(m)
             
-            self.collection.update(
-                ids=data['ids'],
-                metadatas=new_metadatas
-            )
+            self.backend.update_metadatas(data['ids'], new_metadatas)
             return True
         return False
 
+    def sync_source(self, source: str, paragraphs: List[str], embed_fn: Callable[[str], List[float]],
+                    user_id: Optional[int] = None, batch_size: int = 256, defer_index: bool = False,
+                    progress_callback: Optional[Callable[[int, int], None]] = None,
+                    dedup: str = 'none', dedup_threshold: float = 0.9,
+                    embed_batch_fn: Optional[Callable[[List[str]], List[List[float]]]] = None) -> Dict[str, int]:
+        """Incrementally (re-)ingest a source.
+
+        Chunks get content-hash ids, so only paragraphs not already stored are
+        embedded. Stored chunks that vanished from the new revision are deleted
+        and chunks that only moved get their `index` renumbered. Chunks from
+        older ingests with random ids simply count as vanished.
+        With `dedup` set to 'source' or 'owner', near-duplicate paragraphs are
+        skipped before embedding (see filter_near_duplicates).
+        Returns counts: {"added", "deleted", "moved", "unchanged", "duplicates"}.
+        """
+        if user_id is None:
+            where = {"source": source}
+        else:
+            where = {"$and": [{"source": source}, {"user_id": user_id}]}
+
+        indexed = list(enumerate(paragraphs))
+        dedup_key = self._dedup_key(source, user_id)
+        report = None
+        if dedup and dedup != 'none':
+            indexed, report = self.filter_near_duplicates(source, paragraphs, user_id=user_id,
+                                                          scope=dedup, threshold=dedup_threshold)
+        with self._updating_dedup_stats() as dedup_stats:
+            if report is not None:
+                dedup_stats[dedup_key] = report
+            else:
+                dedup_stats.pop(dedup_key, None)
+
+        existing = self.backend.get(where=where, include=['metadatas'])
+        # Same filename from another owner (e.g. CLI vs web upload) is not ours to touch
+        current = {doc_id: meta or {} for doc_id, meta in zip(existing['ids'], existing['metadatas'])
+                   if (meta or {}).get('user_id') == user_id}
+        is_public = any(m.get('is_public') for m in current.values())
+
+        wanted = {}
+        seen: Dict[str, int] = {}
+        for i, para in indexed:
+            occurrence = seen.get(para, 0)
+            seen[para] = occurrence + 1
+            wanted[make_chunk_id(source, para, occurrence, user_id)] = (i, para)
+
+        to_add = [(doc_id, i, para) for doc_id, (i, para) in wanted.items() if doc_id not in current]
+        vanished = [doc_id for doc_id in current if doc_id not in wanted]
+        moved_ids, moved_metas = [], []
+        for doc_id, meta in current.items():
+            if doc_id in wanted and meta.get('index') != wanted[doc_id][0]:
+                moved_ids.append(doc_id)
+                moved_metas.append({**meta, "index": wanted[doc_id][0]})
+
+        metadatas = []
+        for doc_id, i, para in to_add:
+            metadata = {"source": source, "index": i}
+            if user_id is not None:
+                metadata.update({"user_id": user_id, "is_public": is_public})
+            metadatas.append(metadata)
+        self.bulk_add([para for _, _, para in to_add], metadatas, [doc_id for doc_id, _, _ in to_add], embed_fn,
+                      batch_size=batch_size, defer_index=defer_index, progress_callback=progress_callback,
+                      embed_batch_fn=embed_batch_fn)
+
+        # Old chunks go last, so a failed embedding leaves the previous revision searchable
+        if moved_ids:
+            self.backend.update_metadatas(moved_ids, moved_metas)
+        if vanished:
+            self.backend.delete(where=where, ids=vanished)
+
+        stats = {
+            "added": len(to_add),
+            "deleted": len(vanished),
+            "moved": len(moved_ids),
+            "unchanged": len(wanted) - len(to_add) - len(moved_ids),
+            "duplicates": len(paragraphs) - len(indexed)
+        }
+        logger.info(f"Synced {source}: {stats}")
+        return stats
+
+    def filter_near_duplicates(self, source: str, paragraphs: List[str], user_id: Optional[int] = None,
+                               scope: str = 'source', threshold: float = 0.9):
+        """Drop paragraphs that near-duplicate an earlier one (MinHash LSH over word shingles).
+
+        scope 'source' only compares paragraphs of this document; 'owner' also
+        compares against the owner's other stored sources, so boilerplate that
+        is already indexed elsewhere is linked to that source instead of being
+        stored again.
+        Returns ([(index, paragraph), ...] to keep, report dict).
+        """
+        if scope not in ('source', 'owner'):
+            raise ValueError(f"Unsupported dedup scope: {scope}")
+
+        index = NearDuplicateIndex(threshold=threshold)
+        if scope == 'owner':
+            where = {"user_id": user_id} if user_id is not None else None
+            data = self.backend.get(where=where)
+            for doc_id, doc, meta in zip(data['ids'], data['documents'], data['metadatas']):
+                meta = meta or {}
+                if meta.get('user_id') == user_id and meta.get('source') != source:
+                    index.add(f"{meta.get('source')}\x1f{doc_id}", index.signature(doc))
+
+        kept = []
+        within, linked = 0, {}
+        for i, para in enumerate(paragraphs):
+            match = index.add_if_new(f"{source}\x1f{i}", para)
+            if match is None:
+                kept.append((i, para))
+                continue
+            other = match[0].split('\x1f', 1)[0]
+            if other == source:
+                within += 1
+            else:
+                linked[other] = linked.get(other, 0) + 1
+
+        report = {
+            "source": source,
+            "user_id": user_id,
+            "scope": scope,
+            "threshold": threshold,
+            "paragraphs": len(paragraphs),
+            "skipped": len(paragraphs) - len(kept),
+            "within_source": within,
+            "linked_sources": linked
+        }
+        if report['skipped']:
+            logger.info(f"Near-duplicates in {source}: {report['skipped']}/{len(paragraphs)} skipped "
+                        f"({within} within source, linked: {linked})")
+        return kept, report
+
+    @staticmethod
+    def _dedup_key(source: str, user_id: Optional[int]) -> str:
+        return f"{user_id}:{source}"
+
+    def load_dedup_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-source dedup reports of the last ingest, keyed by "<user_id>:<source>"."""
+        if not os.path.exists(self.dedup_stats_path):
+            return {}
+        try:
+            with open(self.dedup_stats_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            logger.warning(f"Could not read {self.dedup_stats_path}, ignoring")
+            return {}
+
+    @contextmanager
+    def _updating_dedup_stats(self):
+        """Load-update-replace of the shared stats file under a file lock.
+
+        Every gunicorn worker and ingest process writes it; the file is only
+        rewritten when the block changed something.
+        """
+        with file_lock(self.dedup_stats_path + '.lock'):
+            stats = self.load_dedup_stats()
+            before = dict(stats)
+            yield stats
+            if stats != before:
+                self._save_dedup_stats(stats)
+
+    def _save_dedup_stats(self, stats: Dict[str, Dict[str, Any]]):
+        tmp = self.dedup_stats_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.dedup_stats_path)
+
     def get_documents_with_metadata(self, limit: int = 100, offset: int = 0, where: Dict = None) -> Dict[str, Any]:
         """Retrieve documents, IDs and metadatas with optional filtering."""
-        return self.collection.get(
-            limit=limit,
-            offset=offset,
-            where=where,
-            include=['documents', 'metadatas']
-        )
+        return self.backend.get(where=where, limit=limit, offset=offset)
 
     def reset(self):
         """Clear all documents in the collection."""
-        name = self.collection.name
-        self.client.delete_collection(name)
-        self.collection = self.client.create_collection(name=name)
+        self.backend.reset()
+        with file_lock(self.dedup_stats_path + '.lock'):
+            if os.path.exists(self.dedup_stats_path):
+                os.remove(self.dedup_stats_path)
@@ -3,7 +3,9 @@
 import sys
 sys.path.insert(0, '.')
 
+import time
 import pdfplumber
+from core.parse_cache import ParseCache
 
 pdf_file = "BS EN ISO 14122-1-2016.pdf"
 
@@ -48,3 +50,16 @@ except Exception as e:
     print(f"❌ Hata: {e}")
     import traceback
     traceback.print_exc()
+
+# DocumentParser çıktısı (ayrıştırma önbelleği üzerinden; ikinci çalıştırmada anında döner)
+print("\n" + "="*60)
+print("DOCUMENTPARSER ÇIKTISI:")
+print("="*60)
+try:
+    start = time.time()
+    paragraphs = ParseCache().split(pdf_file)
+    print(f"✓ {len(paragraphs)} paragraf, {time.time() - start:.2f} sn")
+    for i, para in enumerate(paragraphs[:3], 1):
+        print(f"\nParagraf {i}:\n  {para[:200]}")
+except Exception as e:
+    print(f"❌ Hata: {e}")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Remove near-duplicate Q/A pairs from a JSONL dataset (offline pass).
+
+Reads a plain, compressed or sharded dataset in one pass and writes the
+entries whose instruction+output is not a near-duplicate of an earlier one.
+Memory is bounded by --max-items (the index keeps the most recent entries).
+"""
+import time
+import argparse
+from core.dataset_writer import DatasetWriter, iter_entries
+from core.qa_dedup import QADeduplicator
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Remove near-duplicate Q/A pairs from a dataset.')
+    parser.add_argument('--input', '-i', required=True, help='JSONL file, compressed file or dataset manifest')
+    parser.add_argument('--output', '-o', required=True, help='Output JSONL path')
+    parser.add_argument('--threshold', type=float, default=0.85, help='Jaccard similarity threshold (default: 0.85)')
+    parser.add_argument('--num-perm', type=int, default=64, help='MinHash permutations (default: 64)')
+    parser.add_argument('--shingle-size', type=int, default=2, help='Words per shingle (default: 2)')
+    parser.add_argument('--max-items', type=int, default=500000,
+                        help='Entries kept in the index, 0 = unbounded (default: 500000)')
+    parser.add_argument('--shard-size-mb', type=float, default=0, help='Rotate output into shards (default: off)')
+    parser.add_argument('--compression', choices=['none', 'gzip', 'zstd'], default='none',
+                        help='Output compression (default: none)')
+    args = parser.parse_args()
+
+    deduplicator = QADeduplicator(threshold=args.threshold, num_perm=args.num_perm,
+                                  shingle_size=args.shingle_size, max_items=args.max_items)
+    start = time.perf_counter()
+    with DatasetWriter(args.output, append=False, flush_every=1000, shard_size_mb=args.shard_size_mb,
+                       compression=args.compression) as writer:
+        for entry in deduplicator.filter(iter_entries(args.input)):
+            writer.write(entry)
+    summary = deduplicator.summary()
+    print(f"✓ {summary['seen']} kayıt okundu, {summary['duplicates']} yakın tekrar atıldı "
+          f"(%{100 * summary['duplicate_rate']:.1f}), {time.perf_counter() - start:.1f} sn: {writer.result_path}")
+
+
+if __name__ == "__main__":
+    main()
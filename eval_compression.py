@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Report recall impact of embedding truncation/quantization on our own documents.
+
+Samples chunks from the configured vector DB, embeds them at full size and
+compares search results of every (dimensions, quantization) combination with
+the exact full-precision ranking.
+"""
+import os
+import random
+import shutil
+import argparse
+import tempfile
+import yaml
+import numpy as np
+from tqdm import tqdm
+from core.embedding_client import EmbeddingClient, truncate_embedding
+from core.vector_db import VectorDB
+from core.numpy_backend import NumpyBackend
+
+
+def embed_all(client, texts, desc):
+    return np.asarray([client.get_embedding(t) for t in tqdm(texts, desc=desc)], dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure recall of compressed embeddings against full precision.')
+    parser.add_argument('--config', default='config/config.yaml', help='Path to the config file')
+    parser.add_argument('--sample', type=int, default=2000, help='Number of stored chunks to sample (default: 2000)')
+    parser.add_argument('--queries', help='Text file with one query per line (default: pseudo-queries from chunks)')
+    parser.add_argument('--num-queries', type=int, default=100, help='Pseudo-query count when --queries is not given')
+    parser.add_argument('--dims', default='768,512,256,128', help='Comma separated output dimensions')
+    parser.add_argument('--quantization', default='none,float16,int8', help='Comma separated quantization modes')
+    parser.add_argument('--top-k', type=int, default=5, help='Recall@k (default: 5)')
+    parser.add_argument('--rescore-factor', type=int, default=4, help='int8 re-scoring shortlist factor (default: 4)')
+    parser.add_argument('--cache', help='Optional .npz file to save/load embeddings between runs')
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    rag_cfg = config.get('rag', {})
+    model_cfg = config.get('model', {})
+
+    if args.cache and os.path.exists(args.cache):
+        data = np.load(args.cache, allow_pickle=True)
+        doc_emb, query_emb = data['docs'], data['queries']
+        print(f"Loaded embeddings from {args.cache}")
+    else:
+        db = VectorDB(
+            db_path=rag_cfg.get('db_path', './data/vector_db'),
+            collection_name=rag_cfg.get('collection_name', 'training_docs'),
+            backend=rag_cfg.get('vector_backend', 'chroma'),
+            sharding=rag_cfg.get('sharding', 'none')
+        )
+        documents = db.get_documents_with_metadata(limit=args.sample)['documents']
+        if not documents:
+            print("Vector DB is empty, nothing to evaluate.")
+            return
+
+        if args.queries:
+            with open(args.queries, 'r', encoding='utf-8') as f:
+                queries = [l.strip() for l in f if l.strip()]
+        else:
+            # Leading words of random chunks approximate short user questions
+            rng = random.Random(42)
+            queries = [" ".join(d.split()[:12]) for d in rng.sample(documents, min(args.num_queries, len(documents)))]
+
+        # Always embed at full size; truncation is applied per configuration below
+        client = EmbeddingClient(
+            provider=model_cfg.get('type', 'lmstudio'),
+            endpoint=model_cfg.get('endpoint', 'http://127.0.0.1:1234'),
+            model=rag_cfg.get('embedding_model', 'nomic-embed-text-v1.5'),
+            api_key=model_cfg.get('api_key', '')
+        )
+        doc_emb = embed_all(client, documents, "Embedding chunks")
+        query_emb = embed_all(client, queries, "Embedding queries")
+        if args.cache:
+            np.savez(args.cache, docs=doc_emb, queries=query_emb)
+
+    full_dim = doc_emb.shape[1]
+    k = min(args.top_k, len(doc_emb))
+
+    # Ground truth: exact search on full float32 vectors
+    truth = []
+    for q in query_emb:
+        d = ((doc_emb - q) ** 2).sum(axis=1)
+        truth.append(set(np.argsort(d)[:k].tolist()))
+
+    dims = sorted({int(d) for d in args.dims.split(',') if d.strip() and int(d) <= full_dim}, reverse=True)
+    modes = [m.strip() for m in args.quantization.split(',') if m.strip()]
+    ids = [str(i) for i in range(len(doc_emb))]
+    metas = [{} for _ in ids]
+
+    print(f"\nChunks: {len(doc_emb)}, queries: {len(query_emb)}, full dim: {full_dim}, recall@{k}\n")
+    print(f"{'dims':>5} {'quant':<8} {'RAM B/vec':>10} {'disk B/vec':>11} {'vs f32':>7} {'recall':>7}")
+
+    for dim in dims:
+        docs_t = [truncate_embedding(v.tolist(), dim) for v in doc_emb]
+        queries_t = [truncate_embedding(v.tolist(), dim) for v in query_emb]
+        for mode in modes:
+            tmp = tempfile.mkdtemp(prefix="eval_compression_")
+            try:
+                backend = NumpyBackend(tmp, "eval", quantization=mode, rescore_factor=args.rescore_factor)
+                backend.add(ids, docs_t, metas, ids)
+                hits = []
+                for q in queries_t:
+                    res = backend.search(q, k)
+                    hits.append({int(i) for i in res['ids'][0]})
+                recall = np.mean([len(h & t) / k for h, t in zip(hits, truth)])
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+            ram = {'none': 4 * dim, 'float16': 0, 'int8': dim + 4}[mode]
+            disk = 2 * dim
+            print(f"{dim:>5} {mode:<8} {ram:>10} {disk:>11} {4 * full_dim / max(ram, disk):>6.1f}x {recall:>7.3f}")
+
+    print("\nRAM excludes the page cache used by the memory-mapped float16 file.")
+
+
+if __name__ == "__main__":
+    main()
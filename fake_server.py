@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""OpenAI-compatible stub server backed by the fake provider.
+
+Serves /v1/models, /v1/chat/completions (plain and `stream: true` SSE),
+/v1/embeddings and /health with the timing and error behaviour of
+`model.fake`, so the real HTTP clients (lmstudio, openai types) can be
+exercised end to end without a model:
+
+    python3 fake_server.py --port 8089
+    # config.yaml: model.type: lmstudio, model.endpoint: http://127.0.0.1:8089
+"""
+import json
+import time
+import argparse
+import yaml
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from core.fake_client import FakeAIClient
+from core.embedding_client import EmbeddingClient
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    client: FakeAIClient = None
+    embeddings: EmbeddingClient = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status: int, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith('/v1/models'):
+            models = [self.client.model_name, 'fake-embed']
+            self._json(200, {"object": "list", "data": [{"id": m, "object": "model"} for m in models]})
+        elif self.path.startswith('/health'):
+            self._json(200, {"status": "ok"})
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError:
+            self._json(400, {"error": "invalid JSON"})
+            return
+        if self.path.startswith('/v1/chat/completions'):
+            self._chat(payload)
+        elif self.path.startswith('/v1/embeddings'):
+            texts = payload.get('input', '')
+            texts = texts if isinstance(texts, list) else [texts]
+            vectors = self.embeddings.get_embeddings(texts)
+            self._json(200, {"object": "list", "model": payload.get('model', 'fake-embed'),
+                             "data": [{"object": "embedding", "index": i, "embedding": v}
+                                      for i, v in enumerate(vectors)]})
+        else:
+            self._json(404, {"error": "not found"})
+
+    def _chat(self, payload):
+        messages = payload.get('messages') or []
+        prompt = "\n\n".join(m.get('content', '') for m in messages if m.get('role') != 'system')
+        options = {}
+        response_format = payload.get('response_format') or {}
+        if response_format.get('type') == 'json_schema':
+            options['json_schema'] = response_format['json_schema']['schema']
+        if payload.get('max_tokens'):
+            options['max_tokens'] = payload['max_tokens']
+
+        if not payload.get('stream'):
+            try:
+                result = self.client.generate(prompt, options)
+            except RuntimeError as e:
+                self._json(500, {"error": {"message": str(e)}})
+                return
+            usage = result['usage']
+            self._json(200, {
+                "id": "chatcmpl-fake", "object": "chat.completion", "model": self.client.model_name,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": result['text']},
+                             "finish_reason": "stop"}],
+                "usage": {**usage, "total_tokens": usage['prompt_tokens'] + usage['completion_tokens']}
+            })
+            return
+
+        chunks = self.client.generate_stream(prompt, options)
+        first = next(chunks)
+        if first['type'] == 'error':
+            self._json(500, {"error": {"message": first['message']}})
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for chunk in _chain(first, chunks):
+                if chunk['type'] != 'content':
+                    continue
+                data = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": self.client.model_name,
+                        "choices": [{"index": 0, "delta": {"content": chunk['text']}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client stopped reading (e.g. stream_stop_at_max); stop generating
+            chunks.close()
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OpenAI-compatible stub server using the fake provider.')
+    parser.add_argument('--config', '-c', default='config/config.yaml', help='Config file (model.fake settings)')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8089, help='Port (default: 8089)')
+    parser.add_argument('--ttft-ms', type=float, help='Override model.fake.ttft_ms')
+    parser.add_argument('--tokens-per-sec', type=float, help='Override model.fake.tokens_per_sec')
+    parser.add_argument('--error-rate', type=float, help='Override model.fake.error_rate')
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    model_cfg = dict(config.get('model', {}))
+    fake_cfg = dict(model_cfg.get('fake') or {})
+    for key in ('ttft_ms', 'tokens_per_sec', 'error_rate'):
+        if getattr(args, key) is not None:
+            fake_cfg[key] = getattr(args, key)
+    model_cfg.update(type='fake', name='fake-model', fake=fake_cfg)
+
+    FakeHandler.client = FakeAIClient(model_cfg)
+    FakeHandler.embeddings = EmbeddingClient(provider='fake', fake=fake_cfg)
+    server = ThreadingHTTPServer((args.host, args.port), FakeHandler)
+    server.daemon_threads = True
+    print(f"Fake OpenAI-compatible server: http://{args.host}:{args.port} "
+          f"(ttft {fake_cfg.get('ttft_ms', 200)} ms, {fake_cfg.get('tokens_per_sec', 40)} tok/s, "
+          f"error rate {fake_cfg.get('error_rate', 0.0)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""Gunicorn settings, read automatically when gunicorn starts in the project directory.
+
+Workers are separate processes, so /metrics uses prometheus_client's
+multiprocess mode: every worker writes its metrics to PROMETHEUS_MULTIPROC_DIR
+and a scrape aggregates all files. The directory is emptied at startup and a
+dead worker's live gauges are dropped.
+"""
+import os
+import shutil
+
+multiproc_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.abspath('data/metrics'))
+
+
+def on_starting(server):
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from core.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -1,16 +1,22 @@
 import os
 import yaml
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
-from core.document_parser import DocumentParser
-from core.text_processor import TextProcessor
 from core.embedding_client import EmbeddingClient
 from core.vector_db import VectorDB
+from core.ingestion import IngestManifest, discover_files, parse_and_split, source_name
+from core.token_chunker import TokenChunker, load_tokenizer, size_distribution
 
 def main():
     parser = argparse.ArgumentParser(description='Ingest documents into the vector database.')
     parser.add_argument('--input', required=True, help='Path to the input file or directory')
     parser.add_argument('--config', default='config/config.yaml', help='Path to the config file')
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1), help='Parallel parser processes')
+    parser.add_argument('--no-recursive', action='store_true', help='Only ingest the top level of a directory')
+    parser.add_argument('--force', action='store_true', help='Re-ingest files even if unchanged since the last run')
+    parser.add_argument('--prune', action='store_true', help='Delete sources of files removed from the directory')
+    parser.add_argument('--manifest', help='Manifest path (default: <db_path>/<collection>.manifest.json)')
     args = parser.parse_args()
 
     # Load config
@@ -30,76 +36,119 @@ def main():
         provider=provider,
         endpoint=endpoint,
         model=embed_cfg.get('embedding_model', 'nomic-embed-text'),
-        api_key=api_key
+        api_key=api_key,
+        dimensions=embed_cfg.get('embedding_dimensions'),
+        fake=model_cfg.get('fake')
     )
     
     db = VectorDB(
         db_path=embed_cfg.get('db_path', './data/vector_db'),
-        collection_name=embed_cfg.get('collection_name', 'training_docs')
+        collection_name=embed_cfg.get('collection_name', 'training_docs'),
+        backend=embed_cfg.get('vector_backend', 'chroma'),
+        quantization=embed_cfg.get('quantization', 'none'),
+        rescore_factor=embed_cfg.get('rescore_factor', 4),
+        sharding=embed_cfg.get('sharding', 'none')
     )
 
+    manifest = IngestManifest(args.manifest or os.path.join(
+        embed_cfg.get('db_path', './data/vector_db'),
+        f"{embed_cfg.get('collection_name', 'training_docs')}.manifest.json"
+    ), embed_cfg)
+
     # Resolve input files
-    files = []
-    if os.path.isfile(args.input):
-        files.append(args.input)
-    elif os.path.isdir(args.input):
-        for f in os.listdir(args.input):
-            if f.lower().endswith(('.pdf', '.docx', '.txt')):
-                files.append(os.path.join(args.input, f))
+    files = discover_files(args.input, recursive=not args.no_recursive)
+    root = args.input
+
+    # Drop sources whose files were removed since the last run
+    if args.prune and os.path.isdir(root):
+        for missing in manifest.missing_under(root):
+            source = manifest.get(missing).get('source')
+            print(f"Removing deleted file from DB: {source}")
+            # Syncing an empty revision removes only the chunks this CLI owns
+            db.sync_source(source, [], embedding_client.get_embedding)
+            manifest.remove(missing)
 
     if not files:
         print(f"No valid documents found in {args.input}")
         return
 
-    print(f"Ingesting {len(files)} documents...")
-
+    changed = []
+    rechunk = sum(1 for file_path in files if manifest.chunking_changed(file_path))
+    if rechunk:
+        print(f"{rechunk} documents were ingested with other chunking settings (rag.chunking, tokenizer, "
+              f"chunk_*_tokens) and will be re-chunked")
     for file_path in files:
-        print(f"Processing: {file_path}")
-        try:
-            # 1. Parse
-            raw_text = DocumentParser.parse(file_path)
-            
-            # 2. Split into paragraphs
-            paragraphs = TextProcessor.split_into_paragraphs(raw_text)
-            
+        is_changed, fingerprint = manifest.check(file_path)
+        if is_changed or args.force:
+            changed.append((file_path, fingerprint))
+    manifest.save()
+
+    print(f"Found {len(files)} documents, {len(files) - len(changed)} unchanged, ingesting {len(changed)}...")
+    if not changed:
+        return
+
+    # Chunk sizes are reported in tokens when a tokenizer is configured, else in characters
+    sizer = TokenChunker(load_tokenizer(embed_cfg['tokenizer'])) if embed_cfg.get('tokenizer') else None
+    chunk_sizes = []
+
+    fingerprints = dict(changed)
+    workers = max(1, min(args.workers, len(changed)))
+    totals = {"added": 0, "deleted": 0, "moved": 0, "unchanged": 0, "duplicates": 0}
+
+    # Parsing is CPU bound and runs in a process pool; embedding and DB writes
+    # stay in this process so all files share one batched embedding stage.
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(parse_and_split, path, config.get('cache'), config.get('parser'), embed_cfg): path for path, _ in changed}
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                _, paragraphs = future.result()
+            except Exception as e:
+                print(f"Failed to parse {file_path}: {str(e)}")
+                continue
+
+            filename = source_name(file_path, root)
             if not paragraphs:
                 print(f"No content found in {file_path}")
                 continue
 
-            # 3. Generate embeddings and add to DB
-            documents = []
-            embeddings = []
-            metadatas = []
-            ids = []
-            
-            filename = os.path.basename(file_path)
-            
-            for i, para in enumerate(tqdm(paragraphs, desc="Generating embeddings")):
-                try:
-                    emb = embedding_client.get_embedding(para)
-                    
-                    documents.append(para)
-                    embeddings.append(emb)
-                    metadatas.append({"source": filename, "index": i})
-                    ids.append(f"{filename}_{i}")
+            try:
+                with tqdm(total=0, desc=f"Embedding {filename}") as bar:
+                    def report_progress(done, total):
+                        bar.total = total
+                        bar.update(done - bar.n)
                     
-                    # Batch add every 10 to avoid too large requests if necessary
-                    if len(documents) >= 10:
-                        db.add_documents(documents, embeddings, metadatas, ids)
-                        documents, embeddings, metadatas, ids = [], [], [], []
-                        
-                except Exception as e:
-                    print(f"\nError generating embedding for paragraph {i}: {str(e)}")
-                    continue
-            
-            # Final batch
-            if documents:
-                db.add_documents(documents, embeddings, metadatas, ids)
-                
-            print(f"Finished ingesting {filename}. Total items in DB: {db.get_collection_count()}")
-            
-        except Exception as e:
-            print(f"Failed to process {file_path}: {str(e)}")
+                    stats = db.sync_source(filename, paragraphs, embedding_client.get_embedding,
+                                           progress_callback=report_progress,
+                                           batch_size=embed_cfg.get('ingest_batch_size', 256),
+                                           defer_index=embed_cfg.get('defer_index', False),
+                                           dedup=embed_cfg.get('dedup', 'none'),
+                                           dedup_threshold=embed_cfg.get('dedup_threshold', 0.9),
+                                           embed_batch_fn=embedding_client.get_embeddings)
+            except Exception as e:
+                print(f"Failed to ingest {file_path}: {str(e)}")
+                continue
+
+            manifest.record(file_path, fingerprints[file_path], source=filename, paragraphs=len(paragraphs))
+            chunk_sizes.extend(sizer.count_many(paragraphs) if sizer else [len(p) for p in paragraphs])
+            for key in totals:
+                totals[key] += stats[key]
+            print(f"Finished ingesting {filename}: {stats['added']} added, {stats['deleted']} deleted, "
+                  f"{stats['moved']} moved, {stats['unchanged']} unchanged, {stats['duplicates']} near-duplicates skipped.")
+
+    print(f"Done: {totals}. Total items in DB: {db.get_collection_count()}")
+    if chunk_sizes:
+        tokens = embed_cfg.get('chunking', 'chars') == 'tokens'
+        report = size_distribution(chunk_sizes,
+                                   embed_cfg.get('chunk_min_tokens', 128) if tokens else None,
+                                   embed_cfg.get('chunk_max_tokens', 512) if tokens else None)
+        unit = 'tokens' if sizer else 'chars'
+        line = (f"Chunk sizes ({unit}): {report['count']} chunks, min {report['min']}, p10 {report['p10']}, "
+                f"p50 {report['p50']}, p90 {report['p90']}, p99 {report['p99']}, max {report['max']}, "
+                f"mean {report['mean']:.0f}")
+        if tokens:
+            line += f"; {report['below_min']} below chunk_min_tokens, {report['above_max']} above chunk_max_tokens"
+        print(line)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""Concurrent load test for the /ask SSE endpoint.
+
+Logs in test users through the /test_login bypass (the server must run
+with LOAD_TEST_TOKEN set), optionally uploads a document per user, then
+for each concurrency level opens that many simultaneous /ask streams.
+Every stream asks a question with a random selection of the user's
+visible sources (sometimes none, i.e. general mode) and continues the
+same chat, so history is included as in real use.
+
+Per level it reports:
+  wait     time until the metadata event; grows when every worker is busy
+  ttft     time until the first content event
+  tok/s    per stream (completion tokens / generation time) and in total
+  errors   HTTP errors, error events and exceptions; timeouts separately
+
+A level is saturated when median TTFT exceeds --saturation-factor times
+the first level's, p95 TTFT exceeds --slo-ms, or total throughput grows
+less than 10% over the previous level. With gunicorn sync workers each
+stream holds a worker, so saturation shows up near the worker count.
+
+    LOAD_TEST_TOKEN=secret python3 app.py          # model.type: fake
+    python3 load_test_ask.py --token secret --concurrency 1,2,4,8,16 --upload dokuman.pdf
+"""
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from typing import List, Dict, Any, Optional
+import requests
+
+DEFAULT_QUESTIONS = [
+    "Bu dokümanın kapsamı nedir?",
+    "Merdiven basamak yüksekliği için hangi sınırlar verilmiş?",
+    "Platform korkuluk yüksekliği en az ne kadar olmalıdır?",
+    "Erişim aracı seçiminde hangi kriterler dikkate alınır?",
+    "Sabit merdivenlerde eğim açısı kaç derece olmalıdır?",
+    "Bakım sırasında güvenli erişim nasıl sağlanır?",
+    "Dokümandaki tanımları kısaca özetler misin?",
+    "Kapı ve geçiş genişlikleri hakkında ne söyleniyor?",
+]
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+class TestUser:
+    """One logged-in test user with its own cookie session."""
+
+    def __init__(self, base_url: str, name: str, token: str, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.name = name
+        self.timeout = timeout
+        self.session = requests.Session()
+        response = self.session.post(f"{self.base_url}/test_login", json={"name": name},
+                                     headers={"X-Load-Test-Token": token}, timeout=timeout)
+        if response.status_code != 200:
+            raise RuntimeError(f"Test login failed for {name}: HTTP {response.status_code} "
+                               f"(is the server running with LOAD_TEST_TOKEN?)")
+        self.sources: List[str] = []
+
+    def upload(self, path: str):
+        with open(path, 'rb') as f:
+            response = self.session.post(f"{self.base_url}/upload", files={"file": (os.path.basename(path), f)},
+                                         data={"job_id": str(uuid.uuid4())}, timeout=max(self.timeout, 600))
+        if response.status_code != 200:
+            raise RuntimeError(f"Upload failed for {self.name}: {response.text[:200]}")
+
+    def refresh_sources(self):
+        response = self.session.get(f"{self.base_url}/stats", timeout=self.timeout, allow_redirects=False)
+        if response.is_redirect:
+            raise RuntimeError("Session cookie was not accepted; with several gunicorn workers set "
+                               "SESSION_SECRET so every worker signs sessions with the same key")
+        response.raise_for_status()
+        self.sources = [s['name'] for s in response.json().get('sources', [])]
+
+
+def pick_sources(rng: random.Random, sources: List[str], max_sources: int, general_ratio: float) -> List[str]:
+    """Mostly one or two documents, sometimes none (general mode)."""
+    if not sources or rng.random() < general_ratio:
+        return []
+    return rng.sample(sources, rng.randint(1, min(max_sources, len(sources))))
+
+
+def ask(user: TestUser, query: str, sources: List[str], chat_id: Optional[int], timeout: float) -> Dict[str, Any]:
+    """Run one /ask stream and time its events."""
+    result = {"sources": len(sources), "status": None, "wait": None, "ttft": None, "total": None,
+              "tokens": 0, "chunks": 0, "error": None, "timeout": False, "no_reference": False, "chat_id": chat_id}
+    start = time.perf_counter()
+    response = None
+    try:
+        response = user.session.post(f"{user.base_url}/ask", json={"query": query, "sources": sources,
+                                                                   "chat_id": chat_id},
+                                     stream=True, timeout=(10, timeout))
+        result["status"] = response.status_code
+        if response.status_code != 200:
+            result["error"] = f"HTTP {response.status_code}"
+            return result
+        if not response.headers.get('Content-Type', '').startswith('text/event-stream'):
+            # Selected sources had nothing relevant: answered without the model
+            data = response.json()
+            result.update(no_reference=True, chat_id=data.get('chat_id'), total=time.perf_counter() - start)
+            return result
+
+        for line in response.iter_lines(decode_unicode=True):
+            elapsed = time.perf_counter() - start
+            if elapsed > timeout:
+                result["timeout"] = True
+                return result
+            if not line or not line.startswith('data: '):
+                continue
+            event = json.loads(line[6:])
+            if event['type'] == 'metadata':
+                result["wait"] = elapsed
+            elif event['type'] == 'content':
+                if result["ttft"] is None:
+                    result["ttft"] = elapsed
+                result["chunks"] += 1
+            elif event['type'] == 'error':
+                result["error"] = event.get('message', 'error event')
+                return result
+            elif event['type'] == 'final':
+                result["tokens"] = event.get('stats', {}).get('completion_tokens') or result["chunks"]
+                result["chat_id"] = event.get('chat_id', chat_id)
+        result["total"] = time.perf_counter() - start
+        if result["ttft"] is None and result["error"] is None:
+            result["error"] = "stream ended without content"
+    except (requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+        if isinstance(e, requests.exceptions.Timeout) or time.perf_counter() - start > timeout:
+            result["timeout"] = True
+        else:
+            result["error"] = f"{type(e).__name__}: {e}"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if response is not None:
+            response.close()
+    return result
+
+
+def run_level(users: List[TestUser], concurrency: int, args, questions: List[str], seed: int) -> Dict[str, Any]:
+    """Start `concurrency` clients together; each sends --requests questions in one chat."""
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency + 1)
+
+    def client(index: int):
+        rng = random.Random(seed * 1000 + index)
+        user = users[index % len(users)]
+        chat_id = None
+        barrier.wait()
+        for _ in range(args.requests):
+            sources = args.sources or pick_sources(rng, user.sources, args.max_sources, args.general_ratio)
+            result = ask(user, rng.choice(questions), sources, chat_id, args.timeout)
+            chat_id = result["chat_id"]
+            with lock:
+                results.append(result)
+            if args.think_ms:
+                time.sleep(args.think_ms / 1000)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return summarize(results, time.perf_counter() - start, concurrency)
+
+
+def summarize(results: List[Dict[str, Any]], wall: float, concurrency: int) -> Dict[str, Any]:
+    streamed = [r for r in results if r["ttft"] is not None and not r["error"] and not r["timeout"]]
+    ttft = [r["ttft"] for r in streamed]
+    wait = [r["wait"] for r in results if r["wait"] is not None]
+    stream_rates = [r["tokens"] / (r["total"] - r["ttft"]) for r in streamed if r["total"] and r["total"] > r["ttft"]]
+    tokens = sum(r["tokens"] for r in streamed)
+    ms = lambda v: round(v * 1000, 1) if v is not None else None
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "streamed": len(streamed),
+        "no_reference": sum(1 for r in results if r["no_reference"]),
+        "errors": sum(1 for r in results if r["error"]),
+        "timeouts": sum(1 for r in results if r["timeout"]),
+        "error_rate": round(sum(1 for r in results if r["error"]) / len(results), 4) if results else 0,
+        "timeout_rate": round(sum(1 for r in results if r["timeout"]) / len(results), 4) if results else 0,
+        "wait_p50_ms": ms(percentile(wait, 50)),
+        "wait_p95_ms": ms(percentile(wait, 95)),
+        "ttft_p50_ms": ms(percentile(ttft, 50)),
+        "ttft_p95_ms": ms(percentile(ttft, 95)),
+        "ttft_p99_ms": ms(percentile(ttft, 99)),
+        "stream_tokens_per_sec_p50": round(percentile(stream_rates, 50), 1) if stream_rates else None,
+        "total_tokens_per_sec": round(tokens / wall, 1) if wall else 0,
+        "requests_per_sec": round(len(results) / wall, 2) if wall else 0,
+        "wall_sec": round(wall, 2),
+        "error_samples": sorted({r["error"] for r in results if r["error"]})[:5],
+    }
+
+
+def mark_saturation(levels: List[Dict[str, Any]], factor: float, slo_ms: Optional[float]) -> Optional[int]:
+    """Flag saturated levels; return the highest concurrency before the first one."""
+    base = next((level["ttft_p50_ms"] for level in levels if level["ttft_p50_ms"]), None)
+    healthy = None
+    for i, level in enumerate(levels):
+        reasons = []
+        if base and level["ttft_p50_ms"] and level["ttft_p50_ms"] > factor * base:
+            reasons.append(f"ttft p50 > {factor:g}x")
+        if slo_ms and level["ttft_p95_ms"] and level["ttft_p95_ms"] > slo_ms:
+            reasons.append("ttft p95 > slo")
+        if i and level["concurrency"] > levels[i - 1]["concurrency"] and \
+                level["total_tokens_per_sec"] < 1.1 * levels[i - 1]["total_tokens_per_sec"]:
+            reasons.append("throughput flat")
+        level["saturated"] = reasons
+        if not any(l["saturated"] for l in levels[:i + 1]):
+            healthy = level["concurrency"]
+    return healthy
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent SSE load test for /ask.')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='App base URL (default: http://127.0.0.1:5000)')
+    parser.add_argument('--token', default=os.getenv('LOAD_TEST_TOKEN'),
+                        help='Value of LOAD_TEST_TOKEN on the server (default: $LOAD_TEST_TOKEN)')
+    parser.add_argument('--users', type=int, default=4, help='Test users to log in (default: 4)')
+    parser.add_argument('--concurrency', default='1,2,4,8', help='Comma separated concurrent streams per level (default: 1,2,4,8)')
+    parser.add_argument('--requests', type=int, default=3, help='Questions per client per level (default: 3)')
+    parser.add_argument('--questions', help='Text file with one question per line (default: built-in list)')
+    parser.add_argument('--upload', help='Upload this document once per test user before the run')
+    parser.add_argument('--sources', help='Comma separated sources to use for every question (default: random visible ones)')
+    parser.add_argument('--max-sources', type=int, default=2, help='Most sources selected per question (default: 2)')
+    parser.add_argument('--general-ratio', type=float, default=0.1, help='Share of questions without sources (default: 0.1)')
+    parser.add_argument('--timeout', type=float, default=120, help='Seconds before a stream counts as timed out (default: 120)')
+    parser.add_argument('--think-ms', type=float, default=0, help='Pause between a client\'s questions (default: 0)')
+    parser.add_argument('--slo-ms', type=float, help='p95 TTFT above this marks a level saturated')
+    parser.add_argument('--saturation-factor', type=float, default=2.0,
+                        help='Median TTFT above this multiple of the first level marks saturation (default: 2.0)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for question and source choice (default: 42)')
+    parser.add_argument('--output', '-o', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    if not args.token:
+        parser.error("--token or LOAD_TEST_TOKEN is required")
+    levels = [int(c) for c in args.concurrency.split(',') if c.strip()]
+    args.sources = [s.strip() for s in args.sources.split(',')] if args.sources else None
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, 'r', encoding='utf-8') as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    users = [TestUser(args.url, f"loadtest-{i + 1}", args.token, args.timeout) for i in range(args.users)]
+    for user in users:
+        if args.upload:
+            user.upload(args.upload)
+        user.refresh_sources()
+    visible = sorted({s for user in users for s in user.sources})
+    print(f"{len(users)} test users, {len(visible)} visible sources"
+          + ("" if visible or args.sources else " (general mode only; use --upload for RAG questions)"))
+
+    summaries = []
+    for i, concurrency in enumerate(levels):
+        summaries.append(run_level(users, concurrency, args, questions, args.seed + i))
+    healthy = mark_saturation(summaries, args.saturation_factor, args.slo_ms)
+
+    print(f"{'conc':>5} {'reqs':>5} {'noref':>5} {'wait p50':>9} {'ttft p50':>9} {'ttft p95':>9} {'tok/s':>7} {'total tok/s':>11} "
+          f"{'req/s':>6} {'err%':>6} {'tmo%':>6}  saturation")
+    fmt = lambda v: f"{v:.0f}" if v is not None else "-"
+    for s in summaries:
+        print(f"{s['concurrency']:>5} {s['requests']:>5} {s['no_reference']:>5} {fmt(s['wait_p50_ms']):>9} {fmt(s['ttft_p50_ms']):>9} "
+              f"{fmt(s['ttft_p95_ms']):>9} {fmt(s['stream_tokens_per_sec_p50']):>7} {s['total_tokens_per_sec']:>11.1f} "
+              f"{s['requests_per_sec']:>6.2f} {100 * s['error_rate']:>6.1f} {100 * s['timeout_rate']:>6.1f}  "
+              f"{', '.join(s['saturated']) or '-'}")
+        for sample in s['error_samples']:
+            print(f"      error: {sample}")
+    if any(s['no_reference'] for s in summaries):
+        print("noref: selected sources had nothing relevant, answered without the model "
+              "(use --questions matching the documents)")
+    print(f"\nHighest unsaturated concurrency: {healthy if healthy is not None else 'none'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"url": args.url, "users": args.users, "requests_per_client": args.requests,
+                       "levels": summaries, "max_healthy_concurrency": healthy}, f, ensure_ascii=False, indent=2)
+        print(f"Results: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,16 @@
 import sys
 import os
 import argparse
-from core.document_parser import DocumentParser
-from core.text_processor import TextProcessor
+import yaml
+from core.parse_cache import ParseCache
 
 def main():
     parser = argparse.ArgumentParser(description='Split a document into paragraphs and save as .txt')
     parser.add_argument('input_file', help='Path to the input file (PDF, DOCX, TXT)')
     parser.add_argument('--min-length', type=int, default=50, help='Minimum character length for a paragraph (default: 50)')
     parser.add_argument('--mode', choices=['paragraph', 'page'], default='paragraph', help='Segmentation mode: paragraph or page (default: paragraph)')
+    parser.add_argument('--config', default='config/config.yaml', help='Config file with the parse cache settings')
+    parser.add_argument('--no-cache', action='store_true', help='Always re-parse the document')
     
     args = parser.parse_args()
     
@@ -25,11 +27,16 @@ def main():
     print(f"Processing: {input_path} (Mode: {args.mode})")
     
     try:
-        # Step 1: Parse the document
-        text = DocumentParser.parse(input_path, args.mode)
+        config = {}
+        if os.path.exists(args.config):
+            with open(args.config, 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f) or {}
+        cache_cfg = dict(config.get('cache', {}))
+        if args.no_cache:
+            cache_cfg['enabled'] = False
         
-        # Step 2: Split into paragraphs/pages
-        units = TextProcessor.split_into_paragraphs(text, args.min_length, args.mode)
+        # Step 1-2: Parse the document and split into paragraphs/pages (cached by file hash)
+        units = ParseCache.from_config(cache_cfg, config.get('parser')).split(input_path, args.mode, args.min_length)
         
         unit_type = "pages" if args.mode == 'page' else "paragraphs"
         print(f"Found {len(units)} {unit_type}.")
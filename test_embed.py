@@ -9,7 +9,8 @@ embedding_client = EmbeddingClient(
     provider=rag_cfg.get('embedding_provider', 'ollama'),
     endpoint=rag_cfg.get('embedding_endpoint', 'http://127.0.0.1:11434'),
     model=rag_cfg.get('embedding_model', 'nomic-embed-text'),
-    api_key=rag_cfg.get('embedding_api_key', '')
+    api_key=rag_cfg.get('embedding_api_key', ''),
+    dimensions=rag_cfg.get('embedding_dimensions')
 )
 
 try:
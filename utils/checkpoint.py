@@ -1,59 +1,191 @@
 """Checkpoint manager for resume functionality."""
 import json
 import os
-from typing import Set
+import hashlib
+from typing import Set, Dict, Any, Optional, List, Callable
+
+
+def file_hash(file_path: str) -> str:
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
 
 class CheckpointManager:
-    """Manage checkpoints for resume functionality."""
-    
-    def __init__(self, checkpoint_dir: str, input_file: str):
+    """Manage checkpoints for resume functionality.
+
+    The checkpoint is an append-only log: one line per finished (`d <index>`)
+    or failed (`f <index> <attempts> <reason>`) paragraph, so saving is O(1) instead of
+    rewriting the whole state. Lines are written and fsynced every
+    `save_interval` saves, after the `before_sync` hooks have made the dataset
+    output durable, so the log never claims entries that were lost. The log
+    name is derived from the input's content hash and the generation settings,
+    so different files with the same name, or the same file with other
+    settings, never share a checkpoint.
+    """
+
+    def __init__(self, checkpoint_dir: str, input_file: str, settings: Optional[Dict[str, Any]] = None,
+                 save_interval: int = 1):
         self.checkpoint_dir = checkpoint_dir
         self.input_file = input_file
+        self.settings = settings or {}
+        self.save_interval = max(1, int(save_interval or 1))
+        self.key = self._make_key()
         self.checkpoint_file = self._get_checkpoint_path()
         self.processed_indices: Set[int] = set()
-        
+        self.failed: Dict[int, str] = {}
+        # Failed attempts per paragraph, picks the next retry strategy
+        self.attempts: Dict[int, int] = {}
+        self._pending: List[str] = []
+        self._file = None
+        # Called before every fsync, e.g. to make dataset output durable first
+        self.before_sync: List[Callable[[], None]] = []
+
         # Create checkpoint directory
         os.makedirs(checkpoint_dir, exist_ok=True)
-        
+
         # Load existing checkpoint
         self._load()
-    
+
+    def _make_key(self) -> str:
+        """Content hash of the input plus the settings that change the output."""
+        payload = json.dumps({"input": file_hash(self.input_file), "settings": self.settings},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
     def _get_checkpoint_path(self) -> str:
-        """Get checkpoint file path based on input file."""
+        """Get checkpoint file path based on input content and settings."""
         base_name = os.path.basename(self.input_file)
-        checkpoint_name = f"{base_name}.checkpoint.json"
+        checkpoint_name = f"{base_name}.{self.key}.ckpt"
         return os.path.join(self.checkpoint_dir, checkpoint_name)
-    
+
     def _load(self):
-        """Load checkpoint from file."""
-        if os.path.exists(self.checkpoint_file):
-            try:
-                with open(self.checkpoint_file, 'r') as f:
-                    data = json.load(f)
-                    self.processed_indices = set(data.get('processed_indices', []))
-            except:
-                self.processed_indices = set()
-    
+        """Replay the log. A torn last line from a crash is ignored and removed."""
+        if not os.path.exists(self.checkpoint_file):
+            return
+        lines = 0
+        torn = False
+        # A crash can also cut a multi-byte character of a failure reason
+        with open(self.checkpoint_file, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    torn = True
+                    break
+                lines += 1
+                parts = line.rstrip('\n').split(' ', 3)
+                try:
+                    index = int(parts[1])
+                except (IndexError, ValueError):
+                    continue
+                if parts[0] == 'd':
+                    self.processed_indices.add(index)
+                    self.failed.pop(index, None)
+                    self.attempts.pop(index, None)
+                elif parts[0] == 'f' and index not in self.processed_indices:
+                    try:
+                        self.attempts[index] = int(parts[2])
+                        self.failed[index] = parts[3] if len(parts) > 3 else ''
+                    except (IndexError, ValueError):
+                        # `f <index> <reason>` lines of older logs: one attempt per line
+                        self.attempts[index] = self.attempts.get(index, 0) + 1
+                        self.failed[index] = ' '.join(parts[2:])
+
+        # Retried failures pile up; compact when the log is mostly stale lines.
+        # A torn tail must go too, or the next appended line is glued onto it.
+        if torn or lines > 2 * (len(self.processed_indices) + len(self.failed)) + 100:
+            self._compact()
+
+    def _compact(self):
+        tmp = self.checkpoint_file + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self._header())
+            for index in sorted(self.processed_indices):
+                f.write(f"d {index}\n")
+            for index, reason in sorted(self.failed.items()):
+                f.write(f"f {index} {self.attempts.get(index, 1)} {reason}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_file)
+
+    def _header(self) -> str:
+        meta = {"input": os.path.basename(self.input_file), "key": self.key, "settings": self.settings}
+        return f"# {json.dumps(meta, ensure_ascii=False)}\n"
+
+    def _append(self, line: str):
+        self._pending.append(line)
+        if len(self._pending) >= self.save_interval:
+            self.sync()
+
     def save(self, index: int):
-        """Save checkpoint."""
+        """Mark a paragraph as processed."""
         self.processed_indices.add(index)
-        with open(self.checkpoint_file, 'w') as f:
-            json.dump({
-                'processed_indices': list(self.processed_indices),
-                'total_processed': len(self.processed_indices)
-            }, f)
-    
+        self.failed.pop(index, None)
+        self.attempts.pop(index, None)
+        self._append(f"d {index}\n")
+
+    def mark_failed(self, index: int, reason: str = ''):
+        """Record a paragraph that failed, for a later retry."""
+        if index in self.processed_indices:
+            return
+        reason = ' '.join(str(reason).split())[:500]
+        self.failed[index] = reason
+        self.attempts[index] = self.attempts.get(index, 0) + 1
+        self._append(f"f {index} {self.attempts[index]} {reason}\n")
+
+    def sync(self):
+        """Make everything saved so far durable."""
+        for hook in self.before_sync:
+            hook()
+        if not self._pending:
+            return
+        if self._file is None:
+            is_new = not os.path.exists(self.checkpoint_file)
+            self._file = open(self.checkpoint_file, 'a', encoding='utf-8')
+            if is_new:
+                self._file.write(self._header())
+        self._file.write(''.join(self._pending))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = []
+
     def is_processed(self, index: int) -> bool:
         """Check if index is already processed."""
         return index in self.processed_indices
-    
+
+    def get_failed(self) -> Dict[int, str]:
+        """Failed paragraph indices (not processed since) and their last error."""
+        return dict(self.failed)
+
+    def get_attempts(self, index: int) -> int:
+        """How many times a paragraph has failed so far."""
+        return self.attempts.get(index, 0)
+
     def clear(self):
         """Clear checkpoint file."""
+        self._pending = []
+        self.close()
         if os.path.exists(self.checkpoint_file):
             os.remove(self.checkpoint_file)
         self.processed_indices = set()
-    
+        self.failed = {}
+        self.attempts = {}
+
     def get_progress(self) -> int:
         """Get number of processed items."""
         return len(self.processed_indices)
+
+    def close(self):
+        """Sync and close the log."""
+        self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""Watch a folder and keep the vector DB in sync with it.
+
+New or changed documents are re-ingested incrementally, deleted ones are
+removed from the DB. Shares the manifest with ingest.py, so both can be
+used on the same folder.
+"""
+import os
+import time
+import json
+import queue
+import signal
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import yaml
+from watchfiles import watch, Change
+from core.embedding_client import EmbeddingClient
+from core.vector_db import VectorDB
+from core.ingestion import IngestManifest, discover_files, parse_and_split, source_name, SUPPORTED_EXTENSIONS
+from utils.logger import setup_logger
+
+
+class IngestDaemon:
+    """Debounced file events -> bounded worker pool -> VectorDB.sync_source."""
+
+    def __init__(self, directory, db, embedding_client, manifest, rag_cfg, status_path,
+                 workers=2, settle_seconds=2.0, logger=None, cache_cfg=None, parser_cfg=None):
+        self.directory = os.path.abspath(directory)
+        self.db = db
+        self.embedding_client = embedding_client
+        self.manifest = manifest
+        self.rag_cfg = rag_cfg
+        self.cache_cfg = cache_cfg
+        self.parser_cfg = parser_cfg
+        self.status_path = status_path
+        self.workers = workers
+        self.settle_seconds = settle_seconds
+        self.logger = logger
+
+        self.pending = {}                  # path -> time of last event
+        self.pending_lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.queued = set()
+        self.in_progress = set()
+        # VectorDB and manifest writes are serialized; parsing runs in parallel
+        self.db_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+
+        self.started = time.time()
+        self.stats = {"files_ingested": 0, "files_deleted": 0, "files_failed": 0, "files_unchanged": 0,
+                      "chunks_added": 0, "chunks_deleted": 0, "busy_seconds": 0.0}
+        self.last_file = None
+        self.last_error = None
+
+    # --- Event intake ---
+
+    def _is_supported(self, path):
+        name = os.path.basename(path)
+        return name.lower().endswith(SUPPORTED_EXTENSIONS) and not name.startswith(('.', '~$'))
+
+    def note(self, path):
+        """Remember an event; the file is queued once it has been quiet for settle_seconds."""
+        with self.pending_lock:
+            self.pending[os.path.abspath(path)] = time.time()
+
+    def _scheduler(self):
+        while not self.stop_event.is_set():
+            now = time.time()
+            with self.pending_lock:
+                ready = [p for p, t in self.pending.items() if now - t >= self.settle_seconds]
+                for path in ready:
+                    del self.pending[path]
+            for path in ready:
+                if path not in self.queued:
+                    self.queued.add(path)
+                    self.queue.put(path)
+            self.write_status()
+            self.stop_event.wait(0.5)
+
+    # --- Work ---
+
+    def _worker(self):
+        while not self.stop_event.is_set():
+            try:
+                path = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.queued.discard(path)
+            self.in_progress.add(path)
+            start = time.time()
+            try:
+                if os.path.exists(path):
+                    self._ingest(path)
+                else:
+                    self._delete(path)
+            except Exception as e:
+                self.stats["files_failed"] += 1
+                self.last_error = f"{path}: {e}"
+                self.logger.error(f"❌ {path} işlenemedi: {e}")
+            finally:
+                self.stats["busy_seconds"] += time.time() - start
+                self.in_progress.discard(path)
+                self.queue.task_done()
+
+    def _ingest(self, path):
+        with self.db_lock:
+            changed, fingerprint = self.manifest.check(path)
+        if not changed:
+            self.stats["files_unchanged"] += 1
+            return
+
+        _, paragraphs = self.pool.submit(parse_and_split, path, self.cache_cfg, self.parser_cfg, self.rag_cfg).result()
+        source = source_name(path, self.directory)
+        with self.db_lock:
+            result = self.db.sync_source(
+                source, paragraphs, self.embedding_client.get_embedding,
+                batch_size=self.rag_cfg.get('ingest_batch_size', 256),
+                dedup=self.rag_cfg.get('dedup', 'none'),
+                dedup_threshold=self.rag_cfg.get('dedup_threshold', 0.9),
+                embed_batch_fn=self.embedding_client.get_embeddings
+            )
+            self.manifest.record(path, fingerprint, source=source, paragraphs=len(paragraphs))
+        self.stats["files_ingested"] += 1
+        self.stats["chunks_added"] += result["added"]
+        self.stats["chunks_deleted"] += result["deleted"]
+        self.last_file = source
+        self.logger.info(f"✅ {source} eşitlendi: {result}")
+
+    def _delete(self, path):
+        with self.db_lock:
+            entry = self.manifest.get(path)
+            if not entry:
+                return
+            # Syncing an empty revision removes only the chunks this daemon owns
+            result = self.db.sync_source(entry.get('source'), [], self.embedding_client.get_embedding)
+            self.manifest.remove(path)
+        self.stats["files_deleted"] += 1
+        self.stats["chunks_deleted"] += result["deleted"]
+        self.last_file = entry.get('source')
+        self.logger.info(f"🗑️ {entry.get('source')} silindi ({result['deleted']} parça)")
+
+    # --- Status ---
+
+    def status(self):
+        with self.pending_lock:
+            waiting = len(self.pending)
+        elapsed = max(time.time() - self.started, 1e-9)
+        busy = self.stats["busy_seconds"]
+        return {
+            "directory": self.directory,
+            "started": self.started,
+            "updated": time.time(),
+            "queue_depth": self.queue.qsize() + waiting,
+            "debouncing": waiting,
+            "in_progress": sorted(source_name(p, self.directory) for p in list(self.in_progress)),
+            **self.stats,
+            "files_per_minute": 60 * (self.stats["files_ingested"] + self.stats["files_deleted"]) / elapsed,
+            "chunks_per_second": self.stats["chunks_added"] / busy if busy else 0.0,
+            "last_file": self.last_file,
+            "last_error": self.last_error
+        }
+
+    def write_status(self):
+        tmp = self.status_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.status(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.status_path)
+
+    # --- Lifecycle ---
+
+    def run(self, debounce_ms=1600):
+        threads = [threading.Thread(target=self._scheduler, daemon=True)]
+        threads += [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+
+        # Catch up with changes made while the daemon was not running
+        for path in discover_files(self.directory):
+            self.note(path)
+        for path in self.manifest.missing_under(self.directory):
+            self.note(path)
+
+        self.logger.info(f"👀 {self.directory} izleniyor ({self.workers} işçi)")
+        try:
+            for changes in watch(self.directory, debounce=debounce_ms, stop_event=self.stop_event,
+                                 watch_filter=lambda change, path: self._is_supported(path)):
+                for change, path in changes:
+                    if change in (Change.added, Change.modified, Change.deleted):
+                        self.note(path)
+        finally:
+            self.stop_event.set()
+            for t in threads:
+                t.join(timeout=5)
+            self.pool.shutdown(cancel_futures=True)
+            self.write_status()
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Continuously ingest documents dropped into a folder.')
+    parser.add_argument('--config', default='config/config.yaml', help='Path to the config file')
+    parser.add_argument('--dir', help='Folder to watch (default: watch.directory from config)')
+    parser.add_argument('--workers', type=int, help='Parallel parser workers (default: watch.workers)')
+    parser.add_argument('--status-file', help='Status JSON path (default: <db_path>/<collection>.watch_status.json)')
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    rag_cfg = config.get('rag', {})
+    model_cfg = config.get('model', {})
+    watch_cfg = config.get('watch', {})
+    log_cfg = config.get('logging', {})
+
+    logger = setup_logger(
+        name="watch_ingest",
+        level=log_cfg.get('level', 'INFO'),
+        log_file=log_cfg.get('file', './data/logs/app.log'),
+        console=log_cfg.get('console', True)
+    )
+
+    directory = args.dir or watch_cfg.get('directory', './data/watch')
+    os.makedirs(directory, exist_ok=True)
+    db_path = rag_cfg.get('db_path', './data/vector_db')
+    collection = rag_cfg.get('collection_name', 'training_docs')
+
+    embedding_client = EmbeddingClient(
+        provider=model_cfg.get('type', 'lmstudio'),
+        endpoint=model_cfg.get('endpoint', 'http://127.0.0.1:1234'),
+        model=rag_cfg.get('embedding_model', 'nomic-embed-text-v1.5'),
+        api_key=model_cfg.get('api_key', ''),
+        dimensions=rag_cfg.get('embedding_dimensions'),
+        fake=model_cfg.get('fake')
+    )
+    db = VectorDB(
+        db_path=db_path,
+        collection_name=collection,
+        backend=rag_cfg.get('vector_backend', 'chroma'),
+        quantization=rag_cfg.get('quantization', 'none'),
+        rescore_factor=rag_cfg.get('rescore_factor', 4),
+        sharding=rag_cfg.get('sharding', 'none')
+    )
+
+    daemon = IngestDaemon(
+        directory, db, embedding_client,
+        manifest=IngestManifest(os.path.join(db_path, f"{collection}.manifest.json"), rag_cfg),
+        rag_cfg=rag_cfg,
+        status_path=args.status_file or os.path.join(db_path, f"{collection}.watch_status.json"),
+        workers=args.workers or watch_cfg.get('workers', 2),
+        settle_seconds=watch_cfg.get('settle_seconds', 2.0),
+        logger=logger,
+        cache_cfg=config.get('cache'),
+        parser_cfg=config.get('parser')
+    )
+    signal.signal(signal.SIGTERM, daemon.stop)
+    try:
+        daemon.run(debounce_ms=watch_cfg.get('debounce_ms', 1600))
+    except KeyboardInterrupt:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()